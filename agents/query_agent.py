@@ -16,6 +16,8 @@ class QueryAgent:
         """
         Decides if retrieval is necessary.
         Returns a dict: {"needs_retrieval": bool, "retrieval_strategy": str, "reasoning": str}
+        plus "fallback": True when the LLM response (or an LLM error message) was not
+        a decision and retrieval was chosen by default.
         """
         system_prompt = (
             "You are a Query Analysis Agent. Your goal is to analyze the following user query "
@@ -40,4 +42,5 @@ class QueryAgent:
                 "needs_retrieval": True,
                 "retrieval_strategy": "vector_similarity",
                 "reasoning": "Error parsing LLM response, defaulting to retrieval.",
+                "fallback": True,
             }
@@ -0,0 +1,78 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+from core.config import RERANK_CACHE_SIZE, RERANK_MODEL_NAME, RERANK_TOP_N
+
+
+class RerankAgent:
+    """
+    Reorders retrieved candidates with a CPU cross-encoder so only the best few
+    chunks reach the LLM. All uncached (query, chunk) pairs are scored in one
+    batched forward pass; scores are memoized per (query hash, chunk ID).
+    """
+
+    def __init__(self, model=None, cache_size: int = RERANK_CACHE_SIZE):
+        # Loaded lazily so a disabled reranker never pulls the model
+        self._model = model
+        self._cache: "OrderedDict[tuple, float]" = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            from sentence_transformers import CrossEncoder
+
+            self._model = CrossEncoder(RERANK_MODEL_NAME, device="cpu")
+        return self._model
+
+    @staticmethod
+    def _chunk_key(chunk: Dict[str, Any]) -> str:
+        # Content hash guards against a chunk ID being reused after re-ingest
+        digest = hashlib.sha1(chunk["content"].encode("utf-8")).hexdigest()[:16]
+        return f"{chunk.get('chunk_id', '')}:{digest}"
+
+    def rerank(
+        self, query: str, candidates: List[Dict[str, Any]], top_n: int = RERANK_TOP_N
+    ) -> Dict[str, Any]:
+        """
+        Returns {"context": best top_n chunks, "stats": {...}}. Each kept chunk
+        gains a "rerank_score" (higher is more relevant).
+        """
+        start = time.perf_counter()
+        query_hash = hashlib.sha256(query.encode("utf-8")).hexdigest()
+        keys = [(query_hash, self._chunk_key(c)) for c in candidates]
+
+        scores = {}
+        with self._lock:
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    scores[key] = self._cache[key]
+
+        missing = [(key, c) for key, c in zip(keys, candidates) if key not in scores]
+        if missing:
+            pairs = [(query, c["content"]) for _, c in missing]
+            predicted = self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+            with self._lock:
+                for (key, _), score in zip(missing, predicted):
+                    scores[key] = float(score)
+                    self._cache[key] = float(score)
+                while len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+
+        ranked = sorted(zip(keys, candidates), key=lambda kc: scores[kc[0]], reverse=True)
+        context = [{**c, "rerank_score": round(scores[key], 4)} for key, c in ranked[:top_n]]
+        return {
+            "context": context,
+            "stats": {
+                "candidates": len(candidates),
+                "kept": len(context),
+                "scored": len(missing),
+                "cache_hits": len(candidates) - len(missing),
+                "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            },
+        }
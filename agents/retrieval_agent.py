@@ -1,58 +1,65 @@
-import pickle
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
-import faiss
 import numpy as np
 from sentence_transformers import SentenceTransformer
 
-from core.config import EMBEDDING_MODEL_NAME, FAISS_INDEX_PATH
+from core.config import EMBEDDING_MODEL_NAME, FAISS_INDEX_PATH, SHARDS_DIR
+from core.retrieval_depth import similarity_from_distance
+from core.shard_index import ShardedIndex
+from core.tracing import span
 
 
 class RetrievalAgent:
     """
-    Handles similarity search against the FAISS index.
+    Handles similarity search against the sharded FAISS index.
     """
 
     def __init__(self):
         self.model = SentenceTransformer(EMBEDDING_MODEL_NAME)
-        self.index = None
-        self.documents = []
-        self.sources = []
+        self.index = ShardedIndex()
         self._load_index()
 
     def _load_index(self):
-        """Loads FAISS index and metadata."""
+        """Loads all FAISS shards (or the legacy single index) and their metadata."""
         try:
-            index_file = str(FAISS_INDEX_PATH) + ".bin"
-            meta_file = str(FAISS_INDEX_PATH) + "_meta.pkl"
-
-            self.index = faiss.read_index(index_file)
-            with open(meta_file, "rb") as f:
-                data = pickle.load(f)
-                self.documents = data["documents"]
-                self.sources = data["sources"]
+            self.index = ShardedIndex.load(SHARDS_DIR, legacy_index_path=FAISS_INDEX_PATH)
         except Exception as e:
             print(f"Warning: Could not load index: {e}")
 
-    def retrieve(self, query: str, k: int = 3) -> List[Dict[str, Any]]:
+    @property
+    def index_version(self) -> str:
+        return self.index.version
+
+    def reload_shard(self, shard_id: int):
+        """Swaps in a rebuilt shard without reloading the rest of the index."""
+        self.index.load_shard(SHARDS_DIR, shard_id)
+
+    def retrieve(
+        self, query: str, k: int = 3, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
         """
-        Retrieves top-k relevant chunks.
+        Retrieves top-k relevant chunks, best first. Each carries the raw FAISS
+        "score" and its cosine "similarity" (see core.retrieval_depth).
+        `filters` (sources / tags / upload time, see core.chunk_metadata) are
+        enforced inside the FAISS search rather than applied to its results.
         """
         if not self.index:
             return [{"content": "No index available.", "source": "system"}]
 
-        query_embedding = self.model.encode([query])
-        distances, indices = self.index.search(np.array(query_embedding).astype("float32"), k)
+        with span("embedding.encode", texts=1):
+            query_embedding = self.model.encode([query])
+        # Shards may be swapped by background ingestion while this query runs
+        index = self.index.snapshot()
+        hits = index.search(np.array(query_embedding).astype("float32"), k, filters)
 
         results = []
-        for i, idx in enumerate(indices[0]):
-            if idx != -1:
-                results.append(
-                    {
-                        "content": self.documents[idx],
-                        "source": self.sources[idx],
-                        "score": float(distances[0][i]),
-                    }
-                )
+        for distance, shard_id, local_id in hits:
+            chunk = index.get_chunk(shard_id, local_id)
+            chunk["score"] = distance
+            chunk["similarity"] = round(
+                similarity_from_distance(distance, index.shards[shard_id].higher_is_better), 4
+            )
+            chunk["chunk_id"] = f"{shard_id}:{local_id}"
+            results.append(chunk)
 
         return results
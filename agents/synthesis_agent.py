@@ -1,6 +1,7 @@
 from typing import Any, Dict, List
 
 from core.llm_interface import LLMProvider
+from core.prompts import build_context_prefix
 
 
 class SynthesisAgent:
@@ -15,14 +16,14 @@ class SynthesisAgent:
         """
         Generates the answer.
         """
-        context_str = "\n\n".join([f"Source ({c['source']}): {c['content']}" for c in context])
+        # Instructions + context form the shared, cacheable prefix (see core.prompts)
+        prefix = build_context_prefix(context)
 
         system_prompt = (
             "You are a Synthesis Agent. Your task is to synthesize an answer to the user's query "
-            "based STRICTLY on the provided retrieved context. "
-            "Do not use outside knowledge. If the context is insufficient, state that clearly."
-            "\n\nRetrieved Context:\n" + context_str
+            "based STRICTLY on the retrieved context above. "
+            "If the context is insufficient, state that clearly."
         )
 
-        response = self.llm.generate(system_prompt, query, temperature=0.1)
+        response = self.llm.generate(system_prompt, query, temperature=0.1, cached_prefix=prefix)
         return response
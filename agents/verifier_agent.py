@@ -2,6 +2,7 @@ import json
 from typing import Any, Dict, List
 
 from core.llm_interface import LLMProvider
+from core.prompts import build_context_prefix
 
 
 class VerifierAgent:
@@ -17,20 +18,22 @@ class VerifierAgent:
         Checks answer validity.
         Returns dict: {"is_valid": bool, "reasoning": str}
         """
-        context_str = "\n\n".join([f"Source ({c['source']}): {c['content']}" for c in context])
+        # Same prefix as the Synthesis Agent, so the provider can serve it from cache
+        prefix = build_context_prefix(context)
 
         system_prompt = (
             "You are a Verification Agent. Verify the following answer against "
-            "the provided context. "
+            "the retrieved context above. "
             "The answer must be fully supported by the context. "
             "Return strict JSON: "
             '{"is_valid": bool, "reasoning": str}'
-            "\n\nContext:\n" + context_str
         )
 
         user_prompt = f"Query: {query}\nAnswer: {answer}"
 
-        response = self.llm.generate(system_prompt, user_prompt, temperature=0.0)
+        response = self.llm.generate(
+            system_prompt, user_prompt, temperature=0.0, cached_prefix=prefix
+        )
 
         try:
             clean_response = response.replace("```json", "").replace("```", "").strip()
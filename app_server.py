@@ -1,15 +1,42 @@
 import asyncio
-import json
+import hashlib
+import os
+import uuid
 from pathlib import Path
+from typing import List, Optional
 
 import uvicorn
-from fastapi import FastAPI, File, UploadFile
+from fastapi import FastAPI, File, Request, UploadFile
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from sse_starlette.sse import EventSourceResponse
+from starlette.background import BackgroundTask
 
+from core.admission import AdmissionController, Overloaded, query_priority, retry_after_header
 from core.agent_router import AgentRouter
-from core.config import APP_ENV, DOCS_DIR, LLM_PROVIDER
+from core.config import (
+    APP_ENV,
+    CANDIDATE_POOL,
+    DOCS_DIR,
+    DOCUMENT_EXTENSIONS,
+    LLM_PROVIDER,
+    MAX_UPLOAD_BYTES,
+    TAGS_FILE,
+    TRUST_CLIENT_ID_HEADER,
+    UPLOAD_CHUNK_BYTES,
+)
+from core.ingest_jobs import IngestionJobQueue
+from core.sse import VERBOSITY_LEVELS, SSEEncoder
+from core.tracing import (
+    activate,
+    bind,
+    finish,
+    profile_enabled_for,
+    safe_request_id,
+    span,
+    start_trace,
+)
+from scripts.ingest import ingest_file, invalidate_cached_answers, is_document_name
 
 app = FastAPI(title="Agentic RAG", version="2.0.0")
 
@@ -18,6 +45,31 @@ BASE_DIR = Path(__file__).parent
 app.mount("/ui", StaticFiles(directory=BASE_DIR / "ui"), name="ui")
 
 router = AgentRouter()
+admission = AdmissionController()
+
+
+def _ingest_uploaded(path: Path):
+    """Background job: index one uploaded file into the live index."""
+    result = ingest_file(path, router.retrieval_agent.index, router.retrieval_agent.model)
+    # Swapped shards change the index version, which already retires cached retrievals;
+    # cached answers are dropped here (all of them when the file is a new document)
+    result.update(invalidate_cached_answers(router.cache, result))
+    return result
+
+
+ingest_jobs = IngestionJobQueue(_ingest_uploaded)
+
+
+def _is_indexed(filename: str, sha256: str) -> bool:
+    """
+    Whether this exact content is already in the live index: per the last successful
+    job for the file, or (none in the job history) the index holding the document.
+    A failed job or a file copied in by hand still needs ingesting.
+    """
+    job = ingest_jobs.last_done(filename)
+    if job is not None:
+        return job["sha256"] == sha256
+    return router.retrieval_agent.index.has_source(filename)
 
 
 @app.get("/")
@@ -39,49 +91,242 @@ async def health_check():
     )
 
 
+def _split_csv(value: Optional[str]) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()] if value else []
+
+
+@app.get("/metrics")
+async def metrics():
+    """Admission control (queue depth, shed counts), cache hit rates and ingestion throughput."""
+    return JSONResponse(
+        {
+            "admission": admission.metrics(),
+            "semantic_cache": router.cache.stats(),
+            "stage_caches": router.stage_cache_stats(),
+            "ingestion": ingest_jobs.stats(),
+        }
+    )
+
+
 @app.get("/stream_query")
-async def stream_query(q: str):
+async def stream_query(
+    request: Request,
+    q: str,
+    sources: Optional[str] = None,
+    tags: Optional[str] = None,
+    uploaded_after: Optional[float] = None,
+    uploaded_before: Optional[float] = None,
+    verbosity: str = "full",
+    k: Optional[int] = None,
+):
     """
     SSE Endpoint that streams the agent workflow steps to the UI.
+    Optional filters restrict retrieval: comma-separated `sources` (file names)
+    and `tags`, and an upload-time window as unix timestamps.
+    `verbosity` (full / summary / final) drops the router's narration events,
+    or everything but the final answer, for API consumers (see core.sse).
+    `k` (the UI's slider, clamped to 1..CANDIDATE_POOL) is the most chunks sent
+    to the LLM; adaptive depth may send fewer (see core.retrieval_depth).
+    Answers are cached per k (see AgentRouter._answer_key).
+
+    Admission control runs before the stream opens: over-quota clients get 429
+    (quota per peer address; per X-Client-ID only with TRUST_CLIENT_ID_HEADER),
+    and cache misses that cannot get a pipeline slot in time get 503, both
+    with Retry-After. Cache hits skip the pipeline queue.
+
+    Every response carries X-Request-ID (the client's, if it sent a safe one), which
+    tags the request's trace spans. `X-Debug-Profile: 1` (when enabled) also
+    writes a cProfile of the pipeline to data/traces/profiles/<request id>.prof.
     """
+    if verbosity not in VERBOSITY_LEVELS:
+        return JSONResponse(
+            {"status": "error", "message": f"verbosity must be one of {list(VERBOSITY_LEVELS)}"},
+            status_code=400,
+        )
+    if k is not None:
+        # The UI slider goes to 10 whatever the pool size: clamp rather than reject
+        k = max(1, min(k, CANDIDATE_POOL))
+    filters = {
+        "sources": _split_csv(sources),
+        "tags": _split_csv(tags),
+        "uploaded_after": uploaded_after,
+        "uploaded_before": uploaded_before,
+    }
+
+    request_id = safe_request_id(request.headers.get("X-Request-ID"))
+    trace = start_trace(
+        "stream_query",
+        request_id,
+        profile=profile_enabled_for(request.headers.get("X-Debug-Profile")),
+        query_chars=len(q),
+        filtered=any(filters.values()),
+    )
+    trace_headers = {"X-Request-ID": request_id}
+
+    client_id = request.client.host if request.client else "anonymous"
+    if TRUST_CLIENT_ID_HEADER:
+        client_id = request.headers.get("X-Client-ID") or client_id
+    wait = admission.check_quota(client_id)
+    if wait:
+        finish(trace, "rate limited")
+        return JSONResponse(
+            {"status": "error", "message": "Rate limit exceeded"},
+            status_code=429,
+            headers={**retry_after_header(wait), **trace_headers},
+        )
+
+    loop = asyncio.get_event_loop()
+    slot = None
+    with activate(trace):
+        query_vector, cache_hit = await loop.run_in_executor(
+            None, bind(router.check_cache), q, filters, k
+        )
+        if cache_hit:
+            admission.record_cache_hit()
+        else:
+            try:
+                with span("admission.wait"):
+                    slot = await admission.acquire(query_priority(q))
+            except Overloaded as e:
+                finish(trace, f"shed: {e.reason}")
+                return JSONResponse(
+                    {"status": "error", "message": f"Server busy: {e.reason}"},
+                    status_code=503,
+                    headers={**retry_after_header(e.retry_after), **trace_headers},
+                )
+
+    def release_slot():
+        if slot:
+            slot.release()
+        finish(trace)
+
+    encoder = SSEEncoder(verbosity)
 
     async def event_generator():
-        try:
-            async for event in router.process_query(q):
-                yield json.dumps(event)
-                await asyncio.sleep(0.05)
-        except Exception as e:
-            yield json.dumps({"step": "error", "message": str(e)})
+        with activate(trace):
+            try:
+                # Each payload is written and flushed as soon as it is yielded
+                # Reuse the probe's answer: a miss now would run without a pipeline slot
+                events = router.process_query(
+                    q, filters, query_vector, k=k, cache_hit=cache_hit, cache_checked=True
+                )
+                async for event in events:
+                    payload = encoder.encode(event)
+                    if payload is not None:
+                        yield payload
+            except Exception as e:
+                yield encoder.encode({"step": "error", "message": str(e)})
+                finish(trace, str(e))
+            finally:
+                release_slot()
+
+    # The background task covers clients that disconnect before the stream starts
+    return EventSourceResponse(
+        event_generator(), headers=trace_headers, background=BackgroundTask(release_slot)
+    )
+
 
-    return EventSourceResponse(event_generator())
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(UPLOAD_CHUNK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
 
 
 @app.post("/upload_document")
 async def upload_document(file: UploadFile = File(...)):
     """
     Upload a document to the knowledge base.
-    Files are saved to data/documents/ for future ingestion.
+    The file is streamed to data/documents/ in UPLOAD_CHUNK_BYTES pieces, hashed
+    and size-checked as bytes arrive, then queued for background ingestion.
+    Poll /jobs/{job_id} for progress. Re-uploading content that is already indexed is a no-op.
     """
-    try:
-        # Ensure documents directory exists
-        DOCS_DIR.mkdir(parents=True, exist_ok=True)
-
-        # Save file
-        dest = DOCS_DIR / file.filename
-        with open(dest, "wb") as f:
-            content = await file.read()
-            f.write(content)
-
+    filename = Path(file.filename or "").name
+    if not filename or not is_document_name(filename):
         return JSONResponse(
             {
-                "status": "success",
-                "filename": file.filename,
-                "size": len(content),
-                "message": f"File '{file.filename}' uploaded. Run ingestion to index it.",
-            }
+                "status": "error",
+                "message": f"Only {', '.join(DOCUMENT_EXTENSIONS)} documents can be uploaded "
+                f"(and not {TAGS_FILE})",
+            },
+            status_code=400,
+        )
+
+    loop = asyncio.get_running_loop()
+    DOCS_DIR.mkdir(parents=True, exist_ok=True)
+    dest = DOCS_DIR / filename
+    # Hidden temp name: /documents and ingestion never see a partial file
+    tmp = DOCS_DIR / f".{filename}.{uuid.uuid4().hex}.part"
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp, "wb") as f:
+            while True:
+                block = await file.read(UPLOAD_CHUNK_BYTES)
+                if not block:
+                    break
+                size += len(block)
+                if size > MAX_UPLOAD_BYTES:
+                    return JSONResponse(
+                        {
+                            "status": "error",
+                            "message": f"File exceeds the {MAX_UPLOAD_BYTES} byte upload limit",
+                        },
+                        status_code=413,
+                    )
+                digest.update(block)
+                await loop.run_in_executor(None, f.write, block)
+
+        sha256 = digest.hexdigest()
+        unchanged = dest.exists() and (
+            await loop.run_in_executor(None, _file_sha256, dest) == sha256
         )
+        if unchanged and _is_indexed(filename, sha256):
+            return JSONResponse(
+                {
+                    "status": "success",
+                    "filename": filename,
+                    "size": size,
+                    "sha256": sha256,
+                    "job_id": None,
+                    "message": f"File '{filename}' is unchanged; nothing to ingest.",
+                }
+            )
+        os.replace(tmp, dest)
     except Exception as e:
         return JSONResponse({"status": "error", "message": str(e)}, status_code=500)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+    job = ingest_jobs.submit(dest, size, sha256)
+    return JSONResponse(
+        {
+            "status": "success",
+            "filename": filename,
+            "size": size,
+            "sha256": sha256,
+            "job_id": job["id"],
+            "message": f"File '{filename}' uploaded and queued for ingestion.",
+        }
+    )
+
+
+@app.get("/jobs")
+async def list_jobs():
+    """Background ingestion jobs (newest first) and overall ingestion throughput."""
+    return JSONResponse({"jobs": ingest_jobs.list(), "stats": ingest_jobs.stats()})
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status of one ingestion job: queued, running, done (with counts) or failed."""
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        return JSONResponse(
+            {"status": "error", "message": f"Job {job_id} not found"}, status_code=404
+        )
+    return JSONResponse(job)
 
 
 @app.get("/documents")
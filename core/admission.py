@@ -0,0 +1,194 @@
+"""
+Admission Control for /stream_query
+===================================
+- Per-client token buckets reject over-quota clients immediately (429).
+  At most `max_buckets` are kept; the least recently seen client is evicted.
+- At most `max_concurrent` full agent pipelines run at once; further cache
+  misses wait in a priority queue (short queries first).
+- A request that cannot start within `queue_timeout` seconds, or that arrives
+  when the queue is full, is shed (503). Both carry a Retry-After hint.
+Cache hits never take a pipeline slot, so they are not stuck behind misses.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from core.config import (
+    CLIENT_BURST,
+    CLIENT_RATE_PER_MINUTE,
+    MAX_CLIENT_BUCKETS,
+    MAX_CONCURRENT_PIPELINES,
+    MAX_QUEUE_DEPTH,
+    QUEUE_TIMEOUT_SECONDS,
+    SHORT_QUERY_CHARS,
+)
+
+PRIORITY_SHORT = 0
+PRIORITY_NORMAL = 1
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed; `retry_after` is in seconds."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def query_priority(query: str) -> int:
+    """Lower runs first: short queries are cheaper to synthesize and verify."""
+    return PRIORITY_SHORT if len(query) <= SHORT_QUERY_CHARS else PRIORITY_NORMAL
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, burst: int):
+        self.rate = rate_per_second
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Consumes a token. Returns 0 on success, else seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class PipelineSlot:
+    """Held for the lifetime of one pipeline; `release` is idempotent."""
+
+    def __init__(self, controller: "AdmissionController"):
+        self._controller = controller
+        self._started = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._release(time.monotonic() - self._started)
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_concurrent: int = MAX_CONCURRENT_PIPELINES,
+        queue_timeout: float = QUEUE_TIMEOUT_SECONDS,
+        max_queue: int = MAX_QUEUE_DEPTH,
+        rate_per_minute: float = CLIENT_RATE_PER_MINUTE,
+        burst: int = CLIENT_BURST,
+        max_buckets: int = MAX_CLIENT_BUCKETS,
+    ):
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self.max_queue = max_queue
+        self.rate_per_second = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_buckets = max_buckets
+
+        self._active = 0
+        self._waiters = []  # heap of (priority, seq, future)
+        self._queued = 0
+        self._seq = itertools.count()
+        # Least recently seen first, so eviction is O(1) however many clients there are
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._avg_service = 5.0  # EWMA of pipeline duration (seconds)
+
+        self.counters = {
+            "admitted": 0,
+            "cache_hits": 0,
+            "rate_limited": 0,
+            "shed_queue_full": 0,
+            "shed_deadline": 0,
+        }
+
+    # ─── Per-client quota ───
+
+    def check_quota(self, client_id: str) -> float:
+        """0 if the client may proceed, else seconds to wait (answer with 429)."""
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            while len(self._buckets) >= self.max_buckets:
+                self._buckets.popitem(last=False)
+            bucket = self._buckets[client_id] = TokenBucket(self.rate_per_second, self.burst)
+        else:
+            self._buckets.move_to_end(client_id)
+        wait = bucket.take()
+        if wait:
+            self.counters["rate_limited"] += 1
+        return wait
+
+    # ─── Pipeline slots ───
+
+    def record_cache_hit(self):
+        self.counters["cache_hits"] += 1
+
+    async def acquire(self, priority: int = PRIORITY_NORMAL) -> PipelineSlot:
+        """Waits for a pipeline slot in priority order, or raises Overloaded."""
+        if self._active < self.max_concurrent and self._queued == 0:
+            return self._admit()
+
+        if self._queued >= self.max_queue:
+            self.counters["shed_queue_full"] += 1
+            raise Overloaded("queue full", self._retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self._queued += 1
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._queued -= 1
+            self.counters["shed_deadline"] += 1
+            raise Overloaded("queue wait exceeded deadline", self._retry_after())
+        except asyncio.CancelledError:
+            self._queued -= 1
+            if future.done() and not future.cancelled():
+                # A slot was handed over just as the client went away: pass it on
+                self._active += 1
+                self._release(0.0)
+            raise
+        self._queued -= 1
+        return self._admit()
+
+    def _admit(self) -> PipelineSlot:
+        self._active += 1
+        self.counters["admitted"] += 1
+        return PipelineSlot(self)
+
+    def _release(self, duration: float):
+        if duration:
+            self._avg_service = 0.8 * self._avg_service + 0.2 * duration
+        self._active -= 1
+        # Wake the best waiter still waiting; timed-out/cancelled futures are skipped
+        while self._waiters and self._active < self.max_concurrent:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                break
+
+    def _retry_after(self) -> int:
+        backlog = (self._queued + 1) / max(1, self.max_concurrent)
+        return max(1, math.ceil(backlog * self._avg_service))
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "active_pipelines": self._active,
+            "max_concurrent_pipelines": self.max_concurrent,
+            "queue_depth": self._queued,
+            "avg_pipeline_seconds": round(self._avg_service, 3),
+            **self.counters,
+        }
+
+
+def retry_after_header(seconds: Optional[float]) -> Dict[str, str]:
+    return {"Retry-After": str(max(1, math.ceil(seconds or 0)))}
@@ -1,14 +1,34 @@
 import asyncio
+from typing import Any, Dict, Optional, Tuple
 
 import numpy as np
 
 from agents.query_agent import QueryAgent
+from agents.rerank_agent import RerankAgent
 from agents.retrieval_agent import RetrievalAgent
 from agents.synthesis_agent import SynthesisAgent
 from agents.verifier_agent import VerifierAgent
 from core.cache_manager import SemanticCache
-from core.config import get_llm_config
+from core.chunk_metadata import filter_key, normalize_filter
+from core.config import (
+    ADAPTIVE_K_ENABLED,
+    CANDIDATE_POOL,
+    DEFAULT_K,
+    RELEVANCE_THRESHOLD,
+    RERANK_CANDIDATES,
+    RERANK_ENABLED,
+    RERANK_TOP_N,
+    VERIFIER_TIER,
+    get_llm_config,
+)
 from core.llm_interface import get_llm
+from core.retrieval_depth import cut_context
+from core.stage_cache import RetrievalCache, RoutingCache
+from core.tracing import bind, span
+
+NO_RELEVANT_CONTEXT_ANSWER = (
+    "I could not find anything relevant to this question in the indexed documents."
+)
 
 
 class AgentRouter:
@@ -17,6 +37,11 @@ class AgentRouter:
     - Tiered Intelligence: Haiku (fast) for routing/verification, Sonnet (smart) for synthesis
     - Speculative Retrieval: Query Analysis + Retrieval run in parallel
     - Semantic Caching: Skip the entire pipeline for near-duplicate queries
+    - Adaptive Depth: one candidate pool per query, cut by relevance (core.retrieval_depth);
+      when nothing is relevant, no LLM is asked to answer from unrelated context
+
+    Each stage runs in a span of the caller's trace (see core.tracing); work
+    sent to executor threads is wrapped with `bind` so its spans join it.
     """
 
     def __init__(self):
@@ -30,26 +55,101 @@ class AgentRouter:
         self.query_agent = QueryAgent(llm_fast)  # Fast: routing decision
         self.retrieval_agent = RetrievalAgent()  # No LLM needed
         self.synthesis_agent = SynthesisAgent(llm_smart)  # Smart: answer generation
-        self.verifier_agent = VerifierAgent(llm_fast)  # Fast: consistency check
+        # Fast by default; VERIFIER_TIER=smart shares synthesis's LLM (and its prompt cache)
+        self.verifier_agent = VerifierAgent(llm_smart if VERIFIER_TIER == "smart" else llm_fast)
+        # Optional CPU cross-encoder: wide candidate set in, best few chunks out
+        self.rerank_agent = RerankAgent() if RERANK_ENABLED else None
 
         # Semantic Cache (reuses retrieval agent's embedding model)
         self.cache = SemanticCache()
+        # Stage caches, consulted when the answer cache misses
+        self.routing_cache = RoutingCache()
+        self.retrieval_cache = RetrievalCache()
 
     def _encode_query(self, query: str) -> np.ndarray:
         """Vectorize query using the retrieval agent's embedding model."""
-        return self.retrieval_agent.model.encode([query])[0]
+        with span("embedding.encode", texts=1):
+            return self.retrieval_agent.model.encode([query])[0]
+
+    def _lookup_answer(self, query_vector: np.ndarray, cache_filter: str):
+        with span("cache.semantic.lookup") as current:
+            hit = self.cache.lookup(query_vector, cache_filter)
+            current.set(hit=hit is not None)
+            return hit
+
+    @property
+    def default_k(self) -> int:
+        return RERANK_TOP_N if self.rerank_agent else DEFAULT_K
+
+    def _answer_key(self, filters: Optional[Dict[str, Any]], k: Optional[int]) -> str:
+        """
+        Answer-cache partition: the filter, plus k when it differs from the
+        default, since k changes the context an answer was generated from.
+        """
+        key = filter_key(filters)
+        if k is None or k == self.default_k:
+            return key
+        return f"{key}|k={k}"
 
-    async def process_query(self, query: str):
+    def stage_cache_stats(self) -> Dict[str, Any]:
+        return {
+            "routing": self.routing_cache.stats(),
+            "retrieval": self.retrieval_cache.stats(),
+        }
+
+    @staticmethod
+    def _with_usage(llm, fn, *args):
+        """
+        Run an agent call and read the LLM usage on the same executor thread,
+        since `LLMProvider.last_usage` is tracked per thread.
+        """
+        result = fn(*args)
+        return result, dict(llm.last_usage)
+
+    def check_cache(
+        self, query: str, filters: Optional[Dict[str, Any]] = None, k: Optional[int] = None
+    ) -> Tuple[np.ndarray, Optional[Dict[str, Any]]]:
+        """
+        Blocking cache probe used for admission decisions.
+        Returns the query vector (reusable by process_query) and the cache hit, if any.
+        """
+        query_vector = self._encode_query(query)
+        return query_vector, self._lookup_answer(
+            query_vector, self._answer_key(normalize_filter(filters), k)
+        )
+
+    async def process_query(
+        self,
+        query: str,
+        filters: Optional[Dict[str, Any]] = None,
+        query_vector: Optional[np.ndarray] = None,
+        store_in_cache: bool = True,
+        k: Optional[int] = None,
+        cache_hit: Optional[Dict[str, Any]] = None,
+        cache_checked: bool = False,
+    ):
         """
         Async execution loop with semantic caching and speculative retrieval.
+        `filters` restrict retrieval to matching chunks (see core.chunk_metadata).
+        `query_vector` skips re-encoding when the caller already embedded the query.
+        `cache_checked=True` reuses the caller's `check_cache` result (`cache_hit`)
+        instead of looking up again, so the admission decision made on it holds.
+        `store_in_cache=False` leaves caching to the caller (e.g. bulk pre-warming).
+        `k` caps the chunks sent to the LLM (default DEFAULT_K, or RERANK_TOP_N
+        with reranking); with ADAPTIVE_K_ENABLED fewer are sent when relevance drops off.
         Yields events for real-time UI updates via SSE.
         """
+        filters = normalize_filter(filters)
+        cache_filter = filter_key(filters)
+        answer_key = self._answer_key(filters, k)
         yield {"step": "start", "message": f"Processing query: {query}"}
 
         # ── Step 0: Check Semantic Cache ──
         loop = asyncio.get_event_loop()
-        query_vector = await loop.run_in_executor(None, self._encode_query, query)
-        cache_hit = self.cache.lookup(query_vector)
+        if query_vector is None:
+            query_vector = await loop.run_in_executor(None, bind(self._encode_query), query)
+        if not cache_checked:
+            cache_hit = self._lookup_answer(query_vector, answer_key)
 
         if cache_hit:
             yield {
@@ -77,28 +177,141 @@ class AgentRouter:
             "message": "Cache miss. Running full agent pipeline...",
         }
 
-        # ── Step 1: Speculative Parallel Execution ──
-        yield {
-            "step": "router",
-            "message": "⚡ Running Query Analysis + Speculative Retrieval in parallel...",
-        }
+        # ── Step 1: Stage caches, then speculative parallel execution of the rest ──
+        max_k = k or self.default_k
+        # One pool per query whatever its k, so the retrieval cache serves every k
+        if self.rerank_agent:
+            pool = RERANK_CANDIDATES
+        else:
+            pool = max(CANDIDATE_POOL, max_k) if ADAPTIVE_K_ENABLED else max_k
+        index_version = self.retrieval_agent.index_version
+        analysis = await loop.run_in_executor(
+            None, bind(self.routing_cache.get, "cache.routing.lookup"), query_vector
+        )
+        with span("cache.retrieval.lookup", k=pool) as current:
+            speculative_context = self.retrieval_cache.get(
+                index_version, query_vector, cache_filter, pool
+            )
+            current.set(hit=speculative_context is not None)
+        # A cached "no retrieval" decision makes speculative retrieval pointless
+        need_retrieval_run = speculative_context is None and (
+            analysis is None or analysis.get("needs_retrieval", False)
+        )
+
+        if analysis is not None or speculative_context is not None:
+            reused = [
+                name
+                for name, hit in [
+                    ("routing decision", analysis is not None),
+                    ("retrieval results", speculative_context is not None),
+                ]
+                if hit
+            ]
+            yield {
+                "step": "router",
+                "message": f"⚡ Stage cache hit: reusing {' + '.join(reused)}.",
+            }
+        if analysis is None and need_retrieval_run:
+            yield {
+                "step": "router",
+                "message": "⚡ Running Query Analysis + Speculative Retrieval in parallel...",
+            }
 
-        analysis_future = loop.run_in_executor(None, self.query_agent.analyze, query)
-        retrieval_future = loop.run_in_executor(None, self.retrieval_agent.retrieve, query)
+        analysis_future = (
+            loop.run_in_executor(None, bind(self.query_agent.analyze, "agent.query"), query)
+            if analysis is None
+            else None
+        )
+        retrieval_future = (
+            loop.run_in_executor(
+                None,
+                bind(self.retrieval_agent.retrieve, "agent.retrieval", k=pool),
+                query,
+                pool,
+                filters,
+            )
+            if need_retrieval_run
+            else None
+        )
 
-        analysis, speculative_context = await asyncio.gather(analysis_future, retrieval_future)
+        if analysis_future is not None:
+            analysis = await analysis_future
+            # A default taken after a parse/LLM error is not a decision worth keeping for days
+            if not analysis.get("fallback"):
+                await loop.run_in_executor(
+                    None,
+                    bind(self.routing_cache.put, "cache.routing.store"),
+                    query_vector,
+                    analysis,
+                )
+        if retrieval_future is not None:
+            speculative_context = await retrieval_future
+            self.retrieval_cache.put(
+                index_version, query_vector, cache_filter, pool, speculative_context
+            )
 
         yield {"step": "query_agent", "message": "Analysis Complete.", "data": analysis}
 
         # ── Step 2: Decide whether to keep speculative retrieval ──
         context = []
         if analysis.get("needs_retrieval", False):
-            context = speculative_context
-            yield {
-                "step": "retrieval_agent",
-                "message": f"Retrieved {len(context)} chunks (speculative hit ✅).",
-                "data": context,
-            }
+            context = speculative_context or []
+            depth = None
+            if ADAPTIVE_K_ENABLED and self.rerank_agent:
+                # The cross-encoder reorders the pool, so only drop the irrelevant tail for it
+                context, depth = cut_context(context, len(context), gap=float("inf"))
+            elif ADAPTIVE_K_ENABLED:
+                context, depth = cut_context(context, max_k)
+            elif not self.rerank_agent:
+                context = context[:max_k]
+            if self.rerank_agent and context:
+                reranked = await loop.run_in_executor(
+                    None,
+                    bind(self.rerank_agent.rerank, "agent.rerank", candidates=len(context)),
+                    query,
+                    context,
+                    max_k,
+                )
+                context = reranked["context"]
+                yield {
+                    "step": "rerank_agent",
+                    "message": (
+                        f"Reranked {reranked['stats']['candidates']} candidates, "
+                        f"kept {len(context)}."
+                    ),
+                    "data": reranked["stats"],
+                }
+            if depth is not None and not context:
+                yield {
+                    "step": "router",
+                    "message": (
+                        f"No chunk reached the relevance threshold ({RELEVANCE_THRESHOLD}) "
+                        f"among {depth['candidates']} candidates. Skipping synthesis."
+                    ),
+                    "data": depth,
+                }
+                yield {
+                    "step": "complete",
+                    "message": "No relevant context",
+                    "final_response": {
+                        "query": query,
+                        "answer": NO_RELEVANT_CONTEXT_ANSWER,
+                        "context_used": [],
+                        "verification": {
+                            "is_valid": True,
+                            "reasoning": "No relevant documents; no answer was generated.",
+                        },
+                        "no_relevant_context": True,
+                    },
+                }
+                return
+            message = f"Retrieved {len(context)} chunks (speculative hit ✅)."
+            if depth is not None:
+                message = (
+                    f"Retrieved {len(context)} of {depth['candidates']} candidates "
+                    f"(cut by {depth['cut_by']}, speculative hit ✅)."
+                )
+            yield {"step": "retrieval_agent", "message": message, "data": context}
         else:
             yield {
                 "step": "router",
@@ -110,11 +323,19 @@ class AgentRouter:
             "step": "router",
             "message": "Delegating to Synthesis Agent (Smart model)...",
         }
-        answer = await loop.run_in_executor(None, self.synthesis_agent.synthesize, query, context)
+        answer, synthesis_usage = await loop.run_in_executor(
+            None,
+            bind(self._with_usage, "agent.synthesis", chunks=len(context)),
+            self.synthesis_agent.llm,
+            self.synthesis_agent.synthesize,
+            query,
+            context,
+        )
         yield {
             "step": "synthesis_agent",
             "message": "Answer generated.",
             "data": {"answer": answer},
+            "usage": synthesis_usage,
         }
 
         # ── Step 4: Verification (Fast model) ──
@@ -122,18 +343,27 @@ class AgentRouter:
             "step": "router",
             "message": "Delegating to Verifier Agent (Fast model)...",
         }
-        verification = await loop.run_in_executor(
-            None, self.verifier_agent.verify, query, answer, context
+        verification, verification_usage = await loop.run_in_executor(
+            None,
+            bind(self._with_usage, "agent.verifier"),
+            self.verifier_agent.llm,
+            self.verifier_agent.verify,
+            query,
+            answer,
+            context,
         )
         yield {
             "step": "verifier_agent",
             "message": "Verification complete.",
             "data": verification,
+            "usage": verification_usage,
         }
 
         # ── Store in Cache ──
         sources = [chunk.get("source", "") for chunk in context] if context else []
-        self.cache.store(query, query_vector, answer, sources, verification)
+        if store_in_cache:
+            with span("cache.semantic.store"):
+                self.cache.store(query, query_vector, answer, sources, verification, answer_key)
 
         # ── Final Decision ──
         final_response = {
@@ -141,6 +371,7 @@ class AgentRouter:
             "answer": answer,
             "context_used": context,
             "verification": verification,
+            "usage": {"synthesis": synthesis_usage, "verification": verification_usage},
         }
 
         if not verification.get("is_valid", False):
@@ -0,0 +1,479 @@
+"""
+Semantic Cache Backends
+=======================
+Storage behind SemanticCache. A backend returns the most similar cached
+entry for a query vector (within one filter partition); SemanticCache applies
+the similarity threshold.
+
+- SqliteCacheBackend: single-node, `data/cache.db` (the default).
+- RemoteCacheBackend: a cache server shared by every API node, spoken to
+  over a small HTTP/JSON protocol (see core.cache_server).
+- ReplicatedCacheBackend: wraps a remote backend with a per-node in-memory
+  L1 (read-through) and asynchronous, batched write replication. Other
+  nodes' invalidations reach the L1 within one replication interval via the
+  server's generation token. Queued writes carry the generation they were
+  made under; the server rejects any that an invalidation has since overtaken.
+"""
+
+import atexit
+import base64
+import json
+import sqlite3
+import threading
+import time
+import urllib.request
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.config import (
+    CACHE_BREAKER_SECONDS,
+    CACHE_L1_SIZE,
+    CACHE_REPLICATION_BATCH,
+    CACHE_REPLICATION_INTERVAL_SECONDS,
+    CACHE_SERVER_TIMEOUT_SECONDS,
+)
+
+# (similarity, entry): entry has query, query_vector, answer, sources and verification
+Match = Tuple[float, Dict[str, Any]]
+
+
+def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    if a.shape != b.shape:
+        return 0.0
+    dot = np.dot(a, b)
+    norm = np.linalg.norm(a) * np.linalg.norm(b)
+    return float(dot / norm) if norm > 0 else 0.0
+
+
+def encode_vector(vector: np.ndarray) -> str:
+    return base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode("ascii")
+
+
+def decode_vector(data: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(data), dtype=np.float32)
+
+
+def _cites(entry: Dict[str, Any], sources: List[str]) -> bool:
+    return any(source in sources for source in entry.get("sources") or [])
+
+
+class CacheBackend(ABC):
+    """Abstract base class for semantic cache backends."""
+
+    @abstractmethod
+    def nearest(self, query_vector: np.ndarray, filter_key: str = "") -> Optional[Match]:
+        """Most similar entry stored under `filter_key`, or None if there are none."""
+        pass
+
+    @abstractmethod
+    def store_many(self, entries: List[Dict[str, Any]], sync: bool = False):
+        """
+        Entries are dicts with query, query_vector, answer, sources, verification, filter_key.
+        `sync=True` returns only once the entries are durably stored (or raises).
+        """
+        pass
+
+    @abstractmethod
+    def invalidate_sources(self, sources: List[str]) -> int:
+        """Deletes entries citing any of `sources`; returns how many were removed."""
+        pass
+
+    @abstractmethod
+    def clear(self):
+        """Deletes every entry."""
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+    def flush(self):
+        """Ships writes still buffered in this process, if the backend buffers any."""
+
+    def close(self):
+        self.flush()
+
+
+class SqliteCacheBackend(CacheBackend):
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_db()
+
+    def _init_db(self):
+        conn = sqlite3.connect(str(self.db_path))
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS query_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                query TEXT NOT NULL,
+                query_vector BLOB NOT NULL,
+                answer TEXT NOT NULL,
+                sources TEXT,
+                verification TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(query_cache)")}
+        if "filter_key" not in columns:
+            conn.execute("ALTER TABLE query_cache ADD COLUMN filter_key TEXT NOT NULL DEFAULT ''")
+        conn.commit()
+        conn.close()
+
+    def nearest(self, query_vector: np.ndarray, filter_key: str = "") -> Optional[Match]:
+        conn = sqlite3.connect(str(self.db_path))
+        rows = conn.execute(
+            "SELECT query, query_vector, answer, sources, verification FROM query_cache "
+            "WHERE filter_key = ?",
+            (filter_key,),
+        ).fetchall()
+        conn.close()
+
+        best_score = -1.0
+        best_row = None
+        for row in rows:
+            cached_vec = np.frombuffer(row[1], dtype=np.float32)
+            score = cosine_similarity(query_vector, cached_vec)
+            if score > best_score:
+                best_score = score
+                best_row = row
+
+        if best_row is None:
+            return None
+        return best_score, {
+            "query": best_row[0],
+            "query_vector": np.frombuffer(best_row[1], dtype=np.float32),
+            "answer": best_row[2],
+            "sources": json.loads(best_row[3]) if best_row[3] else [],
+            "verification": json.loads(best_row[4]) if best_row[4] else None,
+        }
+
+    def store_many(self, entries: List[Dict[str, Any]], sync: bool = False):
+        conn = sqlite3.connect(str(self.db_path))
+        with conn:
+            conn.executemany(
+                "INSERT INTO query_cache "
+                "(query, query_vector, answer, sources, verification, filter_key) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        e["query"],
+                        np.asarray(e["query_vector"]).astype(np.float32).tobytes(),
+                        e["answer"],
+                        json.dumps(e.get("sources") or []),
+                        json.dumps(e.get("verification") or {}),
+                        e.get("filter_key", ""),
+                    )
+                    for e in entries
+                ],
+            )
+        conn.close()
+
+    def invalidate_sources(self, sources: List[str]) -> int:
+        if not sources:
+            return 0
+        conn = sqlite3.connect(str(self.db_path))
+        with conn:
+            cursor = conn.execute(
+                "DELETE FROM query_cache WHERE EXISTS "
+                "(SELECT 1 FROM json_each(query_cache.sources) "
+                f"WHERE json_each.value IN ({', '.join('?' * len(sources))}))",
+                list(sources),
+            )
+        conn.close()
+        return cursor.rowcount
+
+    def clear(self):
+        conn = sqlite3.connect(str(self.db_path))
+        conn.execute("DELETE FROM query_cache")
+        conn.commit()
+        conn.close()
+
+
+class RemoteCacheBackend(CacheBackend):
+    """Client for core.cache_server. Every call is one HTTP round trip."""
+
+    def __init__(self, url: str, timeout: float = CACHE_SERVER_TIMEOUT_SECONDS):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        # (previous, new) generation around this client's last invalidate/clear
+        self.last_bump = None
+
+    def _call(self, path: str, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(
+            self.url + path, data=data, headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def nearest(self, query_vector: np.ndarray, filter_key: str = "") -> Optional[Match]:
+        result = self._call(
+            "/lookup", {"query_vector": encode_vector(query_vector), "filter_key": filter_key}
+        )
+        entry = result["entry"]
+        if entry is None:
+            return None
+        return result["similarity"], {**entry, "query_vector": decode_vector(entry["query_vector"])}
+
+    def store_many(self, entries: List[Dict[str, Any]], sync: bool = False) -> int:
+        """Returns how many entries the server rejected as older than its generation."""
+        result = self._call(
+            "/store",
+            {"entries": [{**e, "query_vector": encode_vector(e["query_vector"])} for e in entries]},
+        )
+        return result.get("rejected", 0)
+
+    def invalidate_sources(self, sources: List[str]) -> int:
+        result = self._call("/invalidate", {"sources": list(sources)})
+        self.last_bump = result.get("previous"), result["generation"]
+        return result["removed"]
+
+    def clear(self):
+        result = self._call("/clear", {})
+        self.last_bump = result.get("previous"), result["generation"]
+
+    def generation(self) -> str:
+        """Changes whenever the server drops entries (invalidate / clear / restart)."""
+        return self._call("/generation")["generation"]
+
+
+class ReplicatedCacheBackend(CacheBackend):
+    """
+    Per-node L1 in front of a shared remote backend.
+
+    Reads: L1 first; on an L1 miss (nothing at or above `threshold`) the remote
+    is asked and its hit is copied into the L1. Writes land in the L1
+    immediately and are shipped to the remote in batches by a background
+    thread, so the request path never waits on the network for a store.
+    Bulk writers pass `sync=True` to write through to the remote instead, and
+    whatever is still pending is flushed when the process exits.
+    A remote that is down degrades to L1-only caching instead of failing queries:
+    after any failed call a circuit breaker keeps lookups off the remote for
+    `breaker_seconds`, so a hung server costs one timeout, not one per query.
+    Background replication keeps probing it and closes the breaker on success.
+    """
+
+    def __init__(
+        self,
+        remote: RemoteCacheBackend,
+        threshold: float,
+        l1_size: int = CACHE_L1_SIZE,
+        batch_size: int = CACHE_REPLICATION_BATCH,
+        interval: float = CACHE_REPLICATION_INTERVAL_SECONDS,
+        max_pending: int = 10000,
+        breaker_seconds: float = CACHE_BREAKER_SECONDS,
+    ):
+        self.remote = remote
+        self.threshold = threshold
+        self.l1_size = l1_size
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self.breaker_seconds = breaker_seconds
+        self._remote_down_until = 0.0
+
+        self._l1: "OrderedDict[tuple, Tuple[np.ndarray, Dict[str, Any]]]" = OrderedDict()
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._generation = None
+        # Bumped by local clear/invalidate, so a failed flush does not re-queue dropped writes
+        self._epoch = 0
+        self.counters = {
+            "l1_hits": 0,
+            "remote_hits": 0,
+            "misses": 0,
+            "replicated": 0,
+            "remote_errors": 0,
+            "remote_skipped": 0,
+            "rejected_stale": 0,
+        }
+        # Writes are stamped with the generation they were made under, so learn it now
+        self._sync_generation()
+        self._worker = threading.Thread(
+            target=self._replicate_loop, name="cache-replicator", daemon=True
+        )
+        self._worker.start()
+        atexit.register(self.close)
+
+    # ─── Circuit breaker ───
+
+    def _remote_failed(self):
+        self.counters["remote_errors"] += 1
+        self._remote_down_until = time.monotonic() + self.breaker_seconds
+
+    @property
+    def remote_available(self) -> bool:
+        return time.monotonic() >= self._remote_down_until
+
+    # ─── L1 ───
+
+    def _l1_put(self, filter_key: str, entry: Dict[str, Any]):
+        # Caller holds the lock
+        key = (filter_key, entry["query"])
+        self._l1[key] = (np.asarray(entry["query_vector"], dtype=np.float32), entry)
+        self._l1.move_to_end(key)
+        while len(self._l1) > self.l1_size:
+            self._l1.popitem(last=False)
+
+    def _l1_nearest(self, query_vector: np.ndarray, filter_key: str) -> Optional[Match]:
+        # Caller holds the lock
+        best = None
+        for key, (vector, entry) in self._l1.items():
+            if key[0] != filter_key:
+                continue
+            score = cosine_similarity(query_vector, vector)
+            if best is None or score > best[0]:
+                best = (score, entry, key)
+        if best is None:
+            return None
+        self._l1.move_to_end(best[2])
+        return best[0], best[1]
+
+    # ─── CacheBackend ───
+
+    def nearest(self, query_vector: np.ndarray, filter_key: str = "") -> Optional[Match]:
+        with self._lock:
+            local = self._l1_nearest(query_vector, filter_key)
+        if local is not None and local[0] >= self.threshold:
+            self.counters["l1_hits"] += 1
+            return local
+
+        remote = None
+        if not self.remote_available:
+            self.counters["remote_skipped"] += 1
+        else:
+            try:
+                remote = self.remote.nearest(query_vector, filter_key)
+            except Exception:
+                self._remote_failed()
+        if remote is not None and remote[0] >= self.threshold:
+            self.counters["remote_hits"] += 1
+            with self._lock:
+                self._l1_put(filter_key, remote[1])
+            return remote
+
+        self.counters["misses"] += 1
+        candidates = [m for m in (local, remote) if m is not None]
+        return max(candidates, key=lambda m: m[0]) if candidates else None
+
+    def store_many(self, entries: List[Dict[str, Any]], sync: bool = False):
+        if sync:
+            # Write-through: raises if the remote is unreachable, so nothing is lost silently
+            for start in range(0, len(entries), self.batch_size):
+                end = start + self.batch_size
+                batch = entries[start:end]
+                self.remote.store_many(batch)
+                self.counters["replicated"] += len(batch)
+        with self._lock:
+            for e in entries:
+                self._l1_put(
+                    e.get("filter_key", ""),
+                    {
+                        "query": e["query"],
+                        "query_vector": e["query_vector"],
+                        "answer": e["answer"],
+                        "sources": e.get("sources") or [],
+                        "verification": e.get("verification"),
+                    },
+                )
+            if not sync:
+                self._pending.extend({**e, "generation": self._generation} for e in entries)
+            # A long outage must not grow memory without bound: drop the oldest writes
+            del self._pending[: max(0, len(self._pending) - self.max_pending)]
+            if len(self._pending) >= self.batch_size:
+                self._wake.set()
+
+    def invalidate_sources(self, sources: List[str]) -> int:
+        with self._lock:
+            dropped = [key for key, (_, entry) in self._l1.items() if _cites(entry, sources)]
+            for key in dropped:
+                del self._l1[key]
+            self._pending = [e for e in self._pending if not _cites(e, sources)]
+            self._epoch += 1
+        try:
+            removed = self.remote.invalidate_sources(sources)
+        except Exception:
+            self._remote_failed()
+            return len(dropped)
+        self._adopt_own_bump()
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._l1.clear()
+            self._pending.clear()
+            self._epoch += 1
+        try:
+            self.remote.clear()
+        except Exception as e:
+            self._remote_failed()
+            print(f"Warning: Could not clear the shared semantic cache: {e}")
+            return
+        self._adopt_own_bump()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.counters, "l1_entries": len(self._l1), "pending": len(self._pending)}
+
+    # ─── Replication ───
+
+    def flush(self):
+        """Ships every pending write now (also called by the background thread)."""
+        while True:
+            with self._lock:
+                batch = self._pending[: self.batch_size]
+                del self._pending[: len(batch)]
+                epoch = self._epoch
+            if not batch:
+                return
+            try:
+                rejected = self.remote.store_many(batch)
+            except Exception:
+                self._remote_failed()
+                with self._lock:
+                    # Retried on the next round, unless a clear/invalidate dropped writes meanwhile
+                    if self._epoch == epoch:
+                        self._pending[:0] = batch
+                return
+            self.counters["rejected_stale"] += rejected
+            self.counters["replicated"] += len(batch) - rejected
+
+    def _adopt_own_bump(self):
+        """
+        Our own invalidate/clear bumped the server generation. Pending writes were
+        already filtered locally, so restamp them instead of letting the server
+        reject them - unless another node bumped it in between (then sync as usual).
+        """
+        previous, generation = self.remote.last_bump
+        with self._lock:
+            if previous != self._generation:
+                return
+            self._pending = [{**e, "generation": generation} for e in self._pending]
+            self._generation = generation
+
+    def _sync_generation(self):
+        try:
+            generation = self.remote.generation()
+        except Exception:
+            self._remote_failed()
+            return
+        self._remote_down_until = 0.0  # the server answers again
+        if self._generation is not None and generation != self._generation:
+            # Another node invalidated or cleared entries we may hold, or may still ship
+            with self._lock:
+                self._l1.clear()
+                stale = [e for e in self._pending if e.get("generation") != generation]
+                self._pending = [e for e in self._pending if e.get("generation") == generation]
+            self.counters["rejected_stale"] += len(stale)
+        self._generation = generation
+
+    def _replicate_loop(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+            self._sync_generation()
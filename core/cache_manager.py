@@ -5,74 +5,70 @@ Caches query-answer pairs indexed by their embedding vector.
 On a new query, computes cosine similarity against cached queries.
 If above threshold (default 0.96), returns the cached answer instantly
 without invoking the full agent pipeline.
+
+Entries are partitioned by `filter_key` (see core.chunk_metadata.filter_key),
+so answers produced under a source/tag filter never serve unfiltered queries
+and vice versa.
+
+Storage is pluggable (see core.cache_backends): a per-node SQLite file by
+default, or with CACHE_BACKEND=remote a cache server shared by all API nodes,
+fronted by a local L1 with batched write replication.
 """
 
-import json
-import sqlite3
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 import numpy as np
 
+from core.cache_backends import (
+    CacheBackend,
+    RemoteCacheBackend,
+    ReplicatedCacheBackend,
+    SqliteCacheBackend,
+)
+from core.config import CACHE_BACKEND, CACHE_SERVER_URL
+
 CACHE_DB_PATH = Path(__file__).parent.parent / "data" / "cache.db"
 DEFAULT_THRESHOLD = 0.96
 
 
+def make_backend(db_path: Path, threshold: float, kind: str = CACHE_BACKEND) -> CacheBackend:
+    if kind == "remote":
+        return ReplicatedCacheBackend(RemoteCacheBackend(CACHE_SERVER_URL), threshold)
+    if kind == "sqlite":
+        return SqliteCacheBackend(db_path)
+    raise ValueError(f"Unknown CACHE_BACKEND: {kind!r}")
+
+
 class SemanticCache:
-    def __init__(self, db_path: Path = CACHE_DB_PATH, threshold: float = DEFAULT_THRESHOLD):
+    def __init__(
+        self,
+        db_path: Path = CACHE_DB_PATH,
+        threshold: float = DEFAULT_THRESHOLD,
+        backend: Optional[CacheBackend] = None,
+    ):
         self.threshold = threshold
         self.db_path = db_path
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self._init_db()
-
-    def _init_db(self):
-        conn = sqlite3.connect(str(self.db_path))
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS query_cache (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                query TEXT NOT NULL,
-                query_vector BLOB NOT NULL,
-                answer TEXT NOT NULL,
-                sources TEXT,
-                verification TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        conn.commit()
-        conn.close()
-
-    def lookup(self, query_vector: np.ndarray) -> Optional[Dict[str, Any]]:
+        self.backend = backend or make_backend(db_path, threshold)
+
+    def lookup(self, query_vector: np.ndarray, filter_key: str = "") -> Optional[Dict[str, Any]]:
         """
-        Check if a similar query exists in cache.
+        Check if a similar query exists in cache under the same filter.
         Returns cached response if similarity > threshold, else None.
         """
-        conn = sqlite3.connect(str(self.db_path))
-        rows = conn.execute(
-            "SELECT query, query_vector, answer, sources, verification FROM query_cache"
-        ).fetchall()
-        conn.close()
-
-        if not rows:
+        match = self.backend.nearest(query_vector, filter_key)
+        if match is None:
             return None
 
-        best_score = -1.0
-        best_row = None
-
-        for row in rows:
-            cached_vec = np.frombuffer(row[1], dtype=np.float32)
-            score = self._cosine_similarity(query_vector, cached_vec)
-            if score > best_score:
-                best_score = score
-                best_row = row
-
-        if best_score >= self.threshold and best_row:
+        score, entry = match
+        if score >= self.threshold:
             return {
                 "cached": True,
-                "similarity": round(float(best_score), 4),
-                "query": best_row[0],
-                "answer": best_row[2],
-                "sources": json.loads(best_row[3]) if best_row[3] else [],
-                "verification": json.loads(best_row[4]) if best_row[4] else None,
+                "similarity": round(float(score), 4),
+                "query": entry["query"],
+                "answer": entry["answer"],
+                "sources": entry.get("sources") or [],
+                "verification": entry.get("verification"),
             }
 
         return None
@@ -84,34 +80,43 @@ class SemanticCache:
         answer: str,
         sources: list = None,
         verification: dict = None,
+        filter_key: str = "",
     ):
         """Store a query-answer pair in the cache."""
-        conn = sqlite3.connect(str(self.db_path))
-        conn.execute(
-            "INSERT INTO query_cache (query, query_vector, answer, sources, verification) "
-            "VALUES (?, ?, ?, ?, ?)",
-            (
-                query,
-                query_vector.astype(np.float32).tobytes(),
-                answer,
-                json.dumps(sources or []),
-                json.dumps(verification or {}),
-            ),
+        self.store_many(
+            [
+                {
+                    "query": query,
+                    "query_vector": query_vector,
+                    "answer": answer,
+                    "sources": sources,
+                    "verification": verification,
+                    "filter_key": filter_key,
+                }
+            ]
         )
-        conn.commit()
-        conn.close()
+
+    def store_many(self, entries: List[Dict[str, Any]], sync: bool = False):
+        """
+        Bulk-insert entries (dicts with the same fields as `store`) in one transaction.
+        `sync=True` waits until a shared cache has them, instead of replicating later.
+        """
+        self.backend.store_many(entries, sync)
+
+    def invalidate_sources(self, sources: List[str]) -> int:
+        """Deletes cached answers citing any of `sources`. Returns how many were removed."""
+        return self.backend.invalidate_sources(sources)
 
     def clear(self):
         """Clear all cached entries."""
-        conn = sqlite3.connect(str(self.db_path))
-        conn.execute("DELETE FROM query_cache")
-        conn.commit()
-        conn.close()
-
-    @staticmethod
-    def _cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
-        if a.shape != b.shape:
-            return 0.0
-        dot = np.dot(a, b)
-        norm = np.linalg.norm(a) * np.linalg.norm(b)
-        return float(dot / norm) if norm > 0 else 0.0
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.backend.stats()
+
+    def flush(self):
+        """Ships writes still waiting for replication to the shared cache."""
+        self.backend.flush()
+
+    def close(self):
+        self.backend.close()
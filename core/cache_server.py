@@ -0,0 +1,165 @@
+"""
+Shared Semantic Cache Server
+============================
+Serves a CacheBackend (SQLite by default) over HTTP/JSON so every API node
+can share one semantic cache (CACHE_BACKEND=remote, CACHE_SERVER_URL=...).
+Vectors travel as base64-encoded float32.
+
+  POST /lookup      {"query_vector", "filter_key"} -> {"similarity", "entry"}
+  POST /store       {"entries": [...]}             -> {"stored", "rejected"}
+  POST /invalidate  {"sources": [...]}             -> {"removed", "generation", "previous"}
+  POST /clear       {}                             -> {"generation", "previous"}
+  GET  /generation                                 -> {"generation"}
+
+The generation token changes on every invalidation or clear, so nodes can
+discard their local L1 copies. Entries stamped with an older generation
+(queued on a node before an invalidation) are rejected rather than stored,
+since they may cite the sources that were just invalidated.
+
+It runs in-process as well (CacheServer(...).start()), which is how the
+tests stand up a shared cache for several simulated nodes.
+
+Usage: python -m core.cache_server [--port 8100] [--db data/shared_cache.db]
+"""
+
+import argparse
+import itertools
+import json
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict
+
+from core.cache_backends import CacheBackend, SqliteCacheBackend, decode_vector, encode_vector
+from core.config import DATA_DIR
+
+
+class CacheServer:
+    def __init__(self, backend: CacheBackend, host: str = "127.0.0.1", port: int = 0):
+        self.backend = backend
+        self._boot_id = uuid.uuid4().hex[:8]
+        self._counter = itertools.count()
+        self.generation = f"{self._boot_id}:{next(self._counter)}"
+        # Serializes the generation check in store() against invalidate()/clear()
+        self._write_lock = threading.Lock()
+        self._thread = None
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/generation":
+                    self._reply({"generation": server.generation})
+                else:
+                    self._reply({"error": "not found"}, 404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                route = {
+                    "/lookup": server.lookup,
+                    "/store": server.store,
+                    "/invalidate": server.invalidate,
+                    "/clear": server.clear,
+                }.get(self.path)
+                if route is None:
+                    self._reply({"error": "not found"}, 404)
+                    return
+                try:
+                    self._reply(route(payload))
+                except (KeyError, ValueError) as e:
+                    self._reply({"error": str(e)}, 400)
+
+            def _reply(self, body: Dict[str, Any], status: int = 200):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass  # one line per cache call is too noisy
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _bump_generation(self):
+        self.generation = f"{self._boot_id}:{next(self._counter)}"
+
+    # ─── Routes ───
+
+    def lookup(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        match = self.backend.nearest(
+            decode_vector(payload["query_vector"]), payload.get("filter_key", "")
+        )
+        if match is None:
+            return {"similarity": None, "entry": None}
+        score, entry = match
+        return {
+            "similarity": score,
+            "entry": {**entry, "query_vector": encode_vector(entry["query_vector"])},
+        }
+
+    def store(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        with self._write_lock:
+            entries = [
+                {**e, "query_vector": decode_vector(e["query_vector"])}
+                for e in payload["entries"]
+                if e.get("generation") in (None, self.generation)
+            ]
+            self.backend.store_many(entries)
+        return {"stored": len(entries), "rejected": len(payload["entries"]) - len(entries)}
+
+    def invalidate(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        # Bumped even if nothing was removed: a node may still hold unsent writes citing them
+        with self._write_lock:
+            previous = self.generation
+            removed = self.backend.invalidate_sources(payload["sources"])
+            self._bump_generation()
+        return {"removed": removed, "generation": self.generation, "previous": previous}
+
+    def clear(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        with self._write_lock:
+            previous = self.generation
+            self.backend.clear()
+            self._bump_generation()
+        return {"generation": self.generation, "previous": previous}
+
+    # ─── Lifecycle ───
+
+    def start(self) -> "CacheServer":
+        """Serves on a background thread; returns self for chaining."""
+        self._thread = threading.Thread(
+            target=self.httpd.serve_forever, name="cache-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self.httpd.shutdown()
+            self._thread = None
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared semantic cache server.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--db", type=Path, default=DATA_DIR / "shared_cache.db")
+    args = parser.parse_args()
+
+    server = CacheServer(SqliteCacheBackend(args.db), args.host, args.port)
+    print(f"Semantic cache server on {server.url} (db: {args.db})")
+    server.httpd.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
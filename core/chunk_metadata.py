@@ -0,0 +1,160 @@
+"""
+Columnar Chunk Metadata & Search Filters
+========================================
+Per-chunk metadata is stored as numpy columns instead of per-chunk objects:
+  - source_id:   int32 index into `source_names` (dictionary-encoded file names)
+  - uploaded_at: float64 unix timestamp of the source file
+  - tag_mask:    uint64 bitmask over `tag_names` (up to 64 distinct tags)
+
+A filter is a plain dict such as
+    {"sources": ["a.txt"], "tags": ["security"], "uploaded_after": 1700000000}
+and is evaluated to a row mask that the FAISS search is restricted to.
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+MAX_TAGS = 64
+FILTER_FIELDS = ("sources", "tags", "uploaded_after", "uploaded_before")
+
+
+class ChunkMetadata:
+    def __init__(
+        self,
+        source_names: List[str],
+        source_id: np.ndarray,
+        uploaded_at: np.ndarray,
+        tag_names: List[str],
+        tag_mask: np.ndarray,
+    ):
+        self.source_names = source_names
+        self.source_id = np.asarray(source_id, dtype=np.int32)
+        self.uploaded_at = np.asarray(uploaded_at, dtype=np.float64)
+        self.tag_names = tag_names
+        self.tag_mask = np.asarray(tag_mask, dtype=np.uint64)
+
+    def __len__(self) -> int:
+        return len(self.source_id)
+
+    @classmethod
+    def build(
+        cls, sources: List[str], doc_info: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> "ChunkMetadata":
+        """
+        Encodes per-chunk source names into columns. `doc_info` maps a source
+        name to {"uploaded_at": float, "tags": [str, ...]}.
+        """
+        doc_info = doc_info or {}
+        source_names = sorted(set(sources))
+        source_index = {name: i for i, name in enumerate(source_names)}
+        tag_names = sorted(
+            {t for name in source_names for t in doc_info.get(name, {}).get("tags", [])}
+        )
+        if len(tag_names) > MAX_TAGS:
+            raise ValueError(
+                f"At most {MAX_TAGS} distinct tags are supported, got {len(tag_names)}"
+            )
+        tag_bit = {tag: np.uint64(1) << np.uint64(i) for i, tag in enumerate(tag_names)}
+
+        per_source_time = np.zeros(len(source_names), dtype=np.float64)
+        per_source_mask = np.zeros(len(source_names), dtype=np.uint64)
+        for name, i in source_index.items():
+            info = doc_info.get(name, {})
+            per_source_time[i] = info.get("uploaded_at", 0.0)
+            for tag in info.get("tags", []):
+                per_source_mask[i] |= tag_bit[tag]
+
+        source_id = np.array([source_index[s] for s in sources], dtype=np.int32)
+        return cls(
+            source_names,
+            source_id,
+            per_source_time[source_id],
+            tag_names,
+            per_source_mask[source_id],
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ChunkMetadata":
+        return cls(
+            data["source_names"],
+            data["source_id"],
+            data["uploaded_at"],
+            data["tag_names"],
+            data["tag_mask"],
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "source_names": self.source_names,
+            "source_id": self.source_id,
+            "uploaded_at": self.uploaded_at,
+            "tag_names": self.tag_names,
+            "tag_mask": self.tag_mask,
+        }
+
+    def source(self, row: int) -> str:
+        return self.source_names[self.source_id[row]]
+
+    def tags(self, row: int) -> List[str]:
+        mask = int(self.tag_mask[row])
+        return [tag for i, tag in enumerate(self.tag_names) if mask >> i & 1]
+
+    def source_info(self) -> Dict[str, Dict[str, Any]]:
+        """Inverse of `build`: the doc_info of every source present in these rows."""
+        info = {}
+        for i, name in enumerate(self.source_names):
+            rows = np.flatnonzero(self.source_id == i)
+            if len(rows):
+                info[name] = {
+                    "uploaded_at": float(self.uploaded_at[rows[0]]),
+                    "tags": self.tags(rows[0]),
+                }
+        return info
+
+    def mask(self, filters: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Boolean row mask for `filters` (all conditions must hold)."""
+        keep = np.ones(len(self), dtype=bool)
+        if not filters:
+            return keep
+
+        if filters.get("sources"):
+            wanted = [i for i, name in enumerate(self.source_names) if name in filters["sources"]]
+            keep &= np.isin(self.source_id, wanted)
+        if filters.get("tags"):
+            # Every requested tag must be present; unknown tags match nothing
+            if any(tag not in self.tag_names for tag in filters["tags"]):
+                return np.zeros(len(self), dtype=bool)
+            required = np.uint64(0)
+            for tag in filters["tags"]:
+                required |= np.uint64(1) << np.uint64(self.tag_names.index(tag))
+            keep &= (self.tag_mask & required) == required
+        if filters.get("uploaded_after") is not None:
+            keep &= self.uploaded_at >= float(filters["uploaded_after"])
+        if filters.get("uploaded_before") is not None:
+            keep &= self.uploaded_at < float(filters["uploaded_before"])
+        return keep
+
+
+def normalize_filter(filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Drops empty conditions and sorts lists, so equivalent filters compare equal."""
+    if not filters:
+        return None
+    unknown = set(filters) - set(FILTER_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown filter fields: {sorted(unknown)}")
+    normalized = {}
+    for field in ("sources", "tags"):
+        if filters.get(field):
+            normalized[field] = sorted(set(filters[field]))
+    for field in ("uploaded_after", "uploaded_before"):
+        if filters.get(field) is not None:
+            normalized[field] = float(filters[field])
+    return normalized or None
+
+
+def filter_key(filters: Optional[Dict[str, Any]]) -> str:
+    """Canonical string for cache keys; "" means unfiltered."""
+    normalized = normalize_filter(filters)
+    return json.dumps(normalized, sort_keys=True) if normalized else ""
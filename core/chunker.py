@@ -0,0 +1,193 @@
+"""
+Size-Aware Chunker
+==================
+Splits a document into overlapping windows measured in characters or tokens.
+Windows are packed from whole sentences, prefer to end on paragraph
+boundaries, and short lines are merged until a chunk reaches the minimum
+size. Every chunk records the byte offsets of its span in the source file.
+"""
+
+import re
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Any, Dict, List, Tuple
+
+from core.config import CHUNK_OVERLAP, CHUNK_SIZE, CHUNK_UNIT, MIN_CHUNK_SIZE
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+# CJK full stops end a sentence without trailing whitespace
+_SENTENCE_RE = re.compile(r"[^\n]*?(?:[.!?](?=\s)|[。！？]|$)", re.MULTILINE)
+_TOKEN_RE = re.compile(r"\S+")
+
+
+class Chunker:
+    """
+    Packs sentences into windows of at most `chunk_size` units (chars or tokens),
+    carrying up to `overlap` units of trailing sentences into the next window.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = CHUNK_SIZE,
+        overlap: int = CHUNK_OVERLAP,
+        min_chunk_size: int = MIN_CHUNK_SIZE,
+        unit: str = CHUNK_UNIT,
+    ):
+        if unit not in ("chars", "tokens"):
+            raise ValueError(f"Unknown chunk unit: {unit!r} (expected 'chars' or 'tokens')")
+        if not 0 <= overlap < chunk_size:
+            raise ValueError("overlap must be >= 0 and smaller than chunk_size")
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.min_chunk_size = min(min_chunk_size, chunk_size)
+        self.unit = unit
+
+    def measure(self, text: str) -> int:
+        """Length of `text` in the configured unit."""
+        if self.unit == "tokens":
+            return len(_TOKEN_RE.findall(text))
+        return len(text)
+
+    def _measure_span(self, text: str, start: int, end: int) -> int:
+        return self.measure(text[start:end])
+
+    def split_text(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Chunks `text` and returns dicts with "content", "start_byte" and "end_byte".
+        Byte offsets refer to the UTF-8 encoding of `text`.
+        """
+        spans = self._split_spans(text)
+        byte_offsets = _byte_offsets(text)
+        return [
+            {
+                "content": text[start:end],
+                "start_byte": byte_offsets[start],
+                "end_byte": byte_offsets[end],
+            }
+            for start, end in spans
+        ]
+
+    def split_file(self, path: str) -> List[Dict[str, Any]]:
+        """Chunks a UTF-8 text file; offsets index into the file's bytes."""
+        with open(path, "rb") as f:
+            raw = f.read()
+        return self.split_text(raw.decode("utf-8"))
+
+    # ─── Internals ───
+
+    def _split_spans(self, text: str) -> List[Tuple[int, int]]:
+        units = self._sentence_units(text)
+        chunks: List[Tuple[int, int]] = []
+        current: List[Tuple[int, int]] = []
+
+        for start, end, new_paragraph in units:
+            if self._measure_span(text, start, end) > self.chunk_size:
+                # A single sentence larger than a window: flush, then hard-split it
+                if current:
+                    chunks.append((current[0][0], current[-1][1]))
+                    current = []
+                chunks.extend(self._hard_split(text, start, end))
+                continue
+
+            if current:
+                current_len = self._measure_span(text, current[0][0], current[-1][1])
+                soft_break = new_paragraph and current_len >= max(
+                    self.min_chunk_size, self.chunk_size // 2
+                )
+                if soft_break or self._measure_span(text, current[0][0], end) > self.chunk_size:
+                    chunks.append((current[0][0], current[-1][1]))
+                    current = self._overlap_tail(text, current, end)
+
+            current.append((start, end))
+
+        if current:
+            tail = (current[0][0], current[-1][1])
+            short = self._measure_span(text, tail[0], tail[1]) < self.min_chunk_size
+            if (
+                chunks
+                and short
+                and self._measure_span(text, chunks[-1][0], tail[1]) <= self.chunk_size
+            ):
+                # Merge a short tail into the previous chunk instead of emitting a tiny vector
+                chunks[-1] = (chunks[-1][0], tail[1])
+            else:
+                chunks.append(tail)
+
+        return chunks
+
+    def _overlap_tail(
+        self, text: str, units: List[Tuple[int, int]], next_end: int
+    ) -> List[Tuple[int, int]]:
+        """Trailing sentences (within the overlap budget) to repeat in the next window."""
+        tail: List[Tuple[int, int]] = []
+        for unit in reversed(units[1:]):
+            if (
+                self._measure_span(text, unit[0], units[-1][1]) > self.overlap
+                or self._measure_span(text, unit[0], next_end) > self.chunk_size
+            ):
+                break
+            tail.insert(0, unit)
+        return tail
+
+    def _hard_split(self, text: str, start: int, end: int) -> List[Tuple[int, int]]:
+        """
+        Sliding windows over one oversized sentence, cut on whitespace. A single
+        word longer than a window (CJK text, URLs) is cut into fixed-width slices
+        that overlap by `overlap` characters.
+        """
+        words = []
+        for m in _TOKEN_RE.finditer(text[start:end]):
+            word_start, word_end = m.start() + start, m.end() + start
+            if self.unit == "tokens" or word_end - word_start <= self.chunk_size:
+                words.append((word_start, word_end))
+                continue
+            step = self.chunk_size - self.overlap
+            for piece_start in range(word_start, word_end, step):
+                words.append((piece_start, min(piece_start + self.chunk_size, word_end)))
+                if piece_start + self.chunk_size >= word_end:
+                    break
+
+        def span_len(i: int, j: int) -> int:
+            if self.unit == "tokens":
+                return j - i + 1
+            return words[j][1] - words[i][0]
+
+        windows: List[Tuple[int, int]] = []
+        i = 0
+        while i < len(words):
+            j = i
+            while j + 1 < len(words) and span_len(i, j + 1) <= self.chunk_size:
+                j += 1
+            windows.append((words[i][0], words[j][1]))
+            if j + 1 >= len(words):
+                break
+            # Step back so the next window overlaps this one
+            k = j + 1
+            while k - 1 > i and span_len(k - 1, j) <= self.overlap:
+                k -= 1
+            i = k
+        return windows
+
+    @staticmethod
+    def _sentence_units(text: str) -> List[Tuple[int, int, bool]]:
+        """(start, end, starts_new_paragraph) for every non-empty sentence or line."""
+        paragraph_starts = [0] + [m.end() for m in _PARAGRAPH_RE.finditer(text)]
+        units = []
+        last_paragraph = -1
+        for m in _SENTENCE_RE.finditer(text):
+            segment = m.group()
+            if not segment.strip():
+                continue
+            start = m.start() + (len(segment) - len(segment.lstrip()))
+            end = m.end() - (len(segment) - len(segment.rstrip()))
+            paragraph = bisect_right(paragraph_starts, start)
+            units.append((start, end, paragraph != last_paragraph))
+            last_paragraph = paragraph
+        return units
+
+
+def _byte_offsets(text: str) -> List[int]:
+    """Maps every character index (0..len) to its UTF-8 byte offset."""
+    if text.isascii():
+        return list(range(len(text) + 1))
+    return [0] + list(accumulate(len(ch.encode("utf-8")) for ch in text))
@@ -10,8 +10,12 @@ load_dotenv()
 BASE_DIR = Path(__file__).parent.parent.absolute()
 DATA_DIR = BASE_DIR / "data"
 DOCS_DIR = DATA_DIR / "documents"
+TAGS_FILE = "tags.json"  # Optional {"file name": ["tag", ...]} in DOCS_DIR, used for filtering
+DOCUMENT_EXTENSIONS = (".txt", ".md")  # UTF-8 text files indexed from DOCS_DIR
 EMBEDDINGS_DIR = BASE_DIR / "embeddings"
 FAISS_INDEX_PATH = EMBEDDINGS_DIR / "faiss_index"
+EMBEDDING_CACHE_DIR = EMBEDDINGS_DIR / "embedding_cache"
+SHARDS_DIR = EMBEDDINGS_DIR / "shards"
 
 # App Configuration
 APP_ENV = os.getenv("APP_ENV", "development")
@@ -25,6 +29,75 @@ AWS_PROFILE = os.getenv("AWS_PROFILE", "default")
 EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
 BEDROCK_MODEL_ID_SMART = "us.anthropic.claude-3-7-sonnet-20250219-v1:0"  # Synthesis (accurate)
 BEDROCK_MODEL_ID_FAST = "us.anthropic.claude-3-5-haiku-20241022-v1:0"  # Router & Verifier (fast)
+# "smart" runs the verifier on the synthesis model: Bedrock caches prompts per model, so
+# only then can verification read the context prefix that synthesis wrote
+VERIFIER_TIER = os.getenv("VERIFIER_TIER", "fast")
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "Flat")  # faiss.index_factory string
+NUM_SHARDS = int(os.getenv("NUM_SHARDS", "1"))
+SHARD_BY = os.getenv("SHARD_BY", "source")  # "source" (per document) or "hash" (per chunk)
+
+# Reranking (optional cross-encoder stage between retrieval and synthesis)
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL_NAME = os.getenv("RERANK_MODEL_NAME", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))  # retrieved before reranking
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "3"))  # chunks sent to the LLM
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "10000"))  # (query, chunk) scores
+
+# Adaptive Retrieval Depth (see core.retrieval_depth)
+DEFAULT_K = int(os.getenv("DEFAULT_K", "3"))  # max chunks sent to the LLM unless the query sets k
+ADAPTIVE_K_ENABLED = os.getenv("ADAPTIVE_K_ENABLED", "true").lower() == "true"
+CANDIDATE_POOL = int(os.getenv("CANDIDATE_POOL", "10"))  # searched once; also the largest k
+RELEVANCE_THRESHOLD = float(os.getenv("RELEVANCE_THRESHOLD", "0.3"))  # min cosine similarity
+RELEVANCE_GAP = float(os.getenv("RELEVANCE_GAP", "0.1"))  # similarity drop that ends the context
+
+# Stage Caches (reused on answer-cache misses, e.g. after a re-ingest)
+ROUTING_CACHE_SIZE = int(os.getenv("ROUTING_CACHE_SIZE", "50000"))
+ROUTING_CACHE_TTL_SECONDS = float(os.getenv("ROUTING_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "2000"))
+
+# Semantic Cache Backend ("sqlite": per-node data/cache.db, "remote": shared cache server)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite")
+CACHE_SERVER_URL = os.getenv("CACHE_SERVER_URL", "http://localhost:8100")
+CACHE_SERVER_TIMEOUT_SECONDS = float(os.getenv("CACHE_SERVER_TIMEOUT_SECONDS", "2"))
+# After a failed call, lookups skip the cache server for this long (L1 only)
+CACHE_BREAKER_SECONDS = float(os.getenv("CACHE_BREAKER_SECONDS", "10"))
+CACHE_L1_SIZE = int(os.getenv("CACHE_L1_SIZE", "1000"))  # per-node in-memory entries
+CACHE_REPLICATION_BATCH = int(os.getenv("CACHE_REPLICATION_BATCH", "32"))
+CACHE_REPLICATION_INTERVAL_SECONDS = float(os.getenv("CACHE_REPLICATION_INTERVAL_SECONDS", "0.5"))
+
+# Request Tracing (OTLP-shaped JSONL spans; see core/tracing.py)
+TRACE_DIR = DATA_DIR / "traces"
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))  # head sampling
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "3000"))  # slower requests are always exported
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(20 * 1024 * 1024)))  # per file
+TRACE_BACKUPS = int(os.getenv("TRACE_BACKUPS", "5"))  # rotated files kept
+# X-Debug-Profile: 1 writes a per-request cProfile; off in production unless enabled
+TRACE_DEBUG_HEADER_ENABLED = (
+    os.getenv("TRACE_DEBUG_HEADER_ENABLED", str(APP_ENV != "production")).lower() == "true"
+)
+
+# Admission Control (/stream_query)
+MAX_CONCURRENT_PIPELINES = int(os.getenv("MAX_CONCURRENT_PIPELINES", "4"))
+MAX_QUEUE_DEPTH = int(os.getenv("MAX_QUEUE_DEPTH", "64"))
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("QUEUE_TIMEOUT_SECONDS", "10"))
+CLIENT_RATE_PER_MINUTE = float(os.getenv("CLIENT_RATE_PER_MINUTE", "60"))
+CLIENT_BURST = int(os.getenv("CLIENT_BURST", "10"))
+MAX_CLIENT_BUCKETS = int(os.getenv("MAX_CLIENT_BUCKETS", "10000"))  # least recently used evicted
+# Quota key: the peer address, or X-Client-ID when a trusted proxy/auth layer sets it
+TRUST_CLIENT_ID_HEADER = os.getenv("TRUST_CLIENT_ID_HEADER", "false").lower() == "true"
+SHORT_QUERY_CHARS = int(os.getenv("SHORT_QUERY_CHARS", "80"))  # queued ahead of longer ones
+
+# Document Upload & Background Ingestion
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))  # read/write size
+INGEST_JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", "200"))  # finished jobs kept for /jobs
+
+# Chunking Configuration (sizes are measured in CHUNK_UNIT: "chars" or "tokens")
+CHUNK_UNIT = os.getenv("CHUNK_UNIT", "chars")
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "800"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "120"))
+MIN_CHUNK_SIZE = int(os.getenv("MIN_CHUNK_SIZE", "200"))
 
 
 def get_llm_config(tier: str = "smart"):
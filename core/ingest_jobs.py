@@ -0,0 +1,125 @@
+"""
+Background Ingestion Jobs
+=========================
+Uploaded documents are indexed by a single worker thread, one job at a time,
+so uploads return as soon as the file is on disk and concurrent jobs never
+race on the same shard. The handler does the actual work (see
+scripts.ingest.ingest_file) and returns a dict of counts that is stored on
+the job.
+
+Job states: queued -> running -> done | failed. Finished jobs are kept up to
+`history` entries for /jobs.
+"""
+
+import itertools
+import queue
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from core.config import INGEST_JOB_HISTORY
+
+
+class IngestionJobQueue:
+    def __init__(
+        self,
+        handler: Callable[[Path], Dict[str, Any]],
+        history: int = INGEST_JOB_HISTORY,
+    ):
+        self.handler = handler
+        self.history = history
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._worker = None
+        self.totals = {"bytes": 0, "chunks": 0, "busy_seconds": 0.0}
+
+    def submit(self, path: Path, size: int, sha256: str) -> Dict[str, Any]:
+        """Queues `path` for ingestion and returns a copy of the new job."""
+        job = {
+            "id": f"job-{next(self._ids)}",
+            "filename": Path(path).name,
+            "path": str(path),
+            "size": size,
+            "sha256": sha256,
+            "status": "queued",
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        with self._lock:
+            self._jobs[job["id"]] = job
+            self._trim()
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="ingest-worker", daemon=True)
+                self._worker.start()
+        self._queue.put(job)
+        return dict(job)
+
+    def _trim(self):
+        # Caller holds the lock; only finished jobs are dropped
+        finished = [jid for jid, j in self._jobs.items() if j["status"] in ("done", "failed")]
+        for jid in finished[: max(0, len(self._jobs) - self.history)]:
+            del self._jobs[jid]
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                job["status"] = "running"
+                job["started_at"] = time.time()
+            try:
+                result = self.handler(Path(job["path"]))
+                status, error = "done", None
+            except Exception as e:
+                result, status, error = None, "failed", str(e)
+            with self._lock:
+                job.update(status=status, result=result, error=error, finished_at=time.time())
+                elapsed = job["finished_at"] - job["started_at"]
+                self.totals["busy_seconds"] += elapsed
+                if status == "done":
+                    self.totals["bytes"] += job["size"]
+                    self.totals["chunks"] += (result or {}).get("chunks", 0)
+            self._queue.task_done()
+
+    def join(self):
+        """Blocks until every queued job has finished (used by tests and scripts)."""
+        self._queue.join()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def last_done(self, filename: str) -> Optional[Dict[str, Any]]:
+        """The most recent successful job for `filename` still in the history, if any."""
+        with self._lock:
+            for job in reversed(self._jobs.values()):
+                if job["filename"] == filename and job["status"] == "done":
+                    return dict(job)
+        return None
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(job) for job in reversed(self._jobs.values())]
+
+    def stats(self) -> Dict[str, Any]:
+        """Job counts by state plus throughput over the time the worker was busy."""
+        with self._lock:
+            counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+            for job in self._jobs.values():
+                counts[job["status"]] += 1
+            busy = self.totals["busy_seconds"]
+            return {
+                **counts,
+                "bytes_ingested": self.totals["bytes"],
+                "chunks_ingested": self.totals["chunks"],
+                "busy_seconds": round(busy, 3),
+                "bytes_per_second": round(self.totals["bytes"] / busy, 1) if busy else 0.0,
+                "chunks_per_second": round(self.totals["chunks"] / busy, 2) if busy else 0.0,
+            }
@@ -1,27 +1,111 @@
+import functools
+import hashlib
 import json
+import threading
+import time
 from abc import ABC, abstractmethod
 from typing import Any, Dict
 
 import boto3
 
+from core.tracing import current_request_id, span
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for local usage accounting."""
+    return (len(text) + 3) // 4
+
+
+def traced_generate(generate):
+    """Wraps a provider's `generate` in an "llm.generate" span that records its token usage."""
+
+    @functools.wraps(generate)
+    def wrapper(self, system_prompt, user_prompt, temperature=0.0, cached_prefix=""):
+        with span(
+            "llm.generate",
+            llm_provider=type(self).__name__,
+            llm_model=getattr(self, "model_id", None),
+            prompt_chars=len(cached_prefix) + len(system_prompt) + len(user_prompt),
+        ) as current:
+            response = generate(self, system_prompt, user_prompt, temperature, cached_prefix)
+            current.set(**self.last_usage)
+            return response
+
+    return wrapper
+
 
 class LLMProvider(ABC):
     """Abstract base class for LLM providers."""
 
+    def __init__(self):
+        # Usage is tracked per thread: agents run in executor threads, so the
+        # caller reads `last_usage` on the same thread right after `generate`.
+        self._usage_local = threading.local()
+
     @abstractmethod
-    def generate(self, system_prompt: str, user_prompt: str, temperature: float = 0.0) -> str:
-        """Generates a response from the LLM."""
+    def generate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float = 0.0,
+        cached_prefix: str = "",
+    ) -> str:
+        """
+        Generates a response from the LLM.
+        `cached_prefix` is prepended to the system prompt and marked as a
+        cache-control breakpoint, so providers that support prompt caching
+        reuse it across calls that share the same prefix.
+        Implementations are decorated with @traced_generate.
+        """
         pass
 
+    @property
+    def last_usage(self) -> Dict[str, int]:
+        """Token usage of the most recent call made on the current thread."""
+        return getattr(self._usage_local, "usage", {})
+
+    def _record_usage(
+        self,
+        input_tokens: int,
+        output_tokens: int,
+        cache_read_input_tokens: int = 0,
+        cache_creation_input_tokens: int = 0,
+        **extra: Any,
+    ):
+        """Store usage in Anthropic's shape: `input_tokens` counts uncached input only."""
+        self._usage_local.usage = {
+            "input_tokens": input_tokens,
+            "cache_read_input_tokens": cache_read_input_tokens,
+            "cache_creation_input_tokens": cache_creation_input_tokens,
+            "output_tokens": output_tokens,
+            **extra,
+        }
+
 
 class MockLLM(LLMProvider):
     """Local rule-based LLM for development and testing."""
 
-    def generate(self, system_prompt: str, user_prompt: str, temperature: float = 0.0) -> str:
+    @traced_generate
+    def generate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float = 0.0,
+        cached_prefix: str = "",
+    ) -> str:
         """
         Simulates LLM responses based on keywords in the prompt.
         This allows testing agent logic without actual model calls.
         """
+        response = self._respond(cached_prefix + system_prompt, user_prompt)
+        self._record_usage(
+            input_tokens=estimate_tokens(cached_prefix + system_prompt + user_prompt),
+            output_tokens=estimate_tokens(response),
+        )
+        return response
+
+    def _respond(self, system_prompt: str, user_prompt: str) -> str:
+        """Keyword rules shared by the mock and simulated-latency providers."""
         user_prompt_lower = user_prompt.lower()
 
         # Simulation for Query Agent
@@ -108,23 +192,99 @@ class MockLLM(LLMProvider):
         return "Mock LLM Response: I received your input but don't have a specific rule for it."
 
 
+class SimulatedCacheLLM(MockLLM):
+    """
+    MockLLM that charges simulated prefill latency per uncached input token.
+    Prefixes passed as `cached_prefix` are remembered, so a later call sharing
+    the same prefix only pays for its suffix — mirroring provider-side prompt
+    caching closely enough to measure time-to-first-token locally.
+    """
+
+    def __init__(
+        self,
+        seconds_per_token: float = 0.0002,
+        cached_seconds_per_token: float = 0.00002,
+        enable_cache: bool = True,
+    ):
+        super().__init__()
+        self.seconds_per_token = seconds_per_token
+        self.cached_seconds_per_token = cached_seconds_per_token
+        self.enable_cache = enable_cache
+        self._prefix_cache = set()
+        self._lock = threading.Lock()
+
+    @traced_generate
+    def generate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float = 0.0,
+        cached_prefix: str = "",
+    ) -> str:
+        prefix_tokens = estimate_tokens(cached_prefix)
+        suffix_tokens = estimate_tokens(system_prompt + user_prompt)
+
+        cache_hit = False
+        if cached_prefix and self.enable_cache:
+            key = hashlib.sha256(cached_prefix.encode("utf-8")).hexdigest()
+            with self._lock:
+                cache_hit = key in self._prefix_cache
+                self._prefix_cache.add(key)
+
+        cached_tokens = prefix_tokens if cache_hit else 0
+        written_tokens = prefix_tokens if (cached_prefix and self.enable_cache) else 0
+        uncached_tokens = suffix_tokens + (prefix_tokens - cached_tokens)
+
+        ttft = (
+            uncached_tokens * self.seconds_per_token + cached_tokens * self.cached_seconds_per_token
+        )
+        time.sleep(ttft)
+
+        response = self._respond(cached_prefix + system_prompt, user_prompt)
+        self._record_usage(
+            input_tokens=uncached_tokens,
+            output_tokens=estimate_tokens(response),
+            cache_read_input_tokens=cached_tokens,
+            cache_creation_input_tokens=0 if cache_hit else written_tokens,
+            ttft_ms=round(ttft * 1000, 2),
+        )
+        return response
+
+
 class BedrockLLM(LLMProvider):
     """Production LLM using Amazon Bedrock."""
 
     def __init__(self, region_name: str, model_id: str):
+        super().__init__()
         self.client = boto3.client(service_name="bedrock-runtime", region_name=region_name)
         self.model_id = model_id
 
-    def generate(self, system_prompt: str, user_prompt: str, temperature: float = 0.0) -> str:
+    @traced_generate
+    def generate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float = 0.0,
+        cached_prefix: str = "",
+    ) -> str:
         """Invokes Claude 3 via Bedrock API."""
 
+        # The cacheable prefix goes first and carries the cache-control breakpoint;
+        # the role-specific instructions follow it so they never break the prefix.
+        system: Any = system_prompt
+        if cached_prefix:
+            system = [
+                {"type": "text", "text": cached_prefix, "cache_control": {"type": "ephemeral"}},
+                {"type": "text", "text": system_prompt},
+            ]
+
         # Construct the body for Claude 3 (Anthropic Messages API)
         body = json.dumps(
             {
                 "anthropic_version": "bedrock-2023-05-31",
                 "max_tokens": 1000,
                 "temperature": temperature,
-                "system": system_prompt,
+                "system": system,
                 "messages": [{"role": "user", "content": user_prompt}],
             }
         )
@@ -132,11 +292,20 @@ class BedrockLLM(LLMProvider):
         try:
             response = self.client.invoke_model(modelId=self.model_id, body=body)
             response_body = json.loads(response.get("body").read())
+            usage = response_body.get("usage", {})
+            self._record_usage(
+                input_tokens=usage.get("input_tokens", 0),
+                output_tokens=usage.get("output_tokens", 0),
+                cache_read_input_tokens=usage.get("cache_read_input_tokens", 0),
+                cache_creation_input_tokens=usage.get("cache_creation_input_tokens", 0),
+            )
             return response_body.get("content")[0].get("text")
 
         except Exception as e:
             # logic to handle throttling or errors
-            print(f"Error invoking Bedrock: {e}")
+            print(f"Error invoking Bedrock (request {current_request_id()}): {e}")
+            # Otherwise this thread would still report the previous call's tokens
+            self._record_usage(input_tokens=0, output_tokens=0, error=True)
             return f"Error: {str(e)}"
 
 
@@ -0,0 +1,31 @@
+"""
+Shared Prompt Prefix
+====================
+The Synthesis and Verifier agents both ground their output in the same
+retrieved context. Building that context into one byte-identical prefix
+(shared instructions + context) and placing each agent's role-specific
+instructions *after* it lets the provider cache the prefix once and bill
+only the short suffix on the next call.
+"""
+
+from typing import Any, Dict, List
+
+GROUNDING_INSTRUCTIONS = (
+    "You are part of a retrieval-augmented pipeline answering questions about a knowledge "
+    "base covering Amazon Bedrock, AWS IAM, and RAG architectures. "
+    "Ground every statement STRICTLY in the retrieved context below and do not use "
+    "outside knowledge."
+)
+
+
+def format_context(context: List[Dict[str, Any]]) -> str:
+    """Render retrieved chunks in the stable order they were retrieved."""
+    return "\n\n".join([f"Source ({c['source']}): {c['content']}" for c in context])
+
+
+def build_context_prefix(context: List[Dict[str, Any]]) -> str:
+    """
+    Returns the cacheable system-prompt prefix shared by synthesis and verification.
+    Must stay deterministic for a given context, or the provider cache never hits.
+    """
+    return GROUNDING_INSTRUCTIONS + "\n\nRetrieved Context:\n" + format_context(context) + "\n\n"
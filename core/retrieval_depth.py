@@ -0,0 +1,62 @@
+"""
+Adaptive Retrieval Depth
+========================
+Instead of a fixed k, the router searches a candidate pool (CANDIDATE_POOL)
+once and decides per query how many chunks reach the LLM:
+
+1. Chunks below RELEVANCE_THRESHOLD (cosine similarity) are dropped.
+2. The rest is cut at the first drop of at least RELEVANCE_GAP between
+   neighbours, so a sharp top match goes alone while a plateau of similar
+   matches is kept together.
+3. At most `max_k` chunks (the caller's k) are kept.
+
+FAISS distances are turned into cosine similarities first, so thresholds
+mean the same thing for L2 and inner-product indexes. Embeddings are
+normalized (all-MiniLM-L6-v2 ends in a Normalize layer), hence for squared
+L2 distance d, similarity = 1 - d / 2.
+"""
+
+from typing import Any, Dict, List, Tuple
+
+from core.config import RELEVANCE_GAP, RELEVANCE_THRESHOLD
+
+
+def similarity_from_distance(distance: float, higher_is_better: bool) -> float:
+    """Cosine similarity of normalized vectors from a FAISS L2 (squared) or IP score."""
+    return distance if higher_is_better else 1.0 - distance / 2.0
+
+
+def cut_context(
+    candidates: List[Dict[str, Any]],
+    max_k: int,
+    threshold: float = RELEVANCE_THRESHOLD,
+    gap: float = RELEVANCE_GAP,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Returns (kept chunks, stats) for best-first `candidates`. Chunks without a
+    "similarity" (e.g. the "No index available." placeholder) cannot be judged
+    and are kept, up to `max_k`. An empty result means nothing was relevant.
+    """
+    if any("similarity" not in c for c in candidates):
+        kept, reason = candidates[:max_k], "unscored"
+    else:
+        relevant = [c for c in candidates if c["similarity"] >= threshold]
+        kept, reason = relevant, "threshold" if len(relevant) < len(candidates) else "pool"
+        for i in range(1, len(relevant)):
+            if relevant[i - 1]["similarity"] - relevant[i]["similarity"] >= gap:
+                kept, reason = relevant[:i], "gap"
+                break
+        if len(kept) > max_k:
+            kept, reason = kept[:max_k], "max_k"
+
+    return kept, {
+        "candidates": len(candidates),
+        "kept": len(kept),
+        "max_k": max_k,
+        "cut_by": reason,
+        "top_similarity": (
+            round(candidates[0]["similarity"], 4)
+            if candidates and "similarity" in candidates[0]
+            else None
+        ),
+    }
@@ -0,0 +1,254 @@
+"""
+Sharded FAISS Index
+===================
+The corpus is split into N independently built shards (by source document or
+by chunk hash). A query is searched on every shard in parallel on a thread
+pool — FAISS releases the GIL during search — and the per-shard top-k lists
+are merged with a heap. Shards can be (re)loaded one at a time, so a rebuilt
+shard replaces the live one without touching the others.
+"""
+
+import copy
+import hashlib
+import heapq
+import json
+import os
+import pickle
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from core.chunk_metadata import ChunkMetadata
+from core.tracing import bind, span
+
+MANIFEST_FILE = "manifest.json"
+
+
+def shard_for(source: str, content: str, num_shards: int, shard_by: str = "source") -> int:
+    """Stable shard assignment: all chunks of a document share a shard when shard_by='source'."""
+    key = source if shard_by == "source" else content
+    return zlib.crc32(key.encode("utf-8")) % num_shards
+
+
+def shard_paths(shards_dir: Path, shard_id: int) -> Tuple[Path, Path]:
+    base = Path(shards_dir) / f"shard_{shard_id:03d}"
+    return Path(str(base) + ".bin"), Path(str(base) + "_meta.pkl")
+
+
+def load_manifest(shards_dir: Path) -> Optional[Dict[str, Any]]:
+    """{"num_shards", "shard_by", "index_type"} written by the last ingest, or None."""
+    manifest_file = Path(shards_dir) / MANIFEST_FILE
+    if not manifest_file.exists():
+        return None
+    with open(manifest_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(shards_dir: Path, manifest: Dict[str, Any]):
+    manifest_file = Path(shards_dir) / MANIFEST_FILE
+    with open(str(manifest_file) + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(str(manifest_file) + ".tmp", manifest_file)
+
+
+class IndexShard:
+    """One FAISS index plus the chunk text and columnar metadata for its rows."""
+
+    def __init__(
+        self,
+        shard_id: int,
+        index,
+        documents: List[str],
+        sources: List[str],
+        offsets=None,
+        metadata: Optional[ChunkMetadata] = None,
+        version: Optional[str] = None,
+    ):
+        self.shard_id = shard_id
+        # Changes whenever the shard is rebuilt; feeds ShardedIndex.version
+        self.version = version or uuid.uuid4().hex
+        self.index = index
+        self.documents = documents
+        self.offsets = offsets or []
+        self.metadata = metadata or ChunkMetadata.build(sources)
+        # Larger is better for inner-product indexes, smaller for L2
+        self.higher_is_better = index.metric_type == faiss.METRIC_INNER_PRODUCT
+
+    @property
+    def sources(self) -> List[str]:
+        return [self.metadata.source_names[i] for i in self.metadata.source_id]
+
+    @classmethod
+    def load(cls, index_file: Path, meta_file: Path, shard_id: int = 0) -> "IndexShard":
+        index = faiss.read_index(str(index_file))
+        with open(meta_file, "rb") as f:
+            data = pickle.load(f)
+        if "metadata" in data:
+            metadata = ChunkMetadata.from_dict(data["metadata"])
+        else:
+            # Pre-metadata index: only source names are known
+            metadata = ChunkMetadata.build(data["sources"])
+        version = data.get("version") or str(os.stat(index_file).st_mtime_ns)
+        return cls(
+            shard_id, index, data["documents"], [], data.get("offsets", []), metadata, version
+        )
+
+    def save(self, shards_dir: Path):
+        """Writes to temp files and renames, so readers never see a half-written shard."""
+        index_file, meta_file = shard_paths(shards_dir, self.shard_id)
+        faiss.write_index(self.index, str(index_file) + ".tmp")
+        with open(str(meta_file) + ".tmp", "wb") as f:
+            pickle.dump(
+                {
+                    "documents": self.documents,
+                    "offsets": self.offsets,
+                    "metadata": self.metadata.to_dict(),
+                    "version": self.version,
+                },
+                f,
+            )
+        os.replace(str(index_file) + ".tmp", index_file)
+        os.replace(str(meta_file) + ".tmp", meta_file)
+
+    def search(
+        self, query_vectors: np.ndarray, k: int, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[float, int, int]]:
+        """
+        Returns (distance, shard_id, local_id) for the first query vector.
+        With `filters`, FAISS only visits rows that pass them, so k hits come
+        back whenever k matching rows exist.
+        """
+        if self.index.ntotal == 0:
+            return []
+
+        params, candidates = None, self.index.ntotal
+        if filters:
+            ids = np.flatnonzero(self.metadata.mask(filters))
+            if len(ids) == 0:
+                return []
+            if len(ids) < self.index.ntotal:
+                params, candidates = self._search_params(ids), len(ids)
+
+        with span(
+            "faiss.search", shard_id=self.shard_id, rows=self.index.ntotal, candidates=candidates
+        ):
+            distances, indices = self.index.search(query_vectors, min(k, candidates), params=params)
+        return [
+            (float(d), self.shard_id, int(i)) for d, i in zip(distances[0], indices[0]) if i != -1
+        ]
+
+    def _search_params(self, ids: np.ndarray):
+        """
+        SearchParameters restricting FAISS to `ids`: a cheap range check when the
+        rows are contiguous (e.g. one source document), otherwise a hashed ID batch.
+        """
+        if ids[-1] - ids[0] + 1 == len(ids):
+            selector = faiss.IDSelectorRange(int(ids[0]), int(ids[-1]) + 1)
+        else:
+            selector = faiss.IDSelectorBatch(ids.astype("int64"))
+
+        base = faiss.downcast_index(self.index)
+        if isinstance(base, faiss.IndexHNSW):
+            params = faiss.SearchParametersHNSW(sel=selector, efSearch=base.hnsw.efSearch)
+        elif isinstance(base, faiss.IndexIVF):
+            params = faiss.SearchParametersIVF(sel=selector, nprobe=base.nprobe)
+        else:
+            params = faiss.SearchParameters(sel=selector)
+        # The SWIG params object does not own the selector; keep it alive with them
+        params.selector_ref = selector
+        return params
+
+
+class ShardedIndex:
+    """Fans a query out over all loaded shards and merges their top-k."""
+
+    def __init__(self, shards: Optional[List[IndexShard]] = None, max_workers: int = None):
+        self.shards: Dict[int, IndexShard] = {s.shard_id: s for s in shards or []}
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers or min(8, os.cpu_count() or 1),
+            thread_name_prefix="faiss-shard",
+        )
+
+    def __len__(self) -> int:
+        return len(self.shards)
+
+    @property
+    def version(self) -> str:
+        """Identifies the loaded index contents; changes when any shard is replaced."""
+        parts = sorted(f"{shard_id}:{s.version}" for shard_id, s in self.shards.items())
+        return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+    @classmethod
+    def load(cls, shards_dir: Path, legacy_index_path: Path = None) -> "ShardedIndex":
+        """
+        Loads every shard listed in the manifest. Falls back to a single
+        pre-sharding index at `legacy_index_path` (".bin" + "_meta.pkl").
+        """
+        sharded = cls()
+        manifest = load_manifest(shards_dir)
+        if manifest is not None:
+            for shard_id in range(manifest["num_shards"]):
+                sharded.load_shard(shards_dir, shard_id)
+        elif legacy_index_path is not None:
+            sharded.add_shard(
+                IndexShard.load(
+                    Path(str(legacy_index_path) + ".bin"),
+                    Path(str(legacy_index_path) + "_meta.pkl"),
+                )
+            )
+        return sharded
+
+    def load_shard(self, shards_dir: Path, shard_id: int):
+        """(Re)loads one shard from disk and swaps it in for subsequent queries."""
+        index_file, meta_file = shard_paths(shards_dir, shard_id)
+        if index_file.exists():
+            self.add_shard(IndexShard.load(index_file, meta_file, shard_id))
+
+    def add_shard(self, shard: IndexShard):
+        # Replacing a dict entry is atomic; in-flight searches keep the old shard
+        self.shards[shard.shard_id] = shard
+
+    def has_source(self, source: str) -> bool:
+        """Whether any loaded shard holds chunks of document `source`."""
+        return any(source in s.metadata.source_names for s in list(self.shards.values()))
+
+    def snapshot(self) -> "ShardedIndex":
+        """
+        A view of the shards loaded right now. Search and get_chunk on it stay
+        consistent even if a shard is swapped in between (row ids may shift
+        when a document is replaced).
+        """
+        view = copy.copy(self)
+        view.shards = dict(self.shards)
+        return view
+
+    def get_chunk(self, shard_id: int, local_id: int) -> Dict[str, Any]:
+        shard = self.shards[shard_id]
+        return {"content": shard.documents[local_id], "source": shard.metadata.source(local_id)}
+
+    def search(
+        self, query_vectors: np.ndarray, k: int, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[float, int, int]]:
+        """
+        Top-k (distance, shard_id, local_id) across all shards, best first.
+        `filters` (see core.chunk_metadata) are enforced inside each shard's search.
+        """
+        shards = list(self.shards.values())
+        if not shards:
+            return []
+        if len(shards) == 1:
+            hits = [shards[0].search(query_vectors, k, filters)]
+        else:
+            # One bind per shard: each pool thread needs its own copy of the trace context
+            futures = [self._pool.submit(bind(s.search), query_vectors, k, filters) for s in shards]
+            hits = [future.result() for future in futures]
+
+        # Each shard's list is already sorted best-first, so a k-way heap merge suffices
+        merged = heapq.merge(*hits, reverse=shards[0].higher_is_better)
+        return list(islice(merged, k))
@@ -0,0 +1,68 @@
+"""
+SSE Wire Format for /stream_query
+=================================
+Turns router events into compact `data:` payloads:
+
+- JSON without whitespace, UTF-8 (emoji are sent as 4 bytes, not 12-byte escapes).
+- Repeated payloads by reference: chunks in `final_response.context_used`
+  that were already sent in the `retrieval_agent` event become
+  {"$ref": "<chunk_id>"}; clients resolve them from that event's `data`.
+- Verbosity levels for API consumers:
+    full    every event (the UI's default)
+    summary agent results, `complete` and `error`; drops the router's
+            narration events ("start", "router")
+    final   only `complete` and `error`
+
+Each payload is yielded to EventSourceResponse as soon as it is ready,
+which writes and flushes it immediately.
+"""
+
+import json
+from typing import Any, Dict, Optional
+
+VERBOSITY_LEVELS = ("full", "summary", "final")
+NARRATION_STEPS = {"start", "router"}
+TERMINAL_STEPS = {"complete", "error"}
+
+
+class SSEEncoder:
+    """Encodes one response's events; keeps track of chunks already sent."""
+
+    def __init__(self, verbosity: str = "full"):
+        if verbosity not in VERBOSITY_LEVELS:
+            raise ValueError(f"verbosity must be one of {VERBOSITY_LEVELS}, got {verbosity!r}")
+        self.verbosity = verbosity
+        self._sent_chunks = set()
+
+    def _wanted(self, step: str) -> bool:
+        if step in TERMINAL_STEPS or self.verbosity == "full":
+            return True
+        return self.verbosity == "summary" and step not in NARRATION_STEPS
+
+    def _by_reference(self, chunk: Any) -> Any:
+        if isinstance(chunk, dict) and chunk.get("chunk_id") in self._sent_chunks:
+            return {"$ref": chunk["chunk_id"]}
+        return chunk
+
+    def encode(self, event: Dict[str, Any]) -> Optional[str]:
+        """The `data:` payload for `event`, or None if this verbosity drops it."""
+        step = event.get("step")
+        if not self._wanted(step):
+            return None
+
+        if step == "retrieval_agent" and isinstance(event.get("data"), list):
+            self._sent_chunks.update(
+                chunk["chunk_id"]
+                for chunk in event["data"]
+                if isinstance(chunk, dict) and "chunk_id" in chunk
+            )
+        elif step == "complete" and self._sent_chunks:
+            final = event.get("final_response") or {}
+            if isinstance(final.get("context_used"), list):
+                final = {
+                    **final,
+                    "context_used": [self._by_reference(c) for c in final["context_used"]],
+                }
+                event = {**event, "final_response": final}
+
+        return json.dumps(event, separators=(",", ":"), ensure_ascii=False)
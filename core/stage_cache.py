@@ -0,0 +1,172 @@
+"""
+Stage-Level Caches
+==================
+When the end-to-end answer cache misses (e.g. right after a re-ingest), the
+router can still reuse results of individual pipeline stages:
+
+- RoutingCache: QueryAgent decisions. They do not depend on the index, so
+  they are persisted in SQLite next to the answer cache and survive
+  re-ingests and restarts. Eviction: TTL plus least-recently-used trimming.
+- RetrievalCache: RetrievalAgent results, keyed by index version, filter and
+  k. In memory only; an index version change drops every older entry at
+  once. Eviction: bounded LRU.
+
+Both are keyed by the query vector (rounded to float16 so tiny numeric noise
+across processes still maps to the same key).
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from core.cache_manager import CACHE_DB_PATH
+from core.config import (
+    RETRIEVAL_CACHE_SIZE,
+    ROUTING_CACHE_SIZE,
+    ROUTING_CACHE_TTL_SECONDS,
+)
+
+
+def vector_key(query_vector: np.ndarray) -> str:
+    return hashlib.sha1(np.asarray(query_vector, dtype=np.float16).tobytes()).hexdigest()
+
+
+class RoutingCache:
+    def __init__(
+        self,
+        db_path: Path = CACHE_DB_PATH,
+        max_entries: int = ROUTING_CACHE_SIZE,
+        ttl_seconds: float = ROUTING_CACHE_TTL_SECONDS,
+    ):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path))
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS routing_cache (
+                key TEXT PRIMARY KEY,
+                decision TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        conn.commit()
+        conn.close()
+
+    def get(self, query_vector: np.ndarray) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        conn = sqlite3.connect(str(self.db_path))
+        with conn:
+            row = conn.execute(
+                "SELECT decision FROM routing_cache WHERE key = ? AND created_at >= ?",
+                (vector_key(query_vector), now - self.ttl_seconds),
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE routing_cache SET last_used = ? WHERE key = ?",
+                    (now, vector_key(query_vector)),
+                )
+        conn.close()
+        if row:
+            self.hits += 1
+            return json.loads(row[0])
+        self.misses += 1
+        return None
+
+    def put(self, query_vector: np.ndarray, decision: Dict[str, Any]):
+        now = time.time()
+        conn = sqlite3.connect(str(self.db_path))
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO routing_cache (key, decision, created_at, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                (vector_key(query_vector), json.dumps(decision), now, now),
+            )
+            conn.execute(
+                "DELETE FROM routing_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+            )
+            (count,) = conn.execute("SELECT COUNT(*) FROM routing_cache").fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM routing_cache WHERE key IN "
+                    "(SELECT key FROM routing_cache ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+        conn.close()
+
+    def clear(self):
+        conn = sqlite3.connect(str(self.db_path))
+        with conn:
+            conn.execute("DELETE FROM routing_cache")
+        conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class RetrievalCache:
+    def __init__(self, max_entries: int = RETRIEVAL_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.index_version = None
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, List[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _sync_version(self, index_version: str):
+        # Caller holds the lock
+        if index_version != self.index_version:
+            self._entries.clear()
+            self.index_version = index_version
+
+    def get(
+        self, index_version: str, query_vector: np.ndarray, filter_key: str, k: int
+    ) -> Optional[List[Dict[str, Any]]]:
+        key = (vector_key(query_vector), filter_key, k)
+        with self._lock:
+            self._sync_version(index_version)
+            results = self._entries.get(key)
+            if results is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return [dict(chunk) for chunk in results]
+
+    def put(
+        self,
+        index_version: str,
+        query_vector: np.ndarray,
+        filter_key: str,
+        k: int,
+        results: List[Dict[str, Any]],
+    ):
+        key = (vector_key(query_vector), filter_key, k)
+        with self._lock:
+            self._sync_version(index_version)
+            self._entries[key] = [dict(chunk) for chunk in results]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "index_version": self.index_version,
+        }
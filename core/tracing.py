@@ -0,0 +1,344 @@
+"""
+Request Tracing
+===============
+Lightweight spans tied to one request ID, carried in a contextvar so that
+nested calls (router -> agents -> LLMProvider / FAISS) need no extra
+arguments. Work handed to executor threads must be wrapped with `bind`,
+which copies the caller's context into the thread (run_in_executor and
+ThreadPoolExecutor do not do this on their own).
+
+Spans are always recorded in memory while a trace is active, and exported
+when the request ends if it was head-sampled (TRACE_SAMPLE_RATE), slower than
+TRACE_SLOW_MS, or explicitly requested. Export format: one span per line in
+the OTLP/JSON span shape (traceId, spanId, parentSpanId, name,
+start/endTimeUnixNano, typed attributes, status), written to a size-rotated
+JSONL file.
+
+A trace can also collect a cProfile of the work done in its executor threads
+(where the CPU time goes); it is written to TRACE_DIR/profiles/<request>.prof.
+"""
+
+import contextvars
+import cProfile
+import functools
+import json
+import logging
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from core.config import (
+    TRACE_BACKUPS,
+    TRACE_DEBUG_HEADER_ENABLED,
+    TRACE_DIR,
+    TRACE_MAX_BYTES,
+    TRACE_SAMPLE_RATE,
+    TRACE_SLOW_MS,
+    TRACING_ENABLED,
+)
+
+SERVICE_NAME = "agentic-rag"
+# Client-supplied request IDs end up in file names (profiles), so keep them tame
+REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+_profiling = threading.local()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}  # OTLP/JSON encodes 64-bit ints as strings
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def safe_request_id(request_id: Optional[str]) -> str:
+    """`request_id` if it matches REQUEST_ID_PATTERN, otherwise a fresh one."""
+    if request_id and REQUEST_ID_PATTERN.fullmatch(request_id) and request_id not in (".", ".."):
+        return request_id
+    return uuid.uuid4().hex[:16]
+
+
+class Span:
+    def __init__(
+        self,
+        trace: "Trace",
+        name: str,
+        parent_id: Optional[str],
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.trace._finished(self)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_otlp(self) -> Dict[str, Any]:
+        attributes = {"request.id": self.trace.request_id, **self.attributes}
+        return {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": "SPAN_KIND_SERVER" if self.parent_id is None else "SPAN_KIND_INTERNAL",
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in attributes.items()
+                if value is not None
+            ],
+            "status": (
+                {"code": "STATUS_CODE_ERROR", "message": self.error}
+                if self.error
+                else {"code": "STATUS_CODE_OK"}
+            ),
+            "resource": {"service.name": SERVICE_NAME},
+        }
+
+
+class _NoopSpan:
+    """Stand-in yielded by `span` outside a trace, so callers can always call `set`."""
+
+    def set(self, **attributes: Any):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """All spans of one request; the root span covers the whole request."""
+
+    def __init__(
+        self,
+        name: str,
+        request_id: Optional[str] = None,
+        sampled: bool = False,
+        profile: bool = False,
+        exporter: Optional["JsonlExporter"] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.trace_id = uuid.uuid4().hex
+        self.request_id = safe_request_id(request_id)
+        self.sampled = sampled
+        self.exporter = exporter
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self._profiles: List[cProfile.Profile] = [] if profile else None
+        self.profile_path: Optional[Path] = None
+        self.root = Span(self, name, None, attributes)
+
+    @property
+    def profiling(self) -> bool:
+        return self._profiles is not None
+
+    def _finished(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def profiled(self, fn: Callable, *args, **kwargs):
+        """Runs `fn` under cProfile (once per thread; nested calls run as-is)."""
+        if getattr(_profiling, "active", False):
+            return fn(*args, **kwargs)
+        profile = cProfile.Profile()
+        _profiling.active = True
+        try:
+            return profile.runcall(fn, *args, **kwargs)
+        finally:
+            _profiling.active = False
+            with self._lock:
+                self._profiles.append(profile)
+
+    def end(self, error: Optional[str] = None):
+        """Closes the root span, then exports spans and the profile if this trace is kept."""
+        if self.root.end_ns is not None:
+            return
+        if error:
+            self.root.error = error
+        if self.profiling and self._profiles:
+            profiles_dir = (TRACE_DIR / "profiles").resolve()
+            profile_path = (profiles_dir / f"{self.request_id}.prof").resolve()
+            if profile_path.parent == profiles_dir:
+                profiles_dir.mkdir(parents=True, exist_ok=True)
+                pstats.Stats(*self._profiles).dump_stats(str(profile_path))
+                self.profile_path = profile_path
+                self.root.set(**{"debug.profile": str(profile_path)})
+        self.root.end()
+        keep = self.sampled or self.profiling or self.root.duration_ms >= TRACE_SLOW_MS
+        if keep and self.exporter is not None:
+            with self._lock:
+                spans = list(self.spans)
+            self.exporter.export(spans)
+
+
+class JsonlExporter:
+    """Appends spans as JSON lines; the file rotates at `max_bytes` keeping `backups` old files."""
+
+    def __init__(
+        self,
+        path: Path = TRACE_DIR / "spans.jsonl",
+        max_bytes: int = TRACE_MAX_BYTES,
+        backups: int = TRACE_BACKUPS,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # RotatingFileHandler gives us locking and size-based rotation for free
+        self._handler = RotatingFileHandler(
+            self.path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True
+        )
+        self._handler.setFormatter(logging.Formatter("%(message)s"))
+
+    def export(self, spans: List[Span]):
+        for item in spans:
+            record = logging.makeLogRecord({"msg": json.dumps(item.to_otlp())})
+            self._handler.handle(record)
+
+    def close(self):
+        self._handler.close()
+
+
+_default_exporter = None
+
+
+def default_exporter() -> JsonlExporter:
+    global _default_exporter
+    if _default_exporter is None:
+        _default_exporter = JsonlExporter()
+    return _default_exporter
+
+
+def start_trace(
+    name: str,
+    request_id: Optional[str] = None,
+    profile: bool = False,
+    force: bool = False,
+    **attributes: Any,
+) -> Optional[Trace]:
+    """
+    New trace for one request, or None when tracing is disabled (then every
+    tracing call below is a no-op). `force` exports it regardless of sampling.
+    """
+    if not TRACING_ENABLED and not (force or profile):
+        return None
+    sampled = force or random.random() < TRACE_SAMPLE_RATE
+    return Trace(name, request_id, sampled, profile, default_exporter(), attributes)
+
+
+def finish(trace: Optional[Trace], error: Optional[str] = None):
+    if trace is not None:
+        trace.end(error)
+
+
+@contextmanager
+def activate(trace: Optional[Trace]):
+    """Makes `trace`'s root span the current span for the enclosed block."""
+    if trace is None:
+        yield None
+        return
+    token = _current_span.set(trace.root)
+    try:
+        yield trace
+    finally:
+        _current_span.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes: Any):
+    """Child span of the current span; outside a trace it records nothing."""
+    parent = _current_span.get()
+    if parent is None:
+        yield _NOOP_SPAN
+        return
+    current = Span(parent.trace, name, parent.span_id, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+
+
+def current_trace() -> Optional[Trace]:
+    current = _current_span.get()
+    return current.trace if current else None
+
+
+def current_request_id() -> Optional[str]:
+    trace = current_trace()
+    return trace.request_id if trace else None
+
+
+def bind(fn: Callable, span_name: Optional[str] = None, **attributes: Any) -> Callable:
+    """
+    Wraps `fn` to run in a copy of the caller's context (optionally inside a
+    span named `span_name`), for executor threads. Bind once per submission:
+    a copied context cannot be entered by two threads at the same time.
+    """
+    trace = current_trace()
+    if trace is None:
+        return fn
+    context = contextvars.copy_context()
+
+    def call(*args, **kwargs):
+        if span_name is None:
+            return fn(*args, **kwargs)
+        with span(span_name, **attributes):
+            return fn(*args, **kwargs)
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        if trace.profiling:
+            return context.run(trace.profiled, call, *args, **kwargs)
+        return context.run(call, *args, **kwargs)
+
+    return run
+
+
+def traced(name: str, **attributes: Any) -> Callable:
+    """Decorator form of `span` for functions called inside a trace."""
+
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, **attributes):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def profile_enabled_for(header_value: Optional[str]) -> bool:
+    """X-Debug-Profile is honoured only where TRACE_DEBUG_HEADER_ENABLED allows it."""
+    return TRACE_DEBUG_HEADER_ENABLED and (header_value or "").lower() in ("1", "true", "profile")
@@ -0,0 +1,63 @@
+"""
+Rerank benchmark: cross-encoder latency vs LLM input tokens saved.
+
+For each query, compares sending the top `--baseline-k` bi-encoder hits to the
+LLM against retrieving `--candidates` and keeping the cross-encoder's best
+`--top-n`. Context tokens are counted for both the synthesis and the verifier
+prompt, since both embed the retrieved context.
+
+Usage: python scripts/bench_rerank.py [--baseline-k 10] [--candidates 20] [--top-n 3]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+# isort: off
+from agents.rerank_agent import RerankAgent  # noqa: E402
+from agents.retrieval_agent import RetrievalAgent  # noqa: E402
+from core.llm_interface import estimate_tokens  # noqa: E402
+from core.prompts import build_context_prefix  # noqa: E402
+
+# isort: on
+
+DEFAULT_QUERIES = [
+    "What is Amazon Bedrock and does it support Claude?",
+    "Explain the concept of least privilege in AWS.",
+    "How does RAG architecture work?",
+    "How do IAM roles differ from IAM users?",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cross-encoder reranking.")
+    parser.add_argument("--baseline-k", type=int, default=10)
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--top-n", type=int, default=3)
+    args = parser.parse_args()
+
+    retrieval = RetrievalAgent()
+    reranker = RerankAgent()
+    reranker.rerank("warm-up", retrieval.retrieve("warm-up", 2))  # load model weights
+
+    header = f"{'cold_ms':>8} {'warm_ms':>8} {'base_tok':>9} {'rerank_tok':>10} {'saved':>7}  query"
+    print(header)
+    for query in DEFAULT_QUERIES:
+        baseline = retrieval.retrieve(query, args.baseline_k)
+        candidates = retrieval.retrieve(query, args.candidates)
+        cold = reranker.rerank(query, candidates, args.top_n)
+        warm = reranker.rerank(query, candidates, args.top_n)
+
+        # x2: synthesis and verifier both send the context
+        base_tokens = 2 * estimate_tokens(build_context_prefix(baseline))
+        rerank_tokens = 2 * estimate_tokens(build_context_prefix(cold["context"]))
+        print(
+            f"{cold['stats']['latency_ms']:>8} {warm['stats']['latency_ms']:>8} "
+            f"{base_tokens:>9} {rerank_tokens:>10} {base_tokens - rerank_tokens:>7}  {query}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Sharding benchmark: query latency as shard count and corpus size grow.
+
+Builds flat L2 shards over random vectors (same dimension as the embedding
+model) and times single-query top-k search through ShardedIndex, which fans
+out over a thread pool and heap-merges the per-shard results.
+
+Usage: python scripts/bench_sharding.py [--sizes 20000 100000] [--shards 1 2 4 8]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+# isort: off
+from core.shard_index import IndexShard, ShardedIndex  # noqa: E402
+
+# isort: on
+
+DIM = 384  # all-MiniLM-L6-v2
+
+
+def build_sharded(vectors: np.ndarray, num_shards: int) -> ShardedIndex:
+    shards = []
+    for shard_id, part in enumerate(np.array_split(vectors, num_shards)):
+        index = faiss.IndexFlatL2(DIM)
+        index.add(part)
+        shards.append(IndexShard(shard_id, index, [""] * len(part), [""] * len(part)))
+    return ShardedIndex(shards, max_workers=num_shards)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sharded FAISS search.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20000, 100000, 300000])
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    # One search thread per shard; fan-out provides the parallelism
+    faiss.omp_set_num_threads(1)
+    rng = np.random.default_rng(0)
+    queries = rng.standard_normal((args.queries, DIM)).astype("float32")
+
+    print(f"{'corpus':>8} {'shards':>6} {'p50_ms':>8} {'p95_ms':>8}")
+    for size in args.sizes:
+        vectors = rng.standard_normal((size, DIM)).astype("float32")
+        for num_shards in args.shards:
+            sharded = build_sharded(vectors, num_shards)
+            latencies = []
+            for q in queries:
+                start = time.perf_counter()
+                sharded.search(q[None, :], args.k)
+                latencies.append((time.perf_counter() - start) * 1000)
+            p50, p95 = np.percentile(latencies, [50, 95])
+            print(f"{size:>8} {num_shards:>6} {p50:>8.2f} {p95:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
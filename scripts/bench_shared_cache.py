@@ -0,0 +1,97 @@
+"""
+Shared cache benchmark: semantic cache hit ratio as API nodes are added.
+
+Replays a skewed synthetic query stream (a few popular queries asked often,
+a long tail asked rarely; vectors of the embedding model's dimension) over N
+simulated nodes behind a round-robin load balancer, comparing:
+  - per-node: every node has its own SQLite cache (CACHE_BACKEND=sqlite)
+  - shared:   nodes share an in-process cache server through their L1s
+              (CACHE_BACKEND=remote)
+Misses store their answer like the router does; replication is flushed after
+every request so results do not depend on timing.
+
+Usage: python scripts/bench_shared_cache.py [--nodes 1 2 4 8] [--requests 2000]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+# isort: off
+from core.cache_backends import (  # noqa: E402
+    RemoteCacheBackend,
+    ReplicatedCacheBackend,
+    SqliteCacheBackend,
+)
+from core.cache_manager import DEFAULT_THRESHOLD, SemanticCache  # noqa: E402
+from core.cache_server import CacheServer  # noqa: E402
+
+# isort: on
+
+DIM = 384  # all-MiniLM-L6-v2
+
+
+def query_stream(num_requests: int, distinct: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((distinct, DIM)).astype(np.float32)
+    popularity = 1.0 / np.arange(1, distinct + 1)  # Zipf-like
+    picks = rng.choice(distinct, size=num_requests, p=popularity / popularity.sum())
+    return [vectors[i] for i in picks]
+
+
+def replay(nodes, stream, flush: bool):
+    hits = 0
+    started = time.perf_counter()
+    for i, vector in enumerate(stream):
+        node = nodes[i % len(nodes)]
+        if node.lookup(vector):
+            hits += 1
+            continue
+        node.store(f"q{i}", vector, "answer")
+        if flush:
+            node.backend.flush()
+    elapsed = time.perf_counter() - started
+    return hits / len(stream), elapsed / len(stream) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-node vs shared semantic cache.")
+    parser.add_argument("--nodes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--distinct", type=int, default=300, help="Distinct queries in the stream")
+    args = parser.parse_args()
+
+    stream = query_stream(args.requests, args.distinct)
+    print(f"{args.requests} requests over {args.distinct} distinct queries\n")
+    print(f"{'nodes':>5} | {'per-node hit':>12} | {'shared hit':>10} | {'shared ms/req':>13}")
+    print("-" * 50)
+    for num_nodes in args.nodes:
+        with tempfile.TemporaryDirectory() as tmp:
+            local = [
+                SemanticCache(backend=SqliteCacheBackend(Path(tmp) / f"node{i}.db"))
+                for i in range(num_nodes)
+            ]
+            local_ratio, _ = replay(local, stream, flush=False)
+
+            server = CacheServer(SqliteCacheBackend(Path(tmp) / "shared.db")).start()
+            shared = [
+                SemanticCache(
+                    backend=ReplicatedCacheBackend(
+                        RemoteCacheBackend(server.url), DEFAULT_THRESHOLD, interval=60
+                    )
+                )
+                for _ in range(num_nodes)
+            ]
+            shared_ratio, ms = replay(shared, stream, flush=True)
+            server.stop()
+        print(f"{num_nodes:>5} | {local_ratio:>12.1%} | {shared_ratio:>10.1%} | {ms:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
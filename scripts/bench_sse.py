@@ -0,0 +1,145 @@
+"""
+SSE wire-format benchmark: time-to-complete and bytes per /stream_query response.
+
+Streams recorded router event sequences (a cache hit, and a full pipeline run
+with 3 retrieved chunks) through EventSourceResponse in an in-process app, and
+compares the previous wire format (json.dumps with default separators and ASCII escapes
+plus a fixed 50 ms sleep after every event) with core.sse.SSEEncoder at each
+verbosity level. Only the encoding differs, so the numbers isolate the wire
+format from retrieval and LLM latency.
+
+Usage: python scripts/bench_sse.py [--runs 20]
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sse_starlette.sse import EventSourceResponse
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+# isort: off
+from core.sse import VERBOSITY_LEVELS, SSEEncoder  # noqa: E402
+
+# isort: on
+
+CHUNK_TEXT = "Amazon Bedrock provides foundation models through a single API. " * 12
+
+
+def cache_hit_events():
+    answer = "Amazon Bedrock is a fully managed service that offers foundation models."
+    return [
+        {"step": "start", "message": "Processing query: what is bedrock?"},
+        {"step": "router", "message": "⚡ Cache hit! (similarity: 0.9871)"},
+        {
+            "step": "complete",
+            "message": "Returned cached answer",
+            "final_response": {
+                "query": "what is bedrock?",
+                "answer": answer,
+                "context_used": ["bedrock.txt", "bedrock.txt", "security.txt"],
+                "verification": {"is_valid": True, "reasoning": "Cached result"},
+                "cached": True,
+            },
+        },
+    ]
+
+
+def pipeline_events():
+    chunks = [
+        {"content": CHUNK_TEXT, "source": "bedrock.txt", "score": 0.41 + i, "chunk_id": f"0:{i}"}
+        for i in range(3)
+    ]
+    usage = {"input_tokens": 812, "output_tokens": 64, "cache_read_input_tokens": 0}
+    answer = "Amazon Bedrock is a fully managed service that offers foundation models."
+    verification = {"is_valid": True, "reasoning": "The answer is supported by the context."}
+    analysis = {"needs_retrieval": True, "retrieval_strategy": "vector_similarity"}
+    return [
+        {"step": "start", "message": "Processing query: what is bedrock?"},
+        {"step": "router", "message": "Cache miss. Running full agent pipeline..."},
+        {"step": "router", "message": "⚡ Running Query Analysis + Speculative Retrieval..."},
+        {"step": "query_agent", "message": "Analysis Complete.", "data": analysis},
+        {"step": "retrieval_agent", "message": "Retrieved 3 chunks.", "data": chunks},
+        {"step": "router", "message": "Delegating to Synthesis Agent (Smart model)..."},
+        {"step": "synthesis_agent", "message": "Answer generated.", "data": {"answer": answer}},
+        {"step": "router", "message": "Delegating to Verifier Agent (Fast model)..."},
+        {"step": "verifier_agent", "message": "Verified.", "data": verification, "usage": usage},
+        {
+            "step": "complete",
+            "message": "Workflow finished",
+            "final_response": {
+                "query": "what is bedrock?",
+                "answer": answer,
+                "context_used": chunks,
+                "verification": verification,
+                "usage": {"synthesis": usage, "verification": usage},
+            },
+        },
+    ]
+
+
+SCENARIOS = {"cache hit": cache_hit_events, "full pipeline": pipeline_events}
+
+app = FastAPI()
+
+
+@app.get("/legacy")
+async def legacy(scenario: str):
+    async def generator():
+        for event in SCENARIOS[scenario]():
+            yield json.dumps(event)
+            await asyncio.sleep(0.05)
+
+    return EventSourceResponse(generator())
+
+
+@app.get("/compact")
+async def compact(scenario: str, verbosity: str):
+    encoder = SSEEncoder(verbosity)
+
+    async def generator():
+        for event in SCENARIOS[scenario]():
+            payload = encoder.encode(event)
+            if payload is not None:
+                yield payload
+
+    return EventSourceResponse(generator())
+
+
+def measure(client, url, runs):
+    times, size = [], 0
+    for _ in range(runs):
+        started = time.perf_counter()
+        with client.stream("GET", url) as response:
+            size = sum(len(part) for part in response.iter_bytes())
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the /stream_query SSE wire format.")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    client = TestClient(app)
+    print(f"{'scenario':<14} | {'format':<16} | {'complete ms':>11} | {'bytes':>6}")
+    print("-" * 56)
+    for scenario in SCENARIOS:
+        rows = [("before", f"/legacy?scenario={scenario}")] + [
+            (f"after ({level})", f"/compact?scenario={scenario}&verbosity={level}")
+            for level in VERBOSITY_LEVELS
+        ]
+        for label, url in rows:
+            ms, size = measure(client, url, args.runs)
+            print(f"{scenario:<14} | {label:<16} | {ms:>11.1f} | {size:>6}")
+
+
+if __name__ == "__main__":
+    main()
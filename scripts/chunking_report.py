@@ -0,0 +1,115 @@
+"""
+Chunking comparison report: legacy line-per-chunk vs the size-aware chunker.
+
+For each strategy, reports chunk count, FAISS index bytes, metadata bytes,
+ingest (chunk + embed + index) time and retrieval recall@k on a labelled set.
+
+Labelled queries are JSONL lines: {"query": ..., "expected_source": ...} and/or
+{"query": ..., "expected_text": ...}. A hit means one of the top-k chunks comes
+from the expected source file / contains the expected text.
+
+Usage: python scripts/chunking_report.py [--queries labels.jsonl] [--k 3]
+"""
+
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+# Add parent directory to path to import config
+sys.path.append(str(Path(__file__).parent.parent))
+# isort: off
+from core.config import EMBEDDING_MODEL_NAME  # noqa: E402
+from scripts.ingest import document_files, load_chunks  # noqa: E402
+
+# isort: on
+
+# Mirrors tests/test_plan.md for the bundled corpus
+DEFAULT_QUERIES = [
+    {
+        "query": "What is Amazon Bedrock and does it support Claude?",
+        "expected_source": "amazon_bedrock.txt",
+    },
+    {
+        "query": "Explain the concept of least privilege in AWS.",
+        "expected_source": "cloud_security.txt",
+    },
+]
+
+
+def line_chunks(files):
+    """The previous strategy: every non-empty line is a chunk."""
+    documents, doc_sources = [], []
+    for file_path in files:
+        with open(file_path, "r", encoding="utf-8") as f:
+            lines = [line.strip() for line in f.readlines() if line.strip()]
+            documents.extend(lines)
+            doc_sources.extend([os.path.basename(file_path)] * len(lines))
+    return documents, doc_sources
+
+
+def evaluate(name, chunk_fn, files, model, queries, k):
+    start = time.perf_counter()
+    documents, doc_sources = chunk_fn(files)
+    embeddings = np.array(model.encode(documents)).astype("float32")
+    index = faiss.IndexFlatL2(embeddings.shape[1])
+    index.add(embeddings)
+    ingest_seconds = time.perf_counter() - start
+
+    hits = 0
+    query_vectors = np.array(model.encode([q["query"] for q in queries])).astype("float32")
+    _, indices = index.search(query_vectors, k)
+    for label, row in zip(queries, indices):
+        retrieved = [i for i in row if i != -1]
+        hit = True
+        if "expected_source" in label:
+            hit &= any(doc_sources[i] == label["expected_source"] for i in retrieved)
+        if "expected_text" in label:
+            needle = label["expected_text"].lower()
+            hit &= any(needle in documents[i].lower() for i in retrieved)
+        hits += hit
+
+    return {
+        "strategy": name,
+        "chunks": len(documents),
+        "index_bytes": len(faiss.serialize_index(index)),
+        "meta_bytes": len(pickle.dumps({"documents": documents, "sources": doc_sources})),
+        "ingest_s": round(ingest_seconds, 3),
+        f"recall@{k}": round(hits / len(queries), 3) if queries else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--queries", help="JSONL file with labelled queries")
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    files = document_files()  # the same .txt/.md set ingest indexes
+    if not files:
+        print("No documents found in data/documents.")
+        return
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            queries = [json.loads(line) for line in f if line.strip()]
+
+    model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    rows = [
+        evaluate("lines", line_chunks, files, model, queries, args.k),
+        evaluate("chunker", lambda fs: load_chunks(fs)[:2], files, model, queries, args.k),
+    ]
+    for row in rows:
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
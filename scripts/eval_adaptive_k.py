@@ -0,0 +1,132 @@
+"""
+Adaptive retrieval depth evaluation on a labelled query set.
+
+Each query's candidate pool is retrieved once; fixed top-k and the adaptive
+cutoff (core.retrieval_depth) are then applied to the same pool, so the
+comparison isolates the cutoff. Reports, per policy:
+
+- chunks per query, and LLM context tokens (synthesis + verifier prompts)
+- recall: share of a query's labelled sources present in its context
+- precision: share of sent chunks that come from a labelled source
+- skipped: answerable queries given no context (adaptive only; a quality loss)
+- abstained: unanswerable queries (no labelled sources) correctly given no
+  context, i.e. no LLM call over irrelevant chunks
+
+With --answers, both contexts also go through the configured Synthesis and
+Verifier agents and the share of verified answers is reported (needs a real
+LLM_PROVIDER to be meaningful).
+
+Label file: JSON lines {"query": "...", "relevant_sources": ["file.txt", ...]};
+an empty list marks a question the corpus cannot answer.
+
+Usage: python scripts/eval_adaptive_k.py labels.jsonl [--k 3] [--threshold 0.3] [--gap 0.1]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+# isort: off
+from agents.retrieval_agent import RetrievalAgent  # noqa: E402
+from core.config import CANDIDATE_POOL, RELEVANCE_GAP, RELEVANCE_THRESHOLD  # noqa: E402
+from core.llm_interface import estimate_tokens  # noqa: E402
+from core.prompts import build_context_prefix  # noqa: E402
+from core.retrieval_depth import cut_context  # noqa: E402
+
+# isort: on
+
+
+def load_labels(path: Path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def context_tokens(context) -> int:
+    # x2: synthesis and verifier both send the context
+    return 2 * estimate_tokens(build_context_prefix(context)) if context else 0
+
+
+def score(context, relevant):
+    sources = {c["source"] for c in context}
+    recall = len(sources & relevant) / len(relevant) if relevant else None
+    precision = sum(c["source"] in relevant for c in context) / len(context) if context else None
+    return recall, precision
+
+
+def mean(values):
+    values = [v for v in values if v is not None]
+    return sum(values) / len(values) if values else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate adaptive retrieval depth.")
+    parser.add_argument("labels", type=Path, help="JSONL of {query, relevant_sources}")
+    parser.add_argument("--k", type=int, default=3, help="Fixed k, and the adaptive maximum")
+    parser.add_argument("--pool", type=int, default=CANDIDATE_POOL)
+    parser.add_argument("--threshold", type=float, default=RELEVANCE_THRESHOLD)
+    parser.add_argument("--gap", type=float, default=RELEVANCE_GAP)
+    parser.add_argument("--answers", action="store_true", help="Also synthesize and verify")
+    args = parser.parse_args()
+
+    labels = load_labels(args.labels)
+    retrieval = RetrievalAgent()
+    if args.answers:
+        from agents.synthesis_agent import SynthesisAgent
+        from agents.verifier_agent import VerifierAgent
+        from core.config import get_llm_config
+        from core.llm_interface import get_llm
+
+        synthesis = SynthesisAgent(get_llm(get_llm_config(tier="smart")))
+        verifier = VerifierAgent(get_llm(get_llm_config(tier="fast")))
+
+    rows = {"fixed": [], "adaptive": []}
+    for label in labels:
+        query, relevant = label["query"], set(label.get("relevant_sources") or [])
+        pool = retrieval.retrieve(query, max(args.pool, args.k))
+        adaptive, _ = cut_context(pool, args.k, args.threshold, args.gap)
+        for policy, context in [("fixed", pool[: args.k]), ("adaptive", adaptive)]:
+            recall, precision = score(context, relevant)
+            row = {
+                "chunks": len(context),
+                "tokens": context_tokens(context),
+                "recall": recall,
+                "precision": precision,
+                "skipped": bool(relevant) and not context,
+                "abstained": None if relevant else not context,
+            }
+            if args.answers and context:
+                answer = synthesis.synthesize(query, context)
+                row["verified"] = bool(verifier.verify(query, answer, context).get("is_valid"))
+            rows[policy].append(row)
+
+    print(
+        f"{len(labels)} queries, k={args.k}, pool={args.pool}, "
+        f"threshold={args.threshold}, gap={args.gap}"
+    )
+    header = f"{'policy':<9} {'chunks/q':>8} {'tokens/q':>8} {'recall':>7} {'precision':>9} "
+    header += f"{'skipped':>7} {'abstained':>9}"
+    if args.answers:
+        header += f" {'verified':>8}"
+    print(header)
+    for policy, policy_rows in rows.items():
+        line = (
+            f"{policy:<9} {mean(r['chunks'] for r in policy_rows):>8.2f} "
+            f"{mean(r['tokens'] for r in policy_rows):>8.0f} "
+            f"{mean(r['recall'] for r in policy_rows):>7.2f} "
+            f"{mean(r['precision'] for r in policy_rows):>9.2f} "
+            f"{sum(r['skipped'] for r in policy_rows):>7} "
+            f"{mean(r['abstained'] for r in policy_rows):>9.2f}"
+        )
+        if args.answers:
+            line += f" {mean(r.get('verified') for r in policy_rows):>8.2f}"
+        print(line)
+
+    saved = sum(r["tokens"] for r in rows["fixed"]) - sum(r["tokens"] for r in rows["adaptive"])
+    print(f"Context tokens saved by adaptive depth: {saved} ({saved / max(len(labels), 1):.0f}/q)")
+
+
+if __name__ == "__main__":
+    main()
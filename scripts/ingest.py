@@ -1,7 +1,10 @@
-import glob
+import argparse
+import fcntl
+import hashlib
+import json
 import os
-import pickle
 import sys
+import time
 from pathlib import Path
 
 import faiss
@@ -11,38 +14,447 @@ from sentence_transformers import SentenceTransformer
 # Add parent directory to path to import config
 sys.path.append(str(Path(__file__).parent.parent))
 # isort: off
-from core.config import DATA_DIR, EMBEDDING_MODEL_NAME, FAISS_INDEX_PATH  # noqa: E402
+from core.chunker import Chunker  # noqa: E402
+from core.config import (  # noqa: E402
+    DOCS_DIR,
+    DOCUMENT_EXTENSIONS,
+    EMBEDDING_CACHE_DIR,
+    EMBEDDING_MODEL_NAME,
+    FAISS_INDEX_TYPE,
+    NUM_SHARDS,
+    SHARD_BY,
+    SHARDS_DIR,
+    TAGS_FILE,
+)
+from core.cache_manager import SemanticCache  # noqa: E402
+from core.chunk_metadata import ChunkMetadata  # noqa: E402
+from core.shard_index import (  # noqa: E402
+    IndexShard,
+    ShardedIndex,
+    load_manifest,
+    save_manifest,
+    shard_for,
+)
 
 # isort: on
 
 
-def ingest_documents():
+class EmbeddingStore:
+    """
+    Persistent chunk-embedding cache keyed by (model name, sha256 of chunk text).
+
+    Vectors are appended to a raw float16 file and read back through a memory
+    map, so a rebuild (even with a different FAISS index type) re-encodes only
+    text it has never seen. Keys are an append-only list of hashes whose line
+    number is the vector's row.
+
+    Appends hold an exclusive flock on the store's lock file, so concurrent
+    writers (a CLI rebuild during an upload job) never interleave rows.
+    """
+
+    def __init__(self, model_name: str, root: Path = EMBEDDING_CACHE_DIR):
+        self.dir = Path(root) / model_name.replace("/", "__")
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.dir / "vectors.f16"
+        self.keys_path = self.dir / "keys.txt"
+        self.meta_path = self.dir / "meta.json"
+        self.lock_path = self.dir / "store.lock"
+        self.dim = None
+        self.rows = {}
+        self._load()
+
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _load(self):
+        if not self.meta_path.exists():
+            return
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            self.dim = json.load(f)["dim"]
+        with open(self.keys_path, "r", encoding="utf-8") as f:
+            keys = f.read().split()
+        # Vectors are written before keys, so a partial append leaves extra vectors, never keys
+        stored = self.vectors_path.stat().st_size // (self.dim * 2)
+        self.rows = {k: i for i, k in enumerate(keys[:stored])}
+
+    def _matrix(self) -> np.ndarray:
+        return np.memmap(self.vectors_path, dtype=np.float16, mode="r").reshape(-1, self.dim)
+
+    def get_many(self, keys) -> np.ndarray:
+        """float32 matrix for keys that are all present in the store."""
+        return np.asarray(self._matrix()[[self.rows[k] for k in keys]], dtype=np.float32)
+
+    def add_many(self, keys, vectors: np.ndarray):
+        """Append new vectors; keys already stored are skipped."""
+        vectors = np.asarray(vectors, dtype=np.float16)
+        with open(self.lock_path, "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            # Another writer may have appended since we loaded: offsets must come from disk
+            self._load()
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                with open(self.meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"dim": self.dim}, f)
+                self.keys_path.touch()
+
+            new = [i for i, k in enumerate(keys) if k not in self.rows]
+            if not new:
+                return
+            stored = len(self.rows)
+            with open(self.vectors_path, "r+b" if self.vectors_path.exists() else "wb") as f:
+                # Truncate any vectors left over from an interrupted append
+                f.seek(stored * self.dim * 2)
+                f.truncate()
+                f.write(vectors[new].tobytes())
+            with open(self.keys_path, "a", encoding="utf-8") as f:
+                for offset, i in enumerate(new):
+                    f.write(keys[i] + "\n")
+                    self.rows[keys[i]] = stored + offset
+
+
+def embed_chunks(model, store: EmbeddingStore, documents):
+    """
+    Returns float32 embeddings for `documents`, encoding only chunks missing from
+    `store`. Returns (embeddings, reused_count, encoded_count).
+    """
+    keys = [EmbeddingStore.key(doc) for doc in documents]
+    missing = {}
+    for key, doc in zip(keys, documents):
+        if key not in store.rows and key not in missing:
+            missing[key] = doc
+
+    if missing:
+        vectors = model.encode(list(missing.values()))
+        store.add_many(list(missing.keys()), vectors)
+
+    # Everything is read back from the float16 store, so fresh and cached vectors match exactly
+    reused = sum(1 for key in keys if key not in missing)
+    return store.get_many(keys), reused, len(keys) - reused
+
+
+def build_index(embeddings: np.ndarray, index_type: str = FAISS_INDEX_TYPE):
+    """
+    Builds (and trains, if needed) a FAISS index from a factory string, e.g. "Flat".
+    When there are too few vectors to train it (an empty shard, fewer vectors than
+    IVF lists), a Flat index is built instead, so later appends still work.
+    """
+    index = faiss.index_factory(embeddings.shape[1], index_type)
+    if not index.is_trained:
+        try:
+            if len(embeddings) == 0:
+                raise RuntimeError("no vectors")
+            index.train(embeddings)
+        except RuntimeError:
+            print(
+                f"Warning: Too few vectors ({len(embeddings)}) to train {index_type}; "
+                "using Flat for this shard."
+            )
+            index = faiss.index_factory(embeddings.shape[1], "Flat", index.metric_type)
+    if len(embeddings):
+        index.add(embeddings)
+    return index
+
+
+def check_partial_rebuild(only_shards, num_shards: int, shard_by: str, shards_dir: Path):
+    """
+    Rebuilding some shards only works with the partitioning the others were built
+    with; a different count or scheme would misplace chunks. Raises ValueError.
+    """
+    invalid = [shard_id for shard_id in only_shards if not 0 <= shard_id < num_shards]
+    if invalid:
+        raise ValueError(f"Shard ids {invalid} are out of range for {num_shards} shards")
+    manifest = load_manifest(shards_dir)
+    if manifest is None:
+        return
+    if (manifest["num_shards"], manifest["shard_by"]) != (num_shards, shard_by):
+        raise ValueError(
+            f"The index has {manifest['num_shards']} shards by {manifest['shard_by']}; "
+            f"rebuild all shards to change to {num_shards} by {shard_by}"
+        )
+
+
+def write_shards(
+    documents,
+    doc_sources,
+    offsets,
+    embeddings: np.ndarray,
+    num_shards: int = NUM_SHARDS,
+    shard_by: str = SHARD_BY,
+    index_type: str = FAISS_INDEX_TYPE,
+    only_shards=None,
+    shards_dir: Path = SHARDS_DIR,
+    doc_info=None,
+):
+    """
+    Partitions chunks into `num_shards` shards and builds each one independently.
+    With `only_shards`, just those shards are rebuilt and replaced on disk.
+    `doc_info` (see load_document_info) supplies upload time and tags per source.
+    """
+    shards_dir = Path(shards_dir)
+    shards_dir.mkdir(parents=True, exist_ok=True)
+    if only_shards is not None:
+        check_partial_rebuild(only_shards, num_shards, shard_by, shards_dir)
+
+    rows = [[] for _ in range(num_shards)]
+    for i, (source, content) in enumerate(zip(doc_sources, documents)):
+        rows[shard_for(source, content, num_shards, shard_by)].append(i)
+
+    for shard_id, members in enumerate(rows):
+        if only_shards is not None and shard_id not in only_shards:
+            continue
+        shard_sources = [doc_sources[i] for i in members]
+        shard = IndexShard(
+            shard_id,
+            build_index(embeddings[members], index_type),
+            [documents[i] for i in members],
+            shard_sources,
+            [offsets[i] for i in members],
+            ChunkMetadata.build(shard_sources, doc_info),
+        )
+        shard.save(shards_dir)
+        print(f"Shard {shard_id}: {len(members)} chunks.")
+
+    save_manifest(
+        shards_dir, {"num_shards": num_shards, "shard_by": shard_by, "index_type": index_type}
+    )
+
+
+def is_document_name(name: str) -> bool:
+    """True for file names the index is built from (the tags file is config, not a document)."""
+    return (
+        not name.startswith(".")
+        and name != TAGS_FILE
+        and Path(name).suffix.lower() in DOCUMENT_EXTENSIONS
+    )
+
+
+def document_files(docs_dir: Path = DOCS_DIR):
+    """Every indexable document in `docs_dir`, sorted by name."""
+    return sorted(
+        str(p) for p in Path(docs_dir).iterdir() if p.is_file() and is_document_name(p.name)
+    )
+
+
+def load_chunks(files, chunker: Chunker = None):
+    """
+    Chunks every file with the size-aware chunker.
+    Returns parallel lists: chunk texts, source filenames and (start_byte, end_byte) offsets.
+    """
+    chunker = chunker or Chunker()
+    documents, doc_sources, offsets = [], [], []
+    for file_path in files:
+        for chunk in chunker.split_file(file_path):
+            documents.append(chunk["content"])
+            doc_sources.append(os.path.basename(file_path))
+            offsets.append((chunk["start_byte"], chunk["end_byte"]))
+    return documents, doc_sources, offsets
+
+
+def _load_tags(tags_file: Path):
+    if Path(tags_file).exists():
+        with open(tags_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def load_document_info(files, tags_file: Path = DOCS_DIR / TAGS_FILE):
+    """
+    Per-source metadata for filtering: file mtime as upload time, plus tags from
+    an optional JSON file mapping file name -> list of tags.
+    """
+    tags = _load_tags(tags_file)
+    return {
+        os.path.basename(path): {
+            "uploaded_at": os.path.getmtime(path),
+            "tags": tags.get(os.path.basename(path), []),
+        }
+        for path in files
+    }
+
+
+def _updated_shard(
+    shard_id: int,
+    old: IndexShard,
+    source: str,
+    documents,
+    offsets,
+    vectors: np.ndarray,
+    doc_info,
+    index_type: str,
+    model,
+    store: EmbeddingStore,
+) -> IndexShard:
+    """
+    Copy of shard `old` (may be None) with `documents` of `source` appended and
+    any earlier chunks of `source` dropped. The live shard is never mutated.
+    """
+    if old is None:
+        keep, replacing = [], True
+    else:
+        keep = [i for i in range(len(old.documents)) if old.metadata.source(i) != source]
+        replacing = len(keep) < len(old.documents)
+
+    kept_docs = [old.documents[i] for i in keep]
+    sources = [old.metadata.source(i) for i in keep] + [source] * len(documents)
+    info = old.metadata.source_info() if old is not None else {}
+    info.update(doc_info)
+
+    if not len(vectors):
+        # Empty upload: only happens when replacing, so the old shard gives the dimension
+        vectors = np.zeros((0, old.index.d), dtype=np.float32)
+
+    if replacing:
+        # Row ids shift, so rebuild; kept vectors come from the embedding store
+        if keep:
+            kept_vectors, _, _ = embed_chunks(model, store, kept_docs)
+            vectors = np.vstack([kept_vectors, vectors])
+        index = build_index(vectors, index_type)
+    elif not old.index.is_trained:
+        # Saved empty and untrained by an older ingest: build it now there are vectors
+        index = build_index(vectors, index_type)
+    else:
+        # Pure append: existing row ids stay valid
+        index = faiss.clone_index(old.index)
+        index.add(vectors)
+
+    old_offsets = old.offsets if old is not None else []
+    if keep and not old_offsets:
+        offsets = []  # Pre-offset shard: stay consistent with it
+    else:
+        offsets = [old_offsets[i] for i in keep] + list(offsets)
+    return IndexShard(
+        shard_id,
+        index,
+        kept_docs + list(documents),
+        [],
+        offsets,
+        ChunkMetadata.build(sources, info),
+    )
+
+
+def ingest_file(
+    file_path,
+    sharded: ShardedIndex,
+    model,
+    shards_dir: Path = SHARDS_DIR,
+    store: EmbeddingStore = None,
+    chunker: Chunker = None,
+    tags_file: Path = DOCS_DIR / TAGS_FILE,
+):
+    """
+    Incrementally indexes one (new or replaced) document into the live index:
+    chunks and embeds only this file, rewrites just the shard(s) holding it on
+    disk and swaps them into `sharded`. Returns counts for job reporting.
+    """
+    file_path = Path(file_path)
+    source = file_path.name
+    shards_dir = Path(shards_dir)
+    shards_dir.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(shards_dir) or {
+        "num_shards": max(1, len(sharded)),
+        "shard_by": SHARD_BY,
+        "index_type": FAISS_INDEX_TYPE,
+    }
+
+    chunks = (chunker or Chunker()).split_file(file_path)
+    documents = [c["content"] for c in chunks]
+    offsets = [(c["start_byte"], c["end_byte"]) for c in chunks]
+    store = store or EmbeddingStore(EMBEDDING_MODEL_NAME)
+    if documents:
+        vectors, reused, encoded = embed_chunks(model, store, documents)
+    else:
+        vectors, reused, encoded = np.zeros((0, 0), dtype=np.float32), 0, 0
+    doc_info = {source: {"uploaded_at": time.time(), "tags": _load_tags(tags_file).get(source, [])}}
+
+    rows = {}
+    for i, doc in enumerate(documents):
+        shard_id = shard_for(source, doc, manifest["num_shards"], manifest["shard_by"])
+        rows.setdefault(shard_id, []).append(i)
+    # Earlier versions of the document may live in other shards (shard_by="hash")
+    previous = {
+        shard_id
+        for shard_id, shard in sharded.shards.items()
+        if source in shard.metadata.source_names
+    }
+    affected = set(rows) | previous
+
+    for shard_id in sorted(affected):
+        members = rows.get(shard_id, [])
+        shard = _updated_shard(
+            shard_id,
+            sharded.shards.get(shard_id),
+            source,
+            [documents[i] for i in members],
+            [offsets[i] for i in members],
+            vectors[members],
+            doc_info,
+            manifest["index_type"],
+            model,
+            store,
+        )
+        shard.save(shards_dir)
+        sharded.add_shard(shard)
+    save_manifest(shards_dir, manifest)
+
+    return {
+        "source": source,
+        "chunks": len(documents),
+        "reused_embeddings": reused,
+        "encoded_embeddings": encoded,
+        "shards": sorted(affected),
+        "new_source": not previous,
+    }
+
+
+def invalidate_cached_answers(cache: SemanticCache, result):
+    """
+    Drops cached answers made stale by `ingest_file`'s `result`; returns what
+    was done, for job reporting.
+
+    A new document can answer questions whose cached answers predate it (or
+    were cached under a filter naming it), so every answer is dropped. A
+    replaced document only drops answers that cite it: answers built from other
+    documents are kept even if the new version would now also be relevant.
+    """
+    if result["new_source"]:
+        cache.clear()
+        return {"answer_cache_cleared": True}
+    return {"invalidated_answers": cache.invalidate_sources([result["source"]])}
+
+
+def ingest_documents(
+    index_type: str = FAISS_INDEX_TYPE,
+    num_shards: int = NUM_SHARDS,
+    shard_by: str = SHARD_BY,
+    only_shards=None,
+):
     """
     Reads text files from data/documents, chunks them, computes embeddings,
-    and saves a FAISS index.
+    and saves a FAISS index. Embeddings of unchanged chunks come from the
+    persistent EmbeddingStore instead of being re-encoded.
     """
+    if only_shards is not None:
+        try:
+            check_partial_rebuild(only_shards, num_shards, shard_by, SHARDS_DIR)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
+
     print(f"Loading embedding model: {EMBEDDING_MODEL_NAME}...")
     model = SentenceTransformer(EMBEDDING_MODEL_NAME)
 
-    docs_path = DATA_DIR / "documents" / "*.txt"
-    files = glob.glob(str(docs_path))
+    DOCS_DIR.mkdir(parents=True, exist_ok=True)
+    files = document_files(DOCS_DIR)
 
     if not files:
         print("No documents found in data/documents.")
         return
 
-    documents = []
-    doc_sources = []
-
     print(f"Found {len(files)} documents.")
 
-    # Simple chunking (by line for this demo to avoid complex deps like LangChain)
-    # In a real app, use recursive character splitting.
-    for file_path in files:
-        with open(file_path, "r", encoding="utf-8") as f:
-            lines = [line.strip() for line in f.readlines() if line.strip()]
-            documents.extend(lines)
-            doc_sources.extend([os.path.basename(file_path)] * len(lines))
+    # Sentence-packed windows with overlap (see core/chunker.py for the knobs)
+    documents, doc_sources, offsets = load_chunks(files)
 
     print(f"Generated {len(documents)} chunks.")
 
@@ -51,26 +463,51 @@ def ingest_documents():
         return
 
     print("Creating embeddings...")
-    embeddings = model.encode(documents)
-
-    # Initialize FAISS
-    dimension = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dimension)
-    index.add(np.array(embeddings).astype("float32"))
-
-    # Save Index
-    if not os.path.exists(os.path.dirname(FAISS_INDEX_PATH)):
-        os.makedirs(os.path.dirname(FAISS_INDEX_PATH))
+    store = EmbeddingStore(EMBEDDING_MODEL_NAME)
+    embeddings, reused, encoded = embed_chunks(model, store, documents)
+    print(f"Reused {reused} cached embeddings, encoded {encoded} chunks.")
 
-    faiss.write_index(index, str(FAISS_INDEX_PATH) + ".bin")
+    # Build and save each FAISS shard independently
+    write_shards(
+        documents,
+        doc_sources,
+        offsets,
+        embeddings,
+        num_shards=num_shards,
+        shard_by=shard_by,
+        index_type=index_type,
+        only_shards=only_shards,
+        doc_info=load_document_info(files),
+    )
 
-    # Save metadata (documents mapping)
-    with open(str(FAISS_INDEX_PATH) + "_meta.pkl", "wb") as f:
-        pickle.dump({"documents": documents, "sources": doc_sources}, f)
+    # Cached answers may cite chunks that changed. Routing decisions do not depend on
+    # the index and are kept; retrieval results are keyed by the new index version.
+    SemanticCache().clear()
+    print("Cleared cached answers.")
 
-    print(f"Index saved to {FAISS_INDEX_PATH}.bin")
+    print(f"Index saved to {SHARDS_DIR} ({num_shards} shards)")
     print("Ingestion complete.")
 
 
 if __name__ == "__main__":
-    ingest_documents()
+    parser = argparse.ArgumentParser(description="Build the FAISS index from data/documents.")
+    parser.add_argument(
+        "--index-type",
+        default=FAISS_INDEX_TYPE,
+        help='FAISS index factory string, e.g. "Flat", "HNSW32", "IVF64,Flat"',
+    )
+    parser.add_argument("--shards", type=int, default=NUM_SHARDS, help="Number of index shards")
+    parser.add_argument(
+        "--shard-by",
+        choices=["source", "hash"],
+        default=SHARD_BY,
+        help="Partition chunks by source document or by chunk hash",
+    )
+    parser.add_argument(
+        "--only-shard",
+        type=int,
+        action="append",
+        help="Rebuild only this shard (repeatable); other shards are left untouched",
+    )
+    args = parser.parse_args()
+    ingest_documents(args.index_type, args.shards, args.shard_by, args.only_shard)
@@ -0,0 +1,191 @@
+"""
+Offline semantic-cache pre-warming from query logs or FAQ lists.
+
+1. Reads queries (plain text, one per line, or JSONL with a "query" field).
+2. Encodes them in batches with the retrieval embedding model.
+3. Clusters near-duplicates using the cache's own similarity threshold, so
+   each cluster would be served by a single cache entry.
+4. Runs one representative per cluster (the most frequent query) through
+   AgentRouter with bounded concurrency.
+5. Bulk-inserts all answers into the cache in one transaction.
+
+Completed answers are appended to a progress file as they finish; re-running
+the same command resumes from it, and clusters already in the cache are skipped.
+
+Usage: python scripts/prewarm_cache.py queries.log faq.txt [--concurrency 4]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+# isort: off
+from core.agent_router import AgentRouter  # noqa: E402
+from core.config import DATA_DIR  # noqa: E402
+
+# isort: on
+
+DEFAULT_PROGRESS_FILE = DATA_DIR / "prewarm_progress.jsonl"
+
+
+def read_queries(paths):
+    """
+    Returns queries ordered by frequency (most frequent first). Lines starting
+    with "{" that are not a JSON object with a string "query" are skipped.
+    """
+    counts = Counter()
+    malformed = 0
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if line.startswith("{"):
+                    try:
+                        line = json.loads(line).get("query", "")
+                    except json.JSONDecodeError:
+                        line = None
+                    if not isinstance(line, str):
+                        malformed += 1
+                        continue
+                    line = line.strip()
+                if line:
+                    counts[" ".join(line.split())] += 1
+    if malformed:
+        print(f"Warning: Skipped {malformed} malformed JSON query lines.")
+    return [query for query, _ in counts.most_common()]
+
+
+def cluster_queries(vectors: np.ndarray, threshold: float):
+    """
+    Greedy leader clustering on cosine similarity. `vectors` must be ordered by
+    priority; each vector joins the first leader it matches at >= threshold.
+    Returns the leader index for every vector.
+    """
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit = vectors / np.where(norms == 0, 1, norms)
+    leaders = np.empty_like(unit)
+    leader_ids = []
+    assignment = []
+    for i, vec in enumerate(unit):
+        if leader_ids:
+            sims = leaders[: len(leader_ids)] @ vec
+            best = int(np.argmax(sims))
+            if sims[best] >= threshold:
+                assignment.append(leader_ids[best])
+                continue
+        leaders[len(leader_ids)] = vec
+        leader_ids.append(i)
+        assignment.append(i)
+    return assignment
+
+
+def load_progress(path: Path):
+    done = {}
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    done[entry["query"]] = entry
+    return done
+
+
+async def run_representatives(router, queries, vectors, progress_path: Path, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    completed = 0
+
+    async def run_one(query, vector, progress):
+        nonlocal completed
+        async with semaphore:
+            final = None
+            async for event in router.process_query(
+                query, query_vector=vector, store_in_cache=False
+            ):
+                if event["step"] == "complete":
+                    final = event["final_response"]
+        context = final.get("context_used", [])
+        entry = {
+            "query": query,
+            "answer": final["answer"],
+            "sources": [c.get("source", "") for c in context if isinstance(c, dict)],
+            "verification": final.get("verification"),
+            "no_relevant_context": final.get("no_relevant_context", False),
+        }
+        # Single-threaded event loop: lines are written whole, one at a time
+        progress.write(json.dumps(entry) + "\n")
+        progress.flush()
+        completed += 1
+        print(f"[{completed}/{len(queries)}] {query}")
+
+    with open(progress_path, "a", encoding="utf-8") as progress:
+        await asyncio.gather(*(run_one(q, v, progress) for q, v in zip(queries, vectors)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-warm the semantic cache.")
+    parser.add_argument("inputs", nargs="+", help="Query log / FAQ files")
+    parser.add_argument("--concurrency", type=int, default=4, help="Pipelines run at once")
+    parser.add_argument("--batch-size", type=int, default=64, help="Embedding batch size")
+    parser.add_argument("--progress", type=Path, default=DEFAULT_PROGRESS_FILE)
+    args = parser.parse_args()
+
+    queries = read_queries(args.inputs)
+    if not queries:
+        print("No queries found.")
+        return
+    print(f"Read {len(queries)} distinct queries.")
+
+    router = AgentRouter()
+    cache = router.cache
+    vectors = np.asarray(
+        router.retrieval_agent.model.encode(queries, batch_size=args.batch_size), dtype=np.float32
+    )
+
+    assignment = cluster_queries(vectors, cache.threshold)
+    representatives = sorted(set(assignment))
+    print(f"{len(representatives)} clusters at similarity >= {cache.threshold}.")
+
+    args.progress.parent.mkdir(parents=True, exist_ok=True)
+    done = load_progress(args.progress)
+    todo = [i for i in representatives if queries[i] not in done and not cache.lookup(vectors[i])]
+    print(f"{len(representatives) - len(todo)} already cached or completed; running {len(todo)}.")
+
+    asyncio.run(
+        run_representatives(
+            router,
+            [queries[i] for i in todo],
+            [vectors[i] for i in todo],
+            args.progress,
+            args.concurrency,
+        )
+    )
+
+    # One transaction for everything completed (including earlier interrupted runs)
+    index_of = {queries[i]: i for i in representatives}
+    done = load_progress(args.progress)
+    # "Nothing relevant" answers would outlive the upload that makes them wrong
+    entries = [
+        {**entry, "query_vector": vectors[index_of[query]]}
+        for query, entry in done.items()
+        if query in index_of
+        and not entry.get("no_relevant_context")
+        and not cache.lookup(vectors[index_of[query]])
+    ]
+    # Written through to a shared cache before the progress file (the only other copy) goes
+    cache.store_many(entries, sync=True)
+    cache.flush()
+    args.progress.unlink()
+    print(f"Inserted {len(entries)} cache entries.")
+
+
+if __name__ == "__main__":
+    main()
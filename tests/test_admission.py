@@ -0,0 +1,100 @@
+import asyncio
+import sys
+import unittest
+from pathlib import Path
+from unittest import IsolatedAsyncioTestCase
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from core.admission import (  # noqa: E402
+    PRIORITY_NORMAL,
+    PRIORITY_SHORT,
+    AdmissionController,
+    Overloaded,
+)
+
+
+class TestAdmissionController(IsolatedAsyncioTestCase):
+    async def test_bounds_concurrent_pipelines(self):
+        controller = AdmissionController(max_concurrent=2, queue_timeout=0.05)
+        await controller.acquire()
+        await controller.acquire()
+
+        with self.assertRaises(Overloaded) as ctx:
+            await controller.acquire()
+        self.assertGreaterEqual(ctx.exception.retry_after, 1)
+        self.assertEqual(controller.metrics()["shed_deadline"], 1)
+        self.assertEqual(controller.metrics()["queue_depth"], 0)
+
+    async def test_short_queries_are_admitted_first(self):
+        controller = AdmissionController(max_concurrent=1, queue_timeout=1.0)
+        running = await controller.acquire()
+        order = []
+
+        async def wait(priority, label):
+            slot = await controller.acquire(priority)
+            order.append(label)
+            slot.release()
+
+        tasks = [
+            asyncio.create_task(wait(PRIORITY_NORMAL, "long")),
+            asyncio.create_task(wait(PRIORITY_SHORT, "short")),
+        ]
+        await asyncio.sleep(0.01)
+        self.assertEqual(controller.metrics()["queue_depth"], 2)
+        running.release()
+        await asyncio.gather(*tasks)
+
+        self.assertEqual(order, ["short", "long"])
+        self.assertEqual(controller.metrics()["active_pipelines"], 0)
+
+    async def test_full_queue_sheds_immediately(self):
+        controller = AdmissionController(max_concurrent=1, queue_timeout=1.0, max_queue=1)
+        slot = await controller.acquire()
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0.01)
+
+        with self.assertRaises(Overloaded):
+            await controller.acquire()
+        self.assertEqual(controller.metrics()["shed_queue_full"], 1)
+
+        slot.release()
+        (await waiter).release()
+
+    async def test_cancelled_waiter_does_not_leak_slot(self):
+        controller = AdmissionController(max_concurrent=1, queue_timeout=1.0)
+        slot = await controller.acquire()
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.sleep(0.01)
+        slot.release()
+        slot.release()  # idempotent
+
+        self.assertEqual(controller.metrics()["active_pipelines"], 0)
+        (await controller.acquire()).release()
+
+    async def test_token_bucket_rate_limits_per_client(self):
+        controller = AdmissionController(rate_per_minute=60, burst=2)
+
+        self.assertEqual(controller.check_quota("a"), 0)
+        self.assertEqual(controller.check_quota("a"), 0)
+        self.assertGreater(controller.check_quota("a"), 0)
+        self.assertEqual(controller.check_quota("b"), 0)
+        self.assertEqual(controller.metrics()["rate_limited"], 1)
+
+    async def test_bucket_count_is_capped(self):
+        controller = AdmissionController(rate_per_minute=60, burst=1, max_buckets=3)
+        self.assertEqual(controller.check_quota("a"), 0)
+        for client_id in ["b", "c"]:
+            controller.check_quota(client_id)
+        self.assertGreater(controller.check_quota("a"), 0)  # "a" is now the most recent
+
+        controller.check_quota("d")  # evicts "b", the least recently seen
+        self.assertEqual(list(controller._buckets), ["c", "a", "d"])
+        self.assertGreater(controller.check_quota("a"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,281 @@
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from core.cache_backends import (  # noqa: E402
+    RemoteCacheBackend,
+    ReplicatedCacheBackend,
+    SqliteCacheBackend,
+)
+from core.cache_manager import SemanticCache  # noqa: E402
+from core.cache_server import CacheServer  # noqa: E402
+from core.chunk_metadata import filter_key  # noqa: E402
+from scripts.prewarm_cache import cluster_queries, read_queries  # noqa: E402
+
+
+class TestSemanticCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = SemanticCache(db_path=Path(self.tmp.name) / "cache.db")
+        self.vector = np.ones(8, dtype=np.float32)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hit_for_near_duplicate(self):
+        self.cache.store("q", self.vector, "answer")
+        hit = self.cache.lookup(self.vector * 1.01)
+
+        self.assertIsNotNone(hit)
+        self.assertEqual(hit["answer"], "answer")
+
+    def test_filtered_and_unfiltered_answers_do_not_mix(self):
+        scoped = filter_key({"sources": ["b.txt", "a.txt"]})
+        self.cache.store("q", self.vector, "scoped answer", filter_key=scoped)
+
+        self.assertIsNone(self.cache.lookup(self.vector))
+        self.assertEqual(
+            self.cache.lookup(self.vector, filter_key({"sources": ["a.txt", "b.txt"]}))["answer"],
+            "scoped answer",
+        )
+        self.assertIsNone(self.cache.lookup(self.vector, filter_key({"sources": ["a.txt"]})))
+
+    def test_store_many_inserts_all_entries(self):
+        other = np.zeros(8, dtype=np.float32)
+        other[0] = 1.0
+        self.cache.store_many(
+            [
+                {"query": "a", "query_vector": self.vector, "answer": "A"},
+                {"query": "b", "query_vector": other, "answer": "B", "sources": ["x.txt"]},
+            ]
+        )
+
+        self.assertEqual(self.cache.lookup(self.vector)["answer"], "A")
+        self.assertEqual(self.cache.lookup(other)["sources"], ["x.txt"])
+
+    def test_invalidate_sources_drops_only_citing_answers(self):
+        other = np.zeros(8, dtype=np.float32)
+        other[0] = 1.0
+        self.cache.store("a", self.vector, "A", sources=["a.txt", "b.txt"])
+        self.cache.store("b", other, "B", sources=["c.txt"])
+
+        self.assertEqual(self.cache.invalidate_sources(["b.txt"]), 1)
+        self.assertIsNone(self.cache.lookup(self.vector))
+        self.assertEqual(self.cache.lookup(other)["answer"], "B")
+
+
+def unit_vector(i, dim=32):
+    vector = np.zeros(dim, dtype=np.float32)
+    vector[i] = 1.0
+    return vector
+
+
+class TestSharedCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = CacheServer(SqliteCacheBackend(Path(self.tmp.name) / "shared.db")).start()
+        self.nodes = []
+
+    def tearDown(self):
+        for node in self.nodes:
+            node.backend.flush()
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def node(self, url=None, interval=60.0):
+        """A simulated API node; the long interval leaves replication to explicit flush()."""
+        backend = ReplicatedCacheBackend(
+            RemoteCacheBackend(url or self.server.url, timeout=1), threshold=0.96, interval=interval
+        )
+        cache = SemanticCache(threshold=0.96, backend=backend)
+        self.nodes.append(cache)
+        return cache
+
+    def test_answer_stored_on_one_node_is_served_by_another(self):
+        a, b = self.node(), self.node()
+        a.store("q", unit_vector(0), "answer", sources=["a.txt"])
+        self.assertIsNotNone(a.lookup(unit_vector(0)))  # local L1, before replication
+        self.assertIsNone(b.lookup(unit_vector(0)))
+
+        a.backend.flush()
+        self.assertEqual(b.lookup(unit_vector(0))["answer"], "answer")
+        self.assertEqual(b.lookup(unit_vector(0) * 1.01)["answer"], "answer")
+        self.assertEqual((b.stats()["remote_hits"], b.stats()["l1_hits"]), (1, 1))
+
+    def test_writes_are_replicated_in_batches_in_the_background(self):
+        a = self.node(interval=0.05)
+        a.store_many(
+            [{"query": f"q{i}", "query_vector": unit_vector(i), "answer": "A"} for i in range(5)]
+        )
+        deadline = time.monotonic() + 5
+        while a.stats()["replicated"] < 5 and time.monotonic() < deadline:
+            time.sleep(0.02)
+
+        self.assertEqual(a.stats()["replicated"], 5)
+        self.assertEqual(self.node().lookup(unit_vector(3))["answer"], "A")
+
+    def test_invalidation_reaches_other_nodes_l1(self):
+        a, b = self.node(), self.node()
+        a.store("q", unit_vector(0), "answer", sources=["a.txt"])
+        a.backend.flush()
+        b.backend._sync_generation()
+        self.assertIsNotNone(b.lookup(unit_vector(0)))  # now also in b's L1
+
+        self.assertEqual(a.invalidate_sources(["a.txt"]), 1)
+        b.backend._sync_generation()
+        self.assertIsNone(b.lookup(unit_vector(0)))
+
+    def test_unflushed_writes_do_not_survive_another_nodes_invalidation(self):
+        a, b = self.node(), self.node()
+        b.store("q", unit_vector(0), "old answer", sources=["x.txt"])  # queued, not yet sent
+        a.invalidate_sources(["x.txt"])  # x.txt re-ingested elsewhere
+
+        b.backend.flush()
+        self.assertIsNone(self.node().lookup(unit_vector(0)))
+        self.assertEqual(b.stats()["rejected_stale"], 1)
+
+        # Once b syncs, its queue only holds writes made under the new generation
+        b.store("q2", unit_vector(1), "old answer", sources=["x.txt"])
+        a.invalidate_sources(["x.txt"])
+        b.backend._sync_generation()
+        self.assertEqual(b.stats()["pending"], 0)
+
+    def test_own_invalidation_keeps_unrelated_pending_writes(self):
+        a = self.node()
+        a.store("q", unit_vector(0), "answer", sources=["a.txt"])
+        a.invalidate_sources(["x.txt"])
+        a.store("q2", unit_vector(1), "answer", sources=["a.txt"])
+
+        a.backend.flush()
+        self.assertEqual((a.stats()["replicated"], a.stats()["rejected_stale"]), (2, 0))
+
+    def test_failed_flush_does_not_requeue_writes_dropped_by_clear(self):
+        node = self.node()
+        backend = node.backend
+        remote_store = backend.remote.store_many
+
+        def clear_then_fail(entries):
+            backend.remote.store_many = remote_store
+            node.clear()  # lands while the batch is in flight
+            raise OSError("connection reset")
+
+        node.store("q", unit_vector(0), "answer")
+        backend.remote.store_many = clear_then_fail
+        backend.flush()
+        self.assertEqual(node.stats()["pending"], 0)
+
+    def test_unreachable_server_degrades_to_local_cache(self):
+        port = self.server.httpd.server_address[1]
+        self.server.stop()
+        node = self.node(url=f"http://127.0.0.1:{port}")
+        node.store("q", unit_vector(0), "answer")
+        node.backend.flush()
+
+        self.assertEqual(node.lookup(unit_vector(0))["answer"], "answer")
+        self.assertIsNone(node.lookup(unit_vector(1)))
+        self.assertGreater(node.stats()["remote_errors"], 0)
+        self.assertEqual(node.stats()["pending"], 1)  # kept for retry
+        self.nodes.clear()
+
+    def test_hit_ratio_does_not_drop_as_nodes_are_added(self):
+        # 20 distinct queries asked 5 times each, spread round-robin over the nodes
+        stream = [unit_vector(i) for i in range(20)] * 5
+
+        def hit_ratio(num_nodes):
+            self.server.clear({})
+            nodes = [self.node() for _ in range(num_nodes)]
+            hits = 0
+            for i, vector in enumerate(stream):
+                node = nodes[i % num_nodes]
+                if node.lookup(vector):
+                    hits += 1
+                else:
+                    node.store(f"q{i}", vector, "answer")
+                    node.backend.flush()
+            return hits / len(stream)
+
+        self.assertEqual(hit_ratio(4), hit_ratio(1))
+        self.assertEqual(hit_ratio(1), 0.8)
+
+    def test_hung_server_costs_one_timeout_then_lookups_skip_it(self):
+        # Accepts connections (kernel backlog) but never answers
+        hung = socket.socket()
+        hung.bind(("127.0.0.1", 0))
+        hung.listen(16)
+        self.addCleanup(hung.close)
+        backend = ReplicatedCacheBackend(
+            RemoteCacheBackend(f"http://127.0.0.1:{hung.getsockname()[1]}", timeout=0.3),
+            threshold=0.96,
+            interval=60.0,
+            breaker_seconds=60.0,
+        )
+        node = SemanticCache(threshold=0.96, backend=backend)
+
+        # The generation probe at startup pays the timeout; lookups then go straight to the L1
+        start = time.monotonic()
+        for i in range(5):
+            self.assertIsNone(node.lookup(unit_vector(i)))
+        self.assertLess(time.monotonic() - start, 0.3)
+        self.assertEqual((node.stats()["remote_errors"], node.stats()["remote_skipped"]), (1, 5))
+
+        node.clear()  # logged, not raised
+        self.assertFalse(backend.remote_available)
+
+    def test_breaker_closes_once_the_server_answers(self):
+        node = self.node()
+        node.backend._remote_failed()
+        self.assertFalse(node.backend.remote_available)
+        node.backend._sync_generation()
+        self.assertTrue(node.backend.remote_available)
+
+    def test_sync_store_writes_through(self):
+        a = self.node()
+        a.store_many([{"query": "q", "query_vector": unit_vector(0), "answer": "A"}], sync=True)
+        self.assertEqual(a.stats()["pending"], 0)
+        self.assertEqual(self.node().lookup(unit_vector(0))["answer"], "A")
+
+    def test_pending_writes_are_flushed_at_exit(self):
+        script = (
+            "import numpy as np\n"
+            "from core.cache_backends import RemoteCacheBackend, ReplicatedCacheBackend\n"
+            f"backend = ReplicatedCacheBackend(RemoteCacheBackend({self.server.url!r}), 0.96, "
+            "interval=60)\n"
+            "backend.store_many([{'query': f'q{i}', 'query_vector': np.eye(32, dtype=np.float32)"
+            "[i], 'answer': 'A'} for i in range(5)])\n"
+        )
+        subprocess.run([sys.executable, "-c", script], cwd=Path(__file__).parent.parent, check=True)
+        self.assertEqual(self.node().lookup(unit_vector(4))["answer"], "A")
+
+
+class TestPrewarm(unittest.TestCase):
+    def test_near_duplicates_share_a_leader(self):
+        vectors = np.array(
+            [[1.0, 0.0, 0.0], [0.99, 0.05, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]],
+            dtype=np.float32,
+        )
+        self.assertEqual(cluster_queries(vectors, threshold=0.96), [0, 0, 2, 3])
+
+    def test_queries_are_deduplicated_and_ordered_by_frequency(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            log = Path(tmp) / "queries.log"
+            log.write_text('rare\nWhat is   Bedrock?\n{"query": "What is Bedrock?"}\n\n')
+            self.assertEqual(read_queries([log]), ["What is Bedrock?", "rare"])
+
+    def test_malformed_json_lines_are_skipped(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            log = Path(tmp) / "queries.jsonl"
+            log.write_text('{"query": "ok"}\n{"query": "cut off\n{"query": 3}\nplain\n')
+            self.assertEqual(read_queries([log]), ["ok", "plain"])
+
+
+if __name__ == "__main__":
+    unittest.main()
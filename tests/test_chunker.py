@@ -0,0 +1,81 @@
+import sys
+import unittest
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from core.chunker import Chunker  # noqa: E402
+
+SENTENCE = "Amazon Bedrock offers foundation models through a single API. "
+
+
+class TestChunker(unittest.TestCase):
+    def test_short_lines_are_merged(self):
+        text = "\n".join(f"Line {i}." for i in range(50))
+        chunks = Chunker(chunk_size=200, overlap=0, min_chunk_size=50).split_text(text)
+
+        self.assertLess(len(chunks), 50)
+        self.assertTrue(all(len(c["content"]) <= 200 for c in chunks))
+
+    def test_windows_overlap_on_sentence_boundaries(self):
+        text = SENTENCE * 20
+        chunks = Chunker(chunk_size=300, overlap=80, min_chunk_size=50).split_text(text)
+
+        self.assertGreater(len(chunks), 1)
+        for prev, nxt in zip(chunks, chunks[1:]):
+            self.assertLess(nxt["start_byte"], prev["end_byte"])
+            self.assertTrue(nxt["content"].startswith("Amazon Bedrock"))
+
+    def test_prefers_paragraph_boundaries(self):
+        para_a = SENTENCE * 3
+        para_b = "IAM controls who can access AWS resources. " * 2
+        chunks = Chunker(chunk_size=300, overlap=0, min_chunk_size=50).split_text(
+            para_a + "\n\n" + para_b
+        )
+
+        self.assertEqual(len(chunks), 2)
+        self.assertTrue(chunks[1]["content"].startswith("IAM"))
+
+    def test_byte_offsets_match_source(self):
+        text = "Überblick über Bedrock. " * 30 + "\n\nSicherheit mit IAM — Zugriff. " * 10
+        encoded = text.encode("utf-8")
+        for chunk in Chunker(chunk_size=250, overlap=40, min_chunk_size=60).split_text(text):
+            start, end = chunk["start_byte"], chunk["end_byte"]
+            self.assertEqual(encoded[start:end].decode("utf-8"), chunk["content"])
+
+    def test_oversized_sentence_is_hard_split_in_tokens(self):
+        text = "token " * 120
+        chunks = Chunker(chunk_size=50, overlap=10, min_chunk_size=5, unit="tokens").split_text(
+            text
+        )
+
+        self.assertTrue(all(len(c["content"].split()) <= 50 for c in chunks))
+        self.assertEqual(chunks[-1]["end_byte"], len(text.rstrip()))
+
+    def test_text_without_whitespace_is_sliced(self):
+        chunker = Chunker(chunk_size=800, overlap=120, min_chunk_size=200)
+        for text in ["汉" * 6000, "https://example.com/" + "a" * 2980]:
+            chunks = chunker.split_text(text)
+            self.assertGreater(len(chunks), 1)
+            self.assertTrue(all(len(c["content"]) <= 800 for c in chunks))
+            self.assertEqual(chunks[0]["content"], text[:800])
+            self.assertEqual(chunks[-1]["end_byte"], len(text.encode("utf-8")))
+            for prev, nxt in zip(chunks, chunks[1:]):
+                self.assertLess(nxt["start_byte"], prev["end_byte"])
+
+    def test_cjk_full_stop_ends_a_sentence(self):
+        sentence = "亚马逊Bedrock通过单一API提供基础模型。"
+        chunks = Chunker(chunk_size=100, overlap=0, min_chunk_size=10).split_text(sentence * 20)
+
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(c["content"].endswith("。") for c in chunks))
+        self.assertTrue(all(len(c["content"]) <= 100 for c in chunks))
+
+    def test_invalid_overlap_rejected(self):
+        with self.assertRaises(ValueError):
+            Chunker(chunk_size=100, overlap=100)
+
+
+if __name__ == "__main__":
+    unittest.main()
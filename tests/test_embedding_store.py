@@ -0,0 +1,97 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from scripts.ingest import EmbeddingStore, build_index, embed_chunks  # noqa: E402
+
+
+class CountingModel:
+    """Deterministic stand-in encoder that counts how many texts it encodes."""
+
+    def __init__(self, dim=8):
+        self.dim = dim
+        self.encoded = 0
+
+    def encode(self, texts):
+        self.encoded += len(texts)
+        return np.array(
+            [np.random.default_rng(sum(map(ord, t))).standard_normal(self.dim) for t in texts],
+            dtype=np.float32,
+        )
+
+
+class TestEmbeddingStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_interleaved_writers_keep_keys_on_their_vectors(self):
+        a = EmbeddingStore("model", root=self.root)
+        a.add_many(["base"], np.zeros((1, 8)))
+        b = EmbeddingStore("model", root=self.root)
+        b.add_many(["x"], np.full((1, 8), 1.0))
+        a.add_many(["y"], np.full((1, 8), 2.0))  # a's view predates b's append
+
+        reloaded = EmbeddingStore("model", root=self.root)
+        self.assertEqual(len(reloaded.rows), 3)
+        np.testing.assert_array_equal(reloaded.get_many(["x"]), np.full((1, 8), 1.0))
+        np.testing.assert_array_equal(reloaded.get_many(["y"]), np.full((1, 8), 2.0))
+        np.testing.assert_array_equal(a.get_many(["x", "y"])[:, 0], [1.0, 2.0])
+
+    def test_second_run_reuses_everything(self):
+        model = CountingModel()
+        docs = ["alpha chunk", "beta chunk", "alpha chunk"]
+
+        first, reused, encoded = embed_chunks(model, EmbeddingStore("m", self.root), docs)
+        self.assertEqual((reused, encoded), (0, 3))
+        self.assertEqual(model.encoded, 2)  # duplicate text encoded once
+
+        second, reused, encoded = embed_chunks(model, EmbeddingStore("m", self.root), docs)
+        self.assertEqual((reused, encoded), (3, 0))
+        self.assertEqual(model.encoded, 2)
+        np.testing.assert_array_equal(first, second)
+        self.assertEqual(second.dtype, np.float32)
+
+    def test_only_new_chunks_are_encoded(self):
+        model = CountingModel()
+        embed_chunks(model, EmbeddingStore("m", self.root), ["a", "b"])
+        _, reused, encoded = embed_chunks(model, EmbeddingStore("m", self.root), ["b", "c"])
+
+        self.assertEqual((reused, encoded), (1, 1))
+        self.assertEqual(model.encoded, 3)
+
+    def test_keys_are_scoped_per_model(self):
+        model = CountingModel()
+        embed_chunks(model, EmbeddingStore("model-a", self.root), ["a"])
+        _, reused, _ = embed_chunks(model, EmbeddingStore("model-b", self.root), ["a"])
+
+        self.assertEqual(reused, 0)
+
+    def test_vectors_stored_as_float16(self):
+        store = EmbeddingStore("m", self.root)
+        embed_chunks(CountingModel(dim=8), store, ["a", "b"])
+
+        self.assertEqual(store.vectors_path.stat().st_size, 2 * 8 * 2)
+
+    def test_rebuild_with_other_index_type(self):
+        model = CountingModel()
+        docs = [f"chunk {i}" for i in range(20)]
+        embed_chunks(model, EmbeddingStore("m", self.root), docs)
+        embeddings, _, encoded = embed_chunks(model, EmbeddingStore("m", self.root), docs)
+
+        self.assertEqual(encoded, 0)
+        self.assertEqual(build_index(embeddings, "Flat").ntotal, 20)
+        self.assertEqual(build_index(embeddings, "HNSW8").ntotal, 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
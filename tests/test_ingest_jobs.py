@@ -0,0 +1,240 @@
+import json
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from core.cache_manager import SemanticCache  # noqa: E402
+from core.chunker import Chunker  # noqa: E402
+from core.ingest_jobs import IngestionJobQueue  # noqa: E402
+from core.shard_index import ShardedIndex, load_manifest  # noqa: E402
+from scripts.ingest import (  # noqa: E402
+    EmbeddingStore,
+    document_files,
+    embed_chunks,
+    ingest_file,
+    invalidate_cached_answers,
+    is_document_name,
+    write_shards,
+)
+
+DIM = 8
+
+
+class CountingModel:
+    """Deterministic stand-in encoder that counts how many texts it encodes."""
+
+    def __init__(self, dim=DIM):
+        self.dim = dim
+        self.encoded = 0
+
+    def encode(self, texts):
+        self.encoded += len(texts)
+        return np.array(
+            [np.random.default_rng(sum(map(ord, t))).standard_normal(self.dim) for t in texts],
+            dtype=np.float32,
+        )
+
+
+class TestIngestFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.docs = root / "documents"
+        self.docs.mkdir()
+        self.shards_dir = root / "shards"
+        self.model = CountingModel()
+        self.store = EmbeddingStore("m", root / "cache")
+        self.chunker = Chunker(chunk_size=60, overlap=0, min_chunk_size=10)
+
+        documents = [f"existing chunk {i}" for i in range(6)]
+        sources = [f"old_{i % 3}.txt" for i in range(6)]
+        embeddings, _, _ = embed_chunks(self.model, self.store, documents)
+        write_shards(
+            documents,
+            sources,
+            [(0, 0)] * 6,
+            embeddings,
+            num_shards=2,
+            shards_dir=self.shards_dir,
+            doc_info={s: {"uploaded_at": 1.0, "tags": ["legacy"]} for s in sources},
+        )
+        self.index = ShardedIndex.load(self.shards_dir)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_doc(self, name, text):
+        path = self.docs / name
+        path.write_text(text, encoding="utf-8")
+        return path
+
+    def ingest(self, path):
+        return ingest_file(
+            path,
+            self.index,
+            self.model,
+            shards_dir=self.shards_dir,
+            store=self.store,
+            chunker=self.chunker,
+            tags_file=self.docs / "tags.json",
+        )
+
+    def all_chunks(self, index):
+        return [
+            (shard.metadata.source(i), doc)
+            for shard in index.shards.values()
+            for i, doc in enumerate(shard.documents)
+        ]
+
+    def test_new_document_is_searchable_and_persisted(self):
+        path = self.write_doc("new.txt", "Alpha sentence here. Beta sentence here.")
+        before = self.index.version
+        encoded_before = self.model.encoded
+
+        result = self.ingest(path)
+
+        self.assertEqual(result["chunks"], 1)
+        self.assertEqual(self.model.encoded - encoded_before, 1)  # only the new file
+        self.assertNotEqual(self.index.version, before)
+        query = self.model.encode(["Alpha sentence here. Beta sentence here."])
+        _, shard_id, local_id = self.index.search(query, 1)[0]
+        self.assertEqual(self.index.get_chunk(shard_id, local_id)["source"], "new.txt")
+        # Other sources keep their metadata, and the change survives a reload
+        self.assertIn(("old_0.txt", "existing chunk 0"), self.all_chunks(self.index))
+        reloaded = ShardedIndex.load(self.shards_dir)
+        self.assertEqual(sorted(self.all_chunks(reloaded)), sorted(self.all_chunks(self.index)))
+        self.assertEqual(len(self.index.search(query, 10, {"tags": ["legacy"]})), 6)
+
+    def test_reupload_replaces_previous_chunks(self):
+        path = self.write_doc("new.txt", "First version of the text.")
+        self.ingest(path)
+        self.write_doc("new.txt", "Second version of the text.")
+        self.ingest(path)
+
+        new_chunks = [doc for source, doc in self.all_chunks(self.index) if source == "new.txt"]
+        self.assertEqual(new_chunks, ["Second version of the text."])
+        self.assertEqual(len(self.all_chunks(self.index)), 7)
+
+    def test_replacing_in_hash_sharded_index_cleans_every_shard(self):
+        manifest = load_manifest(self.shards_dir)
+        manifest["shard_by"] = "hash"
+        (self.shards_dir / "manifest.json").write_text(json.dumps(manifest))
+        path = self.write_doc("new.txt", " ".join(f"Sentence number {i}." for i in range(20)))
+        self.ingest(path)
+        self.write_doc("new.txt", "Short now.")
+        self.ingest(path)
+
+        new_chunks = [doc for source, doc in self.all_chunks(self.index) if source == "new.txt"]
+        self.assertEqual(new_chunks, ["Short now."])
+
+    def test_new_document_clears_answers_replacement_drops_citing_ones(self):
+        cache = SemanticCache(db_path=Path(self.tmp.name) / "cache.db")
+        vectors = np.eye(DIM, dtype=np.float32)
+        cache.store("q0", vectors[0], "not found", sources=[])
+        cache.store("q1", vectors[1], "from new", sources=["new.txt"], filter_key="s=new.txt")
+
+        path = self.write_doc("new.txt", "First version of the text.")
+        result = self.ingest(path)
+        self.assertTrue(result["new_source"])
+        self.assertEqual(invalidate_cached_answers(cache, result), {"answer_cache_cleared": True})
+        self.assertIsNone(cache.lookup(vectors[0]))
+
+        cache.store("q0", vectors[0], "from old", sources=["old_0.txt"])
+        cache.store("q1", vectors[1], "from new", sources=["new.txt"])
+        self.write_doc("new.txt", "Second version of the text.")
+        result = self.ingest(path)
+        self.assertFalse(result["new_source"])
+        self.assertEqual(invalidate_cached_answers(cache, result), {"invalidated_answers": 1})
+        self.assertEqual(cache.lookup(vectors[0])["answer"], "from old")
+        self.assertIsNone(cache.lookup(vectors[1]))
+
+    def test_only_text_documents_are_indexed(self):
+        for name in ["notes.md", "a.txt", "README.MD"]:
+            self.assertTrue(is_document_name(name), name)
+        for name in ["tags.json", "report.pdf", ".a.txt.part", "noext"]:
+            self.assertFalse(is_document_name(name), name)
+
+        for name in ["b.md", "a.txt", "tags.json", ".x.txt.part"]:
+            self.write_doc(name, "text")
+        self.assertEqual([Path(f).name for f in document_files(self.docs)], ["a.txt", "b.md"])
+
+    def test_has_source_tracks_ingested_documents(self):
+        self.assertTrue(self.index.has_source("old_0.txt"))
+        self.assertFalse(self.index.has_source("new.txt"))
+        self.ingest(self.write_doc("new.txt", "Some new text."))
+        self.assertTrue(self.index.has_source("new.txt"))
+
+    def test_snapshot_is_unaffected_by_later_swaps(self):
+        snapshot = self.index.snapshot()
+        self.ingest(self.write_doc("new.txt", "Some new text."))
+
+        self.assertNotEqual(snapshot.version, self.index.version)
+        self.assertNotIn("new.txt", [source for source, _ in self.all_chunks(snapshot)])
+
+
+class TestIngestionJobQueue(unittest.TestCase):
+    def test_jobs_run_in_order_and_report_throughput(self):
+        seen = []
+        jobs = IngestionJobQueue(lambda path: seen.append(path.name) or {"chunks": 2})
+        first = jobs.submit(Path("a.txt"), 100, "h1")
+        jobs.submit(Path("b.txt"), 300, "h2")
+        jobs.join()
+
+        self.assertEqual(seen, ["a.txt", "b.txt"])
+        self.assertEqual(jobs.get(first["id"])["status"], "done")
+        self.assertEqual(jobs.get(first["id"])["result"], {"chunks": 2})
+        stats = jobs.stats()
+        self.assertEqual(
+            (stats["done"], stats["bytes_ingested"], stats["chunks_ingested"]), (2, 400, 4)
+        )
+
+    def test_failed_job_keeps_error_and_worker_survives(self):
+        def handler(path):
+            if path.name == "bad.txt":
+                raise ValueError("cannot decode")
+            return {"chunks": 1}
+
+        jobs = IngestionJobQueue(handler)
+        bad = jobs.submit(Path("bad.txt"), 1, "h")
+        good = jobs.submit(Path("good.txt"), 1, "h")
+        jobs.join()
+
+        self.assertEqual(jobs.get(bad["id"])["status"], "failed")
+        self.assertEqual(jobs.get(bad["id"])["error"], "cannot decode")
+        self.assertEqual(jobs.get(good["id"])["status"], "done")
+
+    def test_last_done_ignores_failed_jobs(self):
+        jobs = IngestionJobQueue(lambda path: {"chunks": 1})
+        self.assertIsNone(jobs.last_done("a.txt"))
+        jobs.submit(Path("a.txt"), 1, "h1")
+        jobs.join()
+        jobs.handler = lambda path: 1 / 0
+        jobs.submit(Path("a.txt"), 1, "h2")
+        jobs.join()
+
+        self.assertEqual(jobs.last_done("a.txt")["sha256"], "h1")
+        self.assertIsNone(jobs.last_done("b.txt"))
+
+    def test_history_keeps_unfinished_jobs(self):
+        release = threading.Event()
+        jobs = IngestionJobQueue(lambda path: release.wait() and {"chunks": 0}, history=1)
+        ids = [jobs.submit(Path(f"{i}.txt"), 1, "h")["id"] for i in range(3)]
+
+        self.assertEqual(len(jobs.list()), 3)  # nothing finished, nothing dropped
+        release.set()
+        jobs.join()
+        jobs.submit(Path("last.txt"), 1, "h")
+        jobs.join()
+        self.assertEqual([job["filename"] for job in jobs.list()], ["last.txt"])
+        self.assertIsNone(jobs.get(ids[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
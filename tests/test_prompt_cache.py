@@ -0,0 +1,79 @@
+import sys
+import unittest
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agents.synthesis_agent import SynthesisAgent  # noqa: E402
+from agents.verifier_agent import VerifierAgent  # noqa: E402
+from core.llm_interface import BedrockLLM, SimulatedCacheLLM  # noqa: E402
+from core.prompts import build_context_prefix  # noqa: E402
+
+CONTEXT = [
+    {"source": "amazon_bedrock.txt", "content": "Amazon Bedrock is a managed service. " * 40},
+    {"source": "cloud_security.txt", "content": "IAM enforces least privilege. " * 40},
+]
+
+
+class RecordingLLM(SimulatedCacheLLM):
+    def __init__(self):
+        super().__init__(seconds_per_token=0.0, cached_seconds_per_token=0.0)
+        self.prefixes = []
+
+    def generate(self, system_prompt, user_prompt, temperature=0.0, cached_prefix=""):
+        self.prefixes.append(cached_prefix)
+        return super().generate(system_prompt, user_prompt, temperature, cached_prefix)
+
+
+class FailingClient:
+    def invoke_model(self, modelId, body):
+        raise RuntimeError("ThrottlingException")
+
+
+class TestPromptCache(unittest.TestCase):
+    def test_failed_bedrock_call_reports_zero_usage(self):
+        llm = BedrockLLM(region_name="us-east-1", model_id="model")
+        llm._record_usage(input_tokens=500, output_tokens=80)  # an earlier call on this thread
+        llm.client = FailingClient()
+
+        self.assertTrue(llm.generate("system", "user").startswith("Error:"))
+        self.assertEqual(llm.last_usage["input_tokens"], 0)
+        self.assertEqual(llm.last_usage["output_tokens"], 0)
+        self.assertTrue(llm.last_usage["error"])
+
+    def test_agents_share_identical_prefix(self):
+        llm = RecordingLLM()
+        answer = SynthesisAgent(llm).synthesize("What is Bedrock?", CONTEXT)
+        VerifierAgent(llm).verify("What is Bedrock?", answer, CONTEXT)
+
+        self.assertEqual(llm.prefixes[0], llm.prefixes[1])
+        self.assertEqual(llm.prefixes[0], build_context_prefix(CONTEXT))
+
+    def test_verifier_reads_prefix_from_cache(self):
+        llm = RecordingLLM()
+        answer = SynthesisAgent(llm).synthesize("What is Bedrock?", CONTEXT)
+        synthesis_usage = llm.last_usage
+        verification = VerifierAgent(llm).verify("What is Bedrock?", answer, CONTEXT)
+        verification_usage = llm.last_usage
+
+        self.assertTrue(verification["is_valid"])
+        self.assertEqual(synthesis_usage["cache_read_input_tokens"], 0)
+        self.assertGreater(synthesis_usage["cache_creation_input_tokens"], 0)
+        self.assertEqual(
+            verification_usage["cache_read_input_tokens"],
+            synthesis_usage["cache_creation_input_tokens"],
+        )
+        self.assertLess(verification_usage["input_tokens"], synthesis_usage["input_tokens"])
+
+    def test_simulated_latency_drops_on_cache_hit(self):
+        llm = SimulatedCacheLLM(seconds_per_token=0.00001, cached_seconds_per_token=0.0)
+        answer = SynthesisAgent(llm).synthesize("What is Bedrock?", CONTEXT)
+        first_ttft = llm.last_usage["ttft_ms"]
+        VerifierAgent(llm).verify("What is Bedrock?", answer, CONTEXT)
+
+        self.assertLess(llm.last_usage["ttft_ms"], first_ttft)
+
+
+if __name__ == "__main__":
+    unittest.main()
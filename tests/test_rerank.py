@@ -0,0 +1,68 @@
+import sys
+import unittest
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agents.rerank_agent import RerankAgent  # noqa: E402
+
+
+class KeywordCrossEncoder:
+    """Scores a pair by keyword overlap and records each batch it receives."""
+
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.batches.append(len(pairs))
+        return [len(set(q.lower().split()) & set(c.lower().split())) for q, c in pairs]
+
+
+CANDIDATES = [
+    {"content": "Bedrock hosts foundation models", "source": "a.txt", "chunk_id": "0:0"},
+    {"content": "IAM least privilege policies", "source": "b.txt", "chunk_id": "0:1"},
+    {"content": "unrelated text", "source": "c.txt", "chunk_id": "1:0"},
+    {
+        "content": "least privilege in IAM roles and IAM policies",
+        "source": "d.txt",
+        "chunk_id": "1:1",
+    },
+]
+
+
+class TestRerankAgent(unittest.TestCase):
+    def test_keeps_best_chunks_in_score_order(self):
+        agent = RerankAgent(model=KeywordCrossEncoder())
+        result = agent.rerank("iam least privilege policies", CANDIDATES, top_n=2)
+
+        self.assertEqual([c["source"] for c in result["context"]], ["b.txt", "d.txt"])
+        self.assertEqual(result["stats"]["candidates"], 4)
+        self.assertEqual(result["stats"]["kept"], 2)
+
+    def test_scores_in_one_batch_and_caches_pairs(self):
+        model = KeywordCrossEncoder()
+        agent = RerankAgent(model=model)
+        agent.rerank("iam policies", CANDIDATES[:3])
+        second = agent.rerank("iam policies", CANDIDATES)
+
+        self.assertEqual(model.batches, [3, 1])
+        self.assertEqual(second["stats"]["cache_hits"], 3)
+
+    def test_changed_content_is_rescored(self):
+        model = KeywordCrossEncoder()
+        agent = RerankAgent(model=model)
+        agent.rerank("iam", CANDIDATES[:1])
+        agent.rerank("iam", [{**CANDIDATES[0], "content": "IAM after re-ingest"}])
+
+        self.assertEqual(model.batches, [1, 1])
+
+    def test_cache_is_bounded(self):
+        agent = RerankAgent(model=KeywordCrossEncoder(), cache_size=2)
+        agent.rerank("q", CANDIDATES)
+
+        self.assertEqual(len(agent._cache), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import sys
+import unittest
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from core.agent_router import AgentRouter  # noqa: E402
+from core.retrieval_depth import cut_context, similarity_from_distance  # noqa: E402
+
+
+def chunks(*similarities):
+    return [
+        {"content": f"chunk {i}", "source": "a.txt", "chunk_id": f"0:{i}", "similarity": s}
+        for i, s in enumerate(similarities)
+    ]
+
+
+class TestRetrievalDepth(unittest.TestCase):
+    def test_similarity_from_distance(self):
+        # Normalized vectors: squared L2 of 0 is identical, 2 is orthogonal
+        self.assertEqual(similarity_from_distance(0.0, higher_is_better=False), 1.0)
+        self.assertEqual(similarity_from_distance(2.0, higher_is_better=False), 0.0)
+        self.assertEqual(similarity_from_distance(0.7, higher_is_better=True), 0.7)
+
+    def test_sharp_top_match_goes_alone(self):
+        kept, stats = cut_context(chunks(0.82, 0.55, 0.52, 0.5), 5, threshold=0.3, gap=0.1)
+        self.assertEqual([c["chunk_id"] for c in kept], ["0:0"])
+        self.assertEqual(stats["cut_by"], "gap")
+        self.assertEqual(stats["candidates"], 4)
+
+    def test_plateau_is_kept_up_to_max_k(self):
+        kept, stats = cut_context(chunks(0.61, 0.6, 0.58, 0.56, 0.55), 3, threshold=0.3, gap=0.1)
+        self.assertEqual(len(kept), 3)
+        self.assertEqual(stats["cut_by"], "max_k")
+
+        kept, stats = cut_context(chunks(0.61, 0.6, 0.58), 5, threshold=0.3, gap=0.1)
+        self.assertEqual(len(kept), 3)
+        self.assertEqual(stats["cut_by"], "pool")
+
+    def test_threshold_drops_irrelevant_tail(self):
+        kept, stats = cut_context(chunks(0.45, 0.4, 0.2, 0.1), 5, threshold=0.3, gap=0.1)
+        self.assertEqual(len(kept), 2)
+        self.assertEqual(stats["cut_by"], "threshold")
+
+    def test_nothing_relevant(self):
+        kept, stats = cut_context(chunks(0.2, 0.15), 3, threshold=0.3, gap=0.1)
+        self.assertEqual(kept, [])
+        self.assertEqual(stats["top_similarity"], 0.2)
+
+        kept, stats = cut_context([], 3)
+        self.assertEqual(kept, [])
+        self.assertIsNone(stats["top_similarity"])
+
+    def test_unscored_chunks_are_kept(self):
+        placeholder = [{"content": "No index available.", "source": "system"}]
+        kept, stats = cut_context(placeholder, 3)
+        self.assertEqual(kept, placeholder)
+        self.assertEqual(stats["cut_by"], "unscored")
+
+    def test_infinite_gap_only_applies_threshold(self):
+        kept, _ = cut_context(chunks(0.9, 0.5, 0.2), 5, threshold=0.3, gap=float("inf"))
+        self.assertEqual(len(kept), 2)
+
+
+class TestAnswerCacheKey(unittest.TestCase):
+    def test_k_partitions_answers_except_at_the_default(self):
+        router = object.__new__(AgentRouter)  # no models needed for the key
+        router.rerank_agent = None
+        filters = {"sources": ["a.txt"]}
+
+        self.assertEqual(router._answer_key(None, None), "")
+        self.assertEqual(router._answer_key(None, router.default_k), "")
+        self.assertEqual(
+            router._answer_key(filters, None), router._answer_key(filters, router.default_k)
+        )
+        keys = {router._answer_key(filters, k) for k in (1, router.default_k, 10)}
+        self.assertEqual(len(keys), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from core.shard_index import IndexShard, ShardedIndex, shard_for  # noqa: E402
+from scripts.ingest import write_shards  # noqa: E402
+
+DIM = 16
+
+
+def make_corpus(n=60):
+    rng = np.random.default_rng(7)
+    embeddings = rng.standard_normal((n, DIM)).astype("float32")
+    documents = [f"chunk {i}" for i in range(n)]
+    sources = [f"doc_{i % 6}.txt" for i in range(n)]
+    offsets = [(i * 10, i * 10 + 9) for i in range(n)]
+    return documents, sources, offsets, embeddings
+
+
+class TestShardedIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_merged_topk_matches_single_index(self):
+        documents, sources, offsets, embeddings = make_corpus()
+        write_shards(documents, sources, offsets, embeddings, num_shards=4, shards_dir=self.dir)
+        sharded = ShardedIndex.load(self.dir)
+
+        flat = faiss.IndexFlatL2(DIM)
+        flat.add(embeddings)
+        query = embeddings[5:6] + 0.01
+        _, expected = flat.search(query, 5)
+
+        hits = sharded.search(query, 5)
+        got = [sharded.get_chunk(shard_id, local_id)["content"] for _, shard_id, local_id in hits]
+        self.assertEqual(len(sharded), 4)
+        self.assertEqual(got, [documents[i] for i in expected[0]])
+        self.assertEqual([h[0] for h in hits], sorted(h[0] for h in hits))
+
+    def test_shard_by_source_keeps_documents_together(self):
+        documents, sources, offsets, embeddings = make_corpus()
+        write_shards(documents, sources, offsets, embeddings, num_shards=3, shards_dir=self.dir)
+        sharded = ShardedIndex.load(self.dir)
+
+        for shard in sharded.shards.values():
+            for source in set(shard.sources):
+                self.assertEqual(shard_for(source, "", 3), shard.shard_id)
+
+    def test_single_shard_can_be_replaced(self):
+        documents, sources, offsets, embeddings = make_corpus()
+        write_shards(documents, sources, offsets, embeddings, num_shards=2, shards_dir=self.dir)
+        sharded = ShardedIndex.load(self.dir)
+        untouched = sharded.shards[0]
+
+        documents[0] = "rewritten chunk"
+        target = shard_for(sources[0], documents[0], 2)
+        write_shards(
+            documents,
+            sources,
+            offsets,
+            embeddings,
+            num_shards=2,
+            only_shards=[target],
+            shards_dir=self.dir,
+        )
+        sharded.load_shard(self.dir, target)
+
+        self.assertIn("rewritten chunk", sharded.shards[target].documents)
+        if target != 0:
+            self.assertIs(sharded.shards[0], untouched)
+
+    def test_partial_rebuild_must_keep_the_partitioning(self):
+        documents, sources, offsets, embeddings = make_corpus()
+        write_shards(documents, sources, offsets, embeddings, num_shards=2, shards_dir=self.dir)
+
+        for num_shards, only_shards in [(3, [0]), (2, [2])]:
+            with self.assertRaises(ValueError):
+                write_shards(
+                    documents,
+                    sources,
+                    offsets,
+                    embeddings,
+                    num_shards=num_shards,
+                    only_shards=only_shards,
+                    shards_dir=self.dir,
+                )
+        self.assertEqual(len(ShardedIndex.load(self.dir)), 2)
+
+    def test_shards_too_small_to_train_fall_back_to_flat(self):
+        documents, sources, offsets, embeddings = make_corpus()
+        # 10 chunks over 6 shards by hash: shard 3 is empty, none has 16 vectors for IVF16
+        write_shards(
+            documents[:10],
+            ["doc_0.txt"] * 10,
+            offsets[:10],
+            embeddings[:10],
+            num_shards=6,
+            shard_by="hash",
+            index_type="IVF16,Flat",
+            shards_dir=self.dir,
+        )
+        sharded = ShardedIndex.load(self.dir)
+
+        for shard in sharded.shards.values():
+            self.assertTrue(shard.index.is_trained)
+            appended = faiss.clone_index(shard.index)
+            appended.add(embeddings[:2])  # what ingest_file does for a new document
+            self.assertEqual(appended.ntotal, shard.index.ntotal + 2)
+        self.assertEqual(len(sharded.search(embeddings[0:1], 5)), 5)
+        self.assertEqual(
+            [s.index.ntotal for _, s in sorted(sharded.shards.items())], [1, 2, 2, 0, 1, 4]
+        )
+
+    def test_source_filter_returns_k_hits_from_that_source(self):
+        documents, sources, offsets, embeddings = make_corpus()
+        write_shards(documents, sources, offsets, embeddings, num_shards=2, shards_dir=self.dir)
+        sharded = ShardedIndex.load(self.dir)
+
+        hits = sharded.search(embeddings[0:1], 5, {"sources": ["doc_3.txt"]})
+        got = [sharded.get_chunk(shard_id, local_id)["source"] for _, shard_id, local_id in hits]
+        self.assertEqual(got, ["doc_3.txt"] * 5)
+
+    def test_tag_and_time_filters(self):
+        documents, sources, offsets, embeddings = make_corpus()
+        doc_info = {
+            f"doc_{i}.txt": {"uploaded_at": 1000.0 + i, "tags": ["iam"] if i % 2 else ["bedrock"]}
+            for i in range(6)
+        }
+        write_shards(
+            documents,
+            sources,
+            offsets,
+            embeddings,
+            num_shards=3,
+            shards_dir=self.dir,
+            doc_info=doc_info,
+        )
+        sharded = ShardedIndex.load(self.dir)
+
+        hits = sharded.search(embeddings[0:1], 50, {"tags": ["iam"], "uploaded_after": 1003.0})
+        got = {sharded.get_chunk(shard_id, local_id)["source"] for _, shard_id, local_id in hits}
+        self.assertEqual(got, {"doc_3.txt", "doc_5.txt"})
+        self.assertEqual(sharded.search(embeddings[0:1], 5, {"tags": ["unknown"]}), [])
+
+    def test_filter_on_hnsw_index(self):
+        documents, sources, offsets, embeddings = make_corpus()
+        write_shards(
+            documents,
+            sources,
+            offsets,
+            embeddings,
+            num_shards=1,
+            index_type="HNSW8",
+            shards_dir=self.dir,
+        )
+        sharded = ShardedIndex.load(self.dir)
+
+        hits = sharded.search(embeddings[0:1], 3, {"sources": ["doc_1.txt", "doc_4.txt"]})
+        got = {sharded.get_chunk(shard_id, local_id)["source"] for _, shard_id, local_id in hits}
+        self.assertEqual(len(hits), 3)
+        self.assertTrue(got <= {"doc_1.txt", "doc_4.txt"})
+
+    def test_empty_index_returns_no_hits(self):
+        shard = IndexShard(0, faiss.IndexFlatL2(DIM), [], [])
+        hits = ShardedIndex([shard]).search(np.zeros((1, DIM), dtype="float32"), 3)
+        self.assertEqual(hits, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import json
+import sys
+import unittest
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from core.sse import SSEEncoder  # noqa: E402
+
+CHUNKS = [
+    {"content": "alpha", "source": "a.txt", "score": 0.1, "chunk_id": "0:1"},
+    {"content": "beta", "source": "b.txt", "score": 0.2, "chunk_id": "1:4"},
+]
+
+
+def pipeline_events():
+    return [
+        {"step": "start", "message": "Processing query: q"},
+        {"step": "router", "message": "⚡ Cache miss."},
+        {"step": "retrieval_agent", "message": "Retrieved 2 chunks.", "data": CHUNKS},
+        {"step": "synthesis_agent", "message": "Answer generated.", "data": {"answer": "A"}},
+        {
+            "step": "complete",
+            "message": "Workflow finished",
+            "final_response": {"answer": "A", "context_used": CHUNKS},
+        },
+    ]
+
+
+def encode_all(verbosity):
+    encoder = SSEEncoder(verbosity)
+    payloads = [encoder.encode(event) for event in pipeline_events()]
+    return [json.loads(p) for p in payloads if p is not None], payloads
+
+
+class TestSSEEncoder(unittest.TestCase):
+    def test_final_context_references_retrieved_chunks(self):
+        events, _ = encode_all("full")
+        retrieved = {c["chunk_id"]: c for c in events[2]["data"]}
+        context = events[-1]["final_response"]["context_used"]
+
+        self.assertEqual(context, [{"$ref": "0:1"}, {"$ref": "1:4"}])
+        self.assertEqual([retrieved[c["$ref"]] for c in context], CHUNKS)
+        # The router's own event objects are left untouched
+        self.assertEqual(pipeline_events()[-1]["final_response"]["context_used"], CHUNKS)
+
+    def test_summary_drops_narration_only(self):
+        events, _ = encode_all("summary")
+        self.assertEqual(
+            [e["step"] for e in events], ["retrieval_agent", "synthesis_agent", "complete"]
+        )
+
+    def test_final_sends_context_inline(self):
+        events, _ = encode_all("final")
+        self.assertEqual([e["step"] for e in events], ["complete"])
+        self.assertEqual(events[0]["final_response"]["context_used"], CHUNKS)
+
+    def test_payloads_are_compact_utf8(self):
+        _, payloads = encode_all("full")
+        self.assertIn("⚡", payloads[1])
+        self.assertNotIn('": ', payloads[2])
+
+    def test_unknown_verbosity_is_rejected(self):
+        with self.assertRaises(ValueError):
+            SSEEncoder("quiet")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agents.query_agent import QueryAgent  # noqa: E402
+from core.shard_index import IndexShard, ShardedIndex  # noqa: E402
+from core.stage_cache import RetrievalCache, RoutingCache  # noqa: E402
+
+DECISION = {"needs_retrieval": True, "retrieval_strategy": "vector_similarity", "reasoning": "x"}
+
+
+class ErrorLLM:
+    """Answers like BedrockLLM does when the call fails."""
+
+    def generate(self, system_prompt, user_prompt, temperature=0.0):
+        return "Error: ThrottlingException"
+
+
+class TestRoutingCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = Path(self.tmp.name) / "cache.db"
+        self.vector = np.arange(8, dtype=np.float32)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_persists_across_instances(self):
+        RoutingCache(db_path=self.db).put(self.vector, DECISION)
+        self.assertEqual(RoutingCache(db_path=self.db).get(self.vector), DECISION)
+
+    def test_fallback_decisions_are_flagged(self):
+        # The router skips routing_cache.put for these, so an error is not pinned for days
+        decision = QueryAgent(ErrorLLM()).analyze("What is IAM?")
+        self.assertTrue(decision["needs_retrieval"])
+        self.assertTrue(decision["fallback"])
+
+    def test_expired_entries_miss(self):
+        cache = RoutingCache(db_path=self.db, ttl_seconds=-1)
+        cache.put(self.vector, DECISION)
+        self.assertIsNone(cache.get(self.vector))
+
+    def test_least_recently_used_is_evicted(self):
+        cache = RoutingCache(db_path=self.db, max_entries=2)
+        vectors = [np.full(8, i, dtype=np.float32) for i in range(3)]
+        cache.put(vectors[0], DECISION)
+        cache.put(vectors[1], DECISION)
+        cache.get(vectors[0])
+        cache.put(vectors[2], DECISION)
+
+        self.assertIsNotNone(cache.get(vectors[0]))
+        self.assertIsNone(cache.get(vectors[1]))
+
+
+class TestRetrievalCache(unittest.TestCase):
+    def setUp(self):
+        self.vector = np.arange(8, dtype=np.float32)
+        self.results = [{"content": "chunk", "source": "a.txt", "score": 0.1}]
+
+    def test_keyed_by_filter_and_k(self):
+        cache = RetrievalCache()
+        cache.put("v1", self.vector, "", 3, self.results)
+
+        self.assertEqual(cache.get("v1", self.vector, "", 3), self.results)
+        self.assertIsNone(cache.get("v1", self.vector, '{"sources": ["a.txt"]}', 3))
+        self.assertIsNone(cache.get("v1", self.vector, "", 5))
+
+    def test_new_index_version_invalidates(self):
+        cache = RetrievalCache()
+        cache.put("v1", self.vector, "", 3, self.results)
+
+        self.assertIsNone(cache.get("v2", self.vector, "", 3))
+        self.assertIsNone(cache.get("v1", self.vector, "", 3))
+
+    def test_lru_bound(self):
+        cache = RetrievalCache(max_entries=1)
+        cache.put("v1", self.vector, "", 3, self.results)
+        cache.put("v1", self.vector + 1, "", 3, self.results)
+
+        self.assertIsNone(cache.get("v1", self.vector, "", 3))
+
+    def test_index_version_changes_when_shard_replaced(self):
+        def shard():
+            return IndexShard(0, faiss.IndexFlatL2(4), [], [])
+
+        sharded = ShardedIndex([shard()])
+        before = sharded.version
+        self.assertEqual(before, sharded.version)
+        sharded.add_shard(shard())
+        self.assertNotEqual(before, sharded.version)
+
+
+if __name__ == "__main__":
+    unittest.main()
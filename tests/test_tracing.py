@@ -0,0 +1,154 @@
+import json
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import mock
+
+import faiss
+import numpy as np
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from core import tracing  # noqa: E402
+from core.llm_interface import MockLLM  # noqa: E402
+from core.shard_index import IndexShard, ShardedIndex  # noqa: E402
+from core.tracing import JsonlExporter, Trace, activate, bind, span  # noqa: E402
+
+
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.exporter = JsonlExporter(self.dir / "spans.jsonl")
+
+    def tearDown(self):
+        self.exporter.close()
+        self.tmp.cleanup()
+
+    def exported(self):
+        path = self.dir / "spans.jsonl"
+        if not path.exists():
+            return []
+        return [json.loads(line) for line in path.read_text().splitlines()]
+
+    def test_spans_nest_across_executor_threads(self):
+        trace = Trace("request", "req-1", sampled=True, exporter=self.exporter)
+
+        def work():
+            with span("inner"):
+                return tracing.current_request_id()
+
+        with activate(trace):
+            with span("outer"):
+                with ThreadPoolExecutor(1) as pool:
+                    request_id = pool.submit(bind(work, "stage")).result()
+        trace.end()
+
+        self.assertEqual(request_id, "req-1")
+        spans = {s["name"]: s for s in self.exported()}
+        self.assertEqual(set(spans), {"request", "outer", "stage", "inner"})
+        self.assertEqual(spans["outer"]["parentSpanId"], spans["request"]["spanId"])
+        self.assertEqual(spans["stage"]["parentSpanId"], spans["outer"]["spanId"])
+        self.assertEqual(spans["inner"]["parentSpanId"], spans["stage"]["spanId"])
+        self.assertEqual({s["traceId"] for s in spans.values()}, {trace.trace_id})
+
+    def test_otlp_shape_and_error_status(self):
+        trace = Trace("request", "req-2", sampled=True, exporter=self.exporter)
+        with activate(trace):
+            with self.assertRaises(ValueError):
+                with span("failing", rows=3, ratio=0.5, label="x"):
+                    raise ValueError("boom")
+        trace.end()
+
+        failing = next(s for s in self.exported() if s["name"] == "failing")
+        attributes = {a["key"]: a["value"] for a in failing["attributes"]}
+        self.assertEqual(attributes["request.id"], {"stringValue": "req-2"})
+        self.assertEqual(attributes["rows"], {"intValue": "3"})
+        self.assertEqual(attributes["ratio"], {"doubleValue": 0.5})
+        self.assertEqual(failing["status"]["code"], "STATUS_CODE_ERROR")
+        self.assertLessEqual(int(failing["startTimeUnixNano"]), int(failing["endTimeUnixNano"]))
+
+    def test_unsampled_fast_traces_are_dropped_and_slow_ones_kept(self):
+        fast = Trace("fast", sampled=False, exporter=self.exporter)
+        fast.end()
+        self.assertEqual(self.exported(), [])
+
+        with mock.patch("core.tracing.TRACE_SLOW_MS", 0):
+            slow = Trace("slow", sampled=False, exporter=self.exporter)
+            slow.end()
+        self.assertEqual([s["name"] for s in self.exported()], ["slow"])
+
+    def test_spans_outside_a_trace_are_no_ops(self):
+        with span("orphan") as current:
+            current.set(anything=1)
+        self.assertIsNone(tracing.current_request_id())
+        self.assertIs(bind(len), len)
+
+    def test_exporter_rotates_files(self):
+        exporter = JsonlExporter(self.dir / "small.jsonl", max_bytes=2000, backups=2)
+        for _ in range(10):
+            trace = Trace("request", sampled=True, exporter=exporter)
+            trace.end()
+        exporter.close()
+
+        self.assertTrue((self.dir / "small.jsonl.1").exists())
+        self.assertFalse((self.dir / "small.jsonl.3").exists())
+
+    def test_faiss_and_llm_calls_get_spans(self):
+        rng = np.random.default_rng(0)
+        shards = []
+        for shard_id in range(2):
+            index = faiss.IndexFlatL2(4)
+            index.add(rng.standard_normal((10, 4)).astype("float32"))
+            shards.append(IndexShard(shard_id, index, [""] * 10, ["a.txt"] * 10))
+        sharded = ShardedIndex(shards, max_workers=2)
+
+        trace = Trace("request", sampled=True, exporter=self.exporter)
+        with activate(trace):
+            sharded.search(rng.standard_normal((1, 4)).astype("float32"), 3)
+            MockLLM().generate("Verify the following answer", "question")
+        trace.end()
+
+        spans = self.exported()
+        searches = [s for s in spans if s["name"] == "faiss.search"]
+        self.assertEqual(len(searches), 2)
+        llm = next(s for s in spans if s["name"] == "llm.generate")
+        keys = {a["key"] for a in llm["attributes"]}
+        self.assertTrue({"llm_provider", "input_tokens", "output_tokens"} <= keys)
+
+    def test_profile_is_written_for_bound_work(self):
+        with mock.patch("core.tracing.TRACE_DIR", self.dir):
+            trace = Trace("request", "req-prof", profile=True, exporter=self.exporter)
+            with activate(trace):
+                with ThreadPoolExecutor(1) as pool:
+                    pool.submit(bind(sorted, "sort"), list(range(1000))).result()
+            trace.end()
+
+        self.assertTrue((self.dir / "profiles" / "req-prof.prof").exists())
+        root = next(s for s in self.exported() if s["name"] == "request")
+        self.assertIn("debug.profile", {a["key"] for a in root["attributes"]})
+
+    def test_unsafe_request_ids_are_replaced(self):
+        self.assertEqual(tracing.safe_request_id("req-1.a_b"), "req-1.a_b")
+        for unsafe in ["../../../../tmp/pwned", "..", "a/b", "x" * 65, "", None]:
+            request_id = tracing.safe_request_id(unsafe)
+            self.assertNotEqual(request_id, unsafe)
+            self.assertRegex(request_id, r"^[0-9a-f]{16}$")
+
+    def test_profile_stays_under_trace_dir(self):
+        with mock.patch("core.tracing.TRACE_DIR", self.dir):
+            trace = Trace("request", "../escape", profile=True, exporter=self.exporter)
+            with activate(trace):
+                with ThreadPoolExecutor(1) as pool:
+                    pool.submit(bind(sorted, "sort"), [3, 1, 2]).result()
+            trace.end()
+
+        self.assertFalse((self.dir / "escape.prof").exists())
+        self.assertEqual(trace.profile_path.parent, (self.dir / "profiles").resolve())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -124,7 +124,8 @@ document.addEventListener('DOMContentLoaded', () => {
         let verificationResult = null;
 
         // Start Event Stream
-        const eventSource = new EventSource(`/stream_query?q=${encodeURIComponent(query)}`);
+        const k = kSlider ? kSlider.value : 3;
+        const eventSource = new EventSource(`/stream_query?q=${encodeURIComponent(query)}&k=${k}`);
 
         eventSource.onmessage = (event) => {
             const data = JSON.parse(event.data);
@@ -254,6 +255,7 @@ document.addEventListener('DOMContentLoaded', () => {
             'router': '🔀 Router',
             'query_agent': '🔍 Query Agent',
             'retrieval_agent': '📚 Retrieval Agent',
+            'rerank_agent': '🎯 Rerank Agent',
             'synthesis_agent': '✨ Synthesis Agent',
             'verifier_agent': '🛡️ Verifier Agent',
         };